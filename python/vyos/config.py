@@ -64,12 +64,11 @@ In operational mode, all functions return values from the running config.
 """
 
 import re
-import json
-from copy import deepcopy
 
 import vyos.xml
 import vyos.util
 import vyos.configtree
+from vyos.configdict import dict_merge
 from vyos.configsource import ConfigSource, ConfigSourceSession
 
 class Config(object):
@@ -90,6 +89,7 @@ class Config(object):
 
         self._level = []
         self._dict_cache = {}
+        self._dict_memo = {}
         (self._running_config,
          self._session_config) = self._config_source.get_configtree_tuple()
 
@@ -194,28 +194,32 @@ class Config(object):
         """
         return self._config_source.show_config(path, default, effective)
 
-    def get_cached_root_dict(self, effective=False):
-        cached = self._dict_cache.get(effective, {})
-        if cached:
-            return cached
+    def get_cached_root_dict(self, effective=False, path=[]):
+        """
+        Args:
+            effective (bool): running (effective) or session config
+            path (list): if given, only the subtree of the top level node
+                path[0] is required, which config sources that load the
+                config lazily can make use of
 
-        if effective:
-            config = self._running_config
-        else:
-            config = self._session_config
+        Returns:
+            dict: the config tree, or a part of it holding path
+        """
+        scope = tuple(path[:1]) if self._config_source.scoped_root_dict else ()
+        for key in ((effective, ()), (effective, scope)):
+            cached = self._dict_cache.get(key, {})
+            if cached:
+                return cached
 
-        if config:
-            config_dict = json.loads(config.to_json())
-        else:
-            config_dict = {}
+        config_dict = self._config_source.get_root_dict(effective, list(scope))
 
-        self._dict_cache[effective] = config_dict
+        self._dict_cache[(effective, scope)] = config_dict
 
         return config_dict
 
     def get_config_dict(self, path=[], effective=False, key_mangling=None,
                         get_first_key=False, no_multi_convert=False,
-                        no_tag_node_value_mangle=False):
+                        no_tag_node_value_mangle=False, with_defaults=False):
         """
         Args:
             path (str list): Configuration tree path, can be empty
@@ -223,32 +227,64 @@ class Config(object):
             key_mangling=None: mangle dict keys according to regex and replacement
             get_first_key=False: if k = path[:-1], return sub-dict d[k] instead of {k: d[k]}
             no_multi_convert=False: if convert, return single value of multi node as list
+            with_defaults=False: merge default values of the node, as returned
+                by vyos.xml.defaults(path), into an existing node or into all
+                instances of a tag node; path must not contain tag node values
 
         Returns: a dict representation of the config under path
+
+        Note:
+            Results are memoized per Config object, i.e. per commit when
+            running in vyos-configd. Every call returns a private copy of
+            the memoized dict which the caller is free to modify.
         """
+        if key_mangling and not (isinstance(key_mangling, tuple) and \
+                (len(key_mangling) == 2) and \
+                isinstance(key_mangling[0], str) and \
+                isinstance(key_mangling[1], str)):
+            raise ValueError("key_mangling must be a tuple of two strings")
+
         lpath = self._make_path(path)
-        root_dict = self.get_cached_root_dict(effective)
+        memo_key = (tuple(lpath), effective, key_mangling, get_first_key,
+                    no_multi_convert, no_tag_node_value_mangle, with_defaults)
+        if memo_key not in self._dict_memo:
+            self._dict_memo[memo_key] = self._get_config_dict(lpath,
+                effective, key_mangling, get_first_key, no_multi_convert,
+                no_tag_node_value_mangle, with_defaults)
+
+        return vyos.util.copy_config_dict(self._dict_memo[memo_key])
+
+    def _get_config_dict(self, lpath, effective, key_mangling, get_first_key,
+                         no_multi_convert, no_tag_node_value_mangle,
+                         with_defaults):
+        root_dict = self.get_cached_root_dict(effective, lpath)
         conf_dict = vyos.util.get_sub_dict(root_dict, lpath, get_first_key)
 
-        if not key_mangling and no_multi_convert:
-            return deepcopy(conf_dict)
-
         xmlpath = lpath if get_first_key else lpath[:-1]
 
-        if not key_mangling:
-            conf_dict = vyos.xml.multi_to_list(xmlpath, conf_dict)
-            return conf_dict
-
         if no_multi_convert is False:
             conf_dict = vyos.xml.multi_to_list(xmlpath, conf_dict)
 
-        if not (isinstance(key_mangling, tuple) and \
-                (len(key_mangling) == 2) and \
-                isinstance(key_mangling[0], str) and \
-                isinstance(key_mangling[1], str)):
-            raise ValueError("key_mangling must be a tuple of two strings")
-
-        conf_dict = vyos.util.mangle_dict_keys(conf_dict, key_mangling[0], key_mangling[1], abs_path=xmlpath, no_tag_node_value_mangle=no_tag_node_value_mangle)
+        if key_mangling:
+            conf_dict = vyos.util.mangle_dict_keys(conf_dict, key_mangling[0], key_mangling[1], abs_path=xmlpath, no_tag_node_value_mangle=no_tag_node_value_mangle)
+
+        if with_defaults and conf_dict:
+            # defaults come with their keys mangled to underscores, as the
+            # conf_mode scripts merge them into the mangled config dict;
+            # bring them in line with the keys of the result
+            default_values = vyos.xml.defaults(lpath)
+            if key_mangling != ('-', '_'):
+                default_values = vyos.util.mangle_dict_keys(default_values, '_', '-')
+                if key_mangling:
+                    default_values = vyos.util.mangle_dict_keys(default_values, key_mangling[0], key_mangling[1])
+            node = conf_dict if get_first_key else next(iter(conf_dict.values()))
+            if vyos.xml.is_tag(lpath):
+                # the defaults apply to every instance of a tag node
+                node = {name: dict_merge(default_values, value or {})
+                        for name, value in node.items()}
+            else:
+                node = dict_merge(default_values, node)
+            conf_dict = node if get_first_key else {next(iter(conf_dict)): node}
 
         return conf_dict
 
@@ -263,7 +299,7 @@ class Config(object):
         Note:
             It also returns False if node doesn't exist.
         """
-        self._config_source.set_level(self.get_level)
+        self._config_source.set_level(self.get_level())
         return self._config_source.is_multi(path)
 
     def is_tag(self, path):
@@ -277,7 +313,7 @@ class Config(object):
         Note:
             It also returns False if node doesn't exist.
         """
-        self._config_source.set_level(self.get_level)
+        self._config_source.set_level(self.get_level())
         return self._config_source.is_tag(path)
 
     def is_leaf(self, path):
@@ -291,7 +327,7 @@ class Config(object):
         Note:
             It also returns False if node doesn't exist.
         """
-        self._config_source.set_level(self.get_level)
+        self._config_source.set_level(self.get_level())
         return self._config_source.is_leaf(path)
 
     def return_value(self, path, default=None):
@@ -0,0 +1,168 @@
+# Copyright 2022 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Rules of the vyos-configd "batch" message, shared by the daemon and tests.
+
+A batch is the ordered list of conf_mode scripts of a commit. The reply has
+one result code byte per processed script, in batch order:
+
+- scripts run by the daemon reply R_SUCCESS, R_ERROR_COMMIT or R_ERROR_DAEMON
+- processing stops after the first error; the client runs the script itself
+  on R_ERROR_DAEMON and aborts the commit on R_ERROR_COMMIT
+- a script the daemon does not run replies R_PASS, as do the scripts directly
+  following it which the daemon would not run either; processing stops after
+  them as they have to be run by the client, in order, before any later
+  script. The client then resubmits the remainder of the list.
+
+Note that the commit engine (vyatta-cfg) runs the scripts of a commit one
+at a time through the node.def templates, each as "${vyshim} <script>", so
+it only sends node messages. The batch message, and the parallel scheduler
+running on top of it, are an entry point for clients which know the script
+list up front ("vyshim --batch"); no caller in this tree uses them yet.
+"""
+
+import sys
+
+from concurrent.futures import wait, FIRST_COMPLETED
+
+# Response error codes, see src/shim/vyshim.c
+R_SUCCESS = 1
+R_ERROR_COMMIT = 2
+R_ERROR_DAEMON = 4
+R_PASS = 8
+
+
+def encode_results(results):
+    """ reply of a batch message: one byte per result code """
+    return b''.join(res.to_bytes(1, byteorder=sys.byteorder) for res in results)
+
+
+def decode_results(reply):
+    """ result codes of a batch reply """
+    return list(reply)
+
+
+def run_batch(nodes, run_node, is_pass, is_parallel=None, run_parallel=None):
+    """
+    Run the nodes of a batch in order, following the rules above
+    nodes:         list of batch entries
+    run_node:      function running an entry, returns its result code
+    is_pass:       function telling if an entry is not run by the daemon
+    is_parallel:   function telling if an entry may be scheduled in parallel
+    run_parallel:  function running a list of such entries, returns the
+                   result codes up to the first unsuccessful entry
+    Return the list of result codes of the processed entries.
+    """
+    results = []
+    i = 0
+    while i < len(nodes):
+        # runs of consecutive entries declared for parallel execution
+        j = i
+        if run_parallel:
+            while j < len(nodes) and is_parallel(nodes[j]):
+                j += 1
+        if j - i > 1:
+            res = run_parallel(nodes[i:j])
+            results.extend(res)
+            if len(res) < j - i or res[-1] != R_SUCCESS:
+                break
+            i = j
+            continue
+
+        res = run_node(nodes[i])
+        results.append(res)
+        if res == R_PASS:
+            # let the client run all consecutive pass-through scripts at once
+            for node in nodes[i + 1:]:
+                if not is_pass(node):
+                    break
+                results.append(R_PASS)
+            break
+        if res != R_SUCCESS:
+            break
+        i += 1
+    return results
+
+
+def schedule(nodes, depends, conflicts, executor, prepare, apply):
+    """
+    Run a sequence of scripts with their side effect free phases in parallel:
+    prepare (get_config, verify and generate) runs in the executor, apply in
+    the calling process in batch order, preserving the outcome of running
+    the scripts one after the other.
+
+    - prepare of a script starts once the earlier scripts it depends on or
+      conflicts with have been applied
+    - apply of a script runs once it is prepared and all earlier scripts
+      have been applied
+
+    nodes:      list of batch entries
+    depends:    function (i, j) telling if script i depends on script j < i
+    conflicts:  function (i, j) telling if script i and script j < i share a
+                resource
+    prepare:    function (node) returning (result code, data for apply), it
+                runs in the executor
+    apply:      function (node, data) returning a result code
+    Return the result codes up to and including the first unsuccessful one.
+    """
+    count = len(nodes)
+    prepare_after = [max((j for j in range(i) if depends(i, j) or conflicts(i, j)),
+                         default=-1) for i in range(count)]
+
+    results = []
+    prepared = {}
+    failed = {}
+    running = {}
+    started = set()
+    # scripts 0 .. applied - 1 are applied, none at or after limit is
+    limit = count
+    applied = 0
+
+    while applied < limit:
+        for i in range(applied, limit):
+            if i not in started and prepare_after[i] < applied:
+                started.add(i)
+                running[executor.submit(prepare, nodes[i])] = i
+
+        if applied in prepared:
+            res = apply(nodes[applied], prepared.pop(applied))
+            results.append(res)
+            if res != R_SUCCESS:
+                break
+            applied += 1
+            continue
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            i = running.pop(future)
+            try:
+                res, data = future.result()
+            except Exception:
+                # e.g. a get_config() result that cannot be pickled, the
+                # client falls back to running the script itself
+                res, data = R_ERROR_DAEMON, None
+            if res == R_SUCCESS:
+                prepared[i] = data
+            else:
+                failed[i] = res
+                limit = min(limit, i)
+    else:
+        if limit < count:
+            results.append(failed[limit])
+
+    for future in running:
+        future.cancel()
+    return results
@@ -19,6 +19,7 @@ A library for retrieving value dicts from VyOS configs in a declarative fashion.
 import os
 import json
 
+from vyos.util import copy_config_dict
 from vyos.util import dict_search
 from vyos.xml import defaults
 from vyos.util import cmd
@@ -99,6 +100,30 @@ def dict_merge(source, destination):
 
     return tmp
 
+def _merge_missing(source, destination):
+    # in-place variant of dict_merge(), source values are copied so that
+    # instances do not share nested defaults
+    for key, value in source.items():
+        if key not in destination:
+            destination[key] = copy_config_dict(value)
+        elif isinstance(value, dict) and isinstance(destination[key], dict):
+            _merge_missing(value, destination[key])
+
+def merge_defaults_for_tag_nodes(conf, base):
+    """ Merge the default values of tag node base into every instance of
+    the tag node. conf is the dict of instances, e.g. {'eth0': {...}, ...},
+    base the schema path of the tag node, e.g. ['interfaces', 'ethernet'].
+    Defaults are looked up once for all instances, and instances are updated
+    in place; conf is returned for convenience. """
+    if not conf:
+        return conf
+
+    default_values = defaults(base)
+    for instance in conf.values():
+        _merge_missing(default_values, instance)
+
+    return conf
+
 def list_diff(first, second):
     """ Diff two dictionaries and return only unique items """
     second = set(second)
@@ -115,6 +140,8 @@ def leaf_node_changed(conf, path):
     from vyos.configdiff import get_config_diff
     D = get_config_diff(conf, key_mangling=('-', '_'))
     D.set_level(conf.get_level())
+    if not D.is_node_changed(path):
+        return None
     (new, old) = D.get_value_diff(path)
     if new != old:
         if old is None:
@@ -139,6 +166,8 @@ def node_changed(conf, path, key_mangling=None):
     from vyos.configdiff import get_config_diff, Diff
     D = get_config_diff(conf, key_mangling)
     D.set_level(conf.get_level())
+    if not D.is_node_changed(path):
+        return []
     # get_child_nodes() will return dict_keys(), mangle this into a list with PEP448
     keys = D.get_child_nodes_diff(path, expand_nodes=Diff.DELETE)['delete'].keys()
     return list(keys)
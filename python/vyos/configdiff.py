@@ -14,6 +14,7 @@
 # along with this library.  If not, see <http://www.gnu.org/licenses/>.
 
 from enum import IntFlag, auto
+from weakref import WeakKeyDictionary
 
 from vyos.config import Config
 from vyos.configdict import dict_merge
@@ -46,15 +47,59 @@ def _key_sets_from_dicts(session_dict, effective_dict):
     effective_keys = list(effective_dict)
 
     ret = {}
-    stable_keys = [k for k in session_keys if k in effective_keys]
+    # dict key views give O(1) membership tests, the lists keep the order
+    stable_keys = [k for k in session_keys if k in effective_dict]
 
     ret[enum_to_key(Diff.MERGE)] = session_keys
-    ret[enum_to_key(Diff.DELETE)] = [k for k in effective_keys if k not in stable_keys]
-    ret[enum_to_key(Diff.ADD)] = [k for k in session_keys if k not in stable_keys]
+    ret[enum_to_key(Diff.DELETE)] = [k for k in effective_keys if k not in session_dict]
+    ret[enum_to_key(Diff.ADD)] = [k for k in session_keys if k not in effective_dict]
     ret[enum_to_key(Diff.STABLE)] = stable_keys
 
     return ret
 
+def _changed_paths(session_dict, effective_dict, path, changed):
+    """
+    Walk session and effective dicts once, adding the path of every node
+    that was added, deleted or modified, and of all its ancestors, to the
+    set changed. Returns True if anything under path changed.
+    """
+    modified = False
+    for k in session_dict.keys() | effective_dict.keys():
+        s = session_dict.get(k)
+        e = effective_dict.get(k)
+        p = path + (k,)
+        if isinstance(s, dict) and isinstance(e, dict):
+            if _changed_paths(s, e, p, changed):
+                modified = True
+        elif s != e or k not in session_dict or k not in effective_dict:
+            # add the path of every node of an added or deleted subtree
+            for d in (s, e):
+                if isinstance(d, dict):
+                    _changed_paths(d, {}, p, changed)
+            changed.add(p)
+            modified = True
+
+    if modified:
+        changed.add(path)
+    return modified
+
+# Changed paths of a Config object, computed on first use; in vyos-configd a
+# Config object lives for exactly one commit
+_changed_paths_cache = WeakKeyDictionary()
+
+def get_changed_paths(config):
+    """
+    Returns: set of path tuples of all nodes that differ between the session
+             and the effective config of config, including their ancestors
+    """
+    if config not in _changed_paths_cache:
+        changed = set()
+        _changed_paths(config.get_cached_root_dict(effective=False),
+                       config.get_cached_root_dict(effective=True),
+                       (), changed)
+        _changed_paths_cache[config] = changed
+    return _changed_paths_cache[config]
+
 def _dict_from_key_set(key_set, d):
     # This will always be applied to a key_set obtained from a get_sub_dict,
     # hence there is no possibility of KeyError, as get_sub_dict guarantees
@@ -86,6 +131,7 @@ class ConfigDiff(object):
         self._level = config.get_level()
         self._session_config_dict = config.get_cached_root_dict(effective=False)
         self._effective_config_dict = config.get_cached_root_dict(effective=True)
+        self._changed_paths = get_changed_paths(config)
         self._key_mangling = key_mangling
 
     # mirrored from Config; allow path arguments relative to level
@@ -136,6 +182,17 @@ class ConfigDiff(object):
                                                     self._key_mangling[1])
         return config_dict
 
+    def is_node_changed(self, path=[]):
+        """
+        Args:
+            path (str|list): config path
+
+        Returns: True if the node at path, or anything below it, was added,
+                 deleted or modified; answered from an index built once per
+                 Config object, in O(depth of path)
+        """
+        return tuple(self._make_path(path)) in self._changed_paths
+
     def get_child_nodes_diff_str(self, path=[]):
         ret = {'add': {}, 'change': {}, 'delete': {}}
 
@@ -184,8 +241,11 @@ class ConfigDiff(object):
         """
         session_dict = get_sub_dict(self._session_config_dict,
                                     self._make_path(path), get_first_key=True)
-        effective_dict = get_sub_dict(self._effective_config_dict,
-                                      self._make_path(path), get_first_key=True)
+        if self.is_node_changed(path):
+            effective_dict = get_sub_dict(self._effective_config_dict,
+                                          self._make_path(path), get_first_key=True)
+        else:
+            effective_dict = session_dict
 
         ret = _key_sets_from_dicts(session_dict, effective_dict)
 
@@ -228,7 +288,10 @@ class ConfigDiff(object):
                  dict['stable'] = config values in both session and effective
         """
         session_dict = get_sub_dict(self._session_config_dict, self._make_path(path))
-        effective_dict = get_sub_dict(self._effective_config_dict, self._make_path(path))
+        if self.is_node_changed(path):
+            effective_dict = get_sub_dict(self._effective_config_dict, self._make_path(path))
+        else:
+            effective_dict = session_dict
 
         ret = _key_sets_from_dicts(session_dict, effective_dict)
 
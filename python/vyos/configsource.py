@@ -16,11 +16,19 @@
 
 import os
 import re
+import json
+import hashlib
 import subprocess
 
-from vyos.configtree import ConfigTree
+from collections import OrderedDict
+
+from vyos.configtree import ConfigTree, ConfigTreeError
 from vyos.util import boot_configuration_complete
 
+# Results of cli-shell-api queries that cannot change during the lifetime
+# of a process for a given session environment (inSession, getEditResetEnv)
+_session_query_cache = {}
+
 class VyOSError(Exception):
     """
     Raised on config access errors.
@@ -34,6 +42,9 @@ class ConfigSourceError(Exception):
     pass
 
 class ConfigSource:
+    # get_root_dict() may return only the subtree of the requested path
+    scoped_root_dict = False
+
     def __init__(self):
         self._running_config: ConfigTree = None
         self._session_config: ConfigTree = None
@@ -41,6 +52,21 @@ class ConfigSource:
     def get_configtree_tuple(self):
         return self._running_config, self._session_config
 
+    def get_root_dict(self, effective=False, path=[]):
+        """
+        Args:
+            effective (bool): running (effective) or session config
+            path (list): if given, sources may return a dict that only
+                holds the subtree of the top level node path[0]
+
+        Returns:
+            dict: representation of the config tree
+        """
+        config = self._running_config if effective else self._session_config
+        if config:
+            return json.loads(config.to_json())
+        return {}
+
     def session_changed(self):
         """
         Returns:
@@ -105,7 +131,124 @@ class ConfigSource:
         """
         raise NotImplementedError(f"function not available for {type(self)}")
 
+class LazyConfigTree:
+    """
+    Read-only stand-in for a ConfigTree that is loaded on first access,
+    one top level node at a time.
+
+    Queries for a path only load the subtree of its top level node, e.g.
+    ``exists(['interfaces', 'ethernet', 'eth0'])`` loads ``interfaces``.
+    Queries for the empty path, and any other ConfigTree method, load and
+    parse the whole config, which then serves all further queries.
+
+    Like the None stored for an empty config before, the object is false if
+    the config is empty.
+    """
+    def __init__(self, loader, top_nodes=None):
+        # loader(path) returns the config text under path, [] for all of it;
+        # top_nodes() the names of the top level nodes, to cheaply tell if
+        # the config is empty
+        self._loader = loader
+        self._top_nodes = top_nodes
+        self._empty = None
+        self._full = None
+        self._full_loaded = False
+        self._subtrees = {}
+        self._dicts = {}
+
+    def _full_tree(self):
+        if not self._full_loaded:
+            text = self._loader([])
+            self._full = ConfigTree(text) if text else None
+            self._full_loaded = True
+            self._subtrees.clear()
+        return self._full
+
+    def _tree(self, path):
+        if self._full_loaded or not path:
+            return self._full_tree()
+        top = str(path[0])
+        if not top:
+            return None
+        if top not in self._subtrees:
+            text = self._loader([top])
+            if not text:
+                self._subtrees[top] = None
+                return None
+            try:
+                self._subtrees[top] = ConfigTree(f'{top} {{\n{text}\n}}\n')
+            except ValueError:
+                return self._full_tree()
+        return self._subtrees[top]
+
+    def _tree_or_error(self, path):
+        tree = self._tree(path)
+        if tree is None:
+            raise ConfigTreeError(f"Path [{path}] doesn't exist")
+        return tree
+
+    def exists(self, path):
+        tree = self._tree(path)
+        return tree.exists(path) if tree else False
+
+    def is_tag(self, path):
+        tree = self._tree(path)
+        return tree.is_tag(path) if tree else False
+
+    def return_value(self, path):
+        return self._tree_or_error(path).return_value(path)
+
+    def return_values(self, path):
+        return self._tree_or_error(path).return_values(path)
+
+    def list_nodes(self, path):
+        return self._tree_or_error(path).list_nodes(path)
+
+    def get_dict(self, path=[]):
+        """
+        Returns:
+            dict: the whole config, or for a non-empty path at least the
+                  subtree of its top level node
+        """
+        key = path[0] if path and not self._full_loaded else None
+        if key not in self._dicts:
+            tree = self._tree(path[:1])
+            if self._full_loaded:
+                key = None
+            self._dicts[key] = json.loads(tree.to_json()) if tree else {}
+        return self._dicts[key]
+
+    def to_json(self):
+        tree = self._full_tree()
+        return tree.to_json() if tree else '{}'
+
+    def __bool__(self):
+        if self._full_loaded:
+            return self._full is not None
+        if any(tree is not None for tree in self._subtrees.values()):
+            return True
+        if self._empty is None:
+            if self._top_nodes:
+                self._empty = not self._top_nodes()
+            else:
+                self._empty = self._full_tree() is None
+        return not self._empty
+
+    def __getattr__(self, name):
+        # no loading for special and private attributes, e.g. looked up
+        # by copy or pickle
+        if name.startswith('_'):
+            raise AttributeError(name)
+        tree = self._full_tree()
+        if tree is None:
+            if hasattr(ConfigTree, name):
+                raise ConfigTreeError(f"Config is empty, cannot call {name}()")
+            raise AttributeError(name)
+        return getattr(tree, name)
+
 class ConfigSourceSession(ConfigSource):
+    scoped_root_dict = True
+
     def __init__(self, session_env=None):
         super().__init__()
         self._cli_shell_api = "/bin/cli-shell-api"
@@ -115,36 +258,90 @@ class ConfigSourceSession(ConfigSource):
         else:
             self.__session_env = None
 
+        # Configs are dumped lazily, see LazyConfigTree.
         # Running config can be obtained either from op or conf mode, it always succeeds
         # once the config system is initialized during boot;
-        # before initialization, set to empty string
+        # before initialization, set to empty
         if boot_configuration_complete():
-            try:
-                running_config_text = self._run([self._cli_shell_api, '--show-active-only', '--show-show-defaults', '--show-ignore-edit', 'showConfig'])
-            except VyOSError:
-                running_config_text = ''
+            self._running_config = LazyConfigTree(
+                lambda path: self._show_config_text(path, effective=True),
+                lambda: self._list_top_nodes(effective=True))
         else:
-            running_config_text = ''
+            self._running_config = None
 
         # Session config ("active") only exists in conf mode.
         # In op mode, we'll just use the same running config for both active and session configs.
         if self.in_session():
-            try:
-                session_config_text = self._run([self._cli_shell_api, '--show-working-only', '--show-show-defaults', '--show-ignore-edit', 'showConfig'])
-            except VyOSError:
-                session_config_text = ''
+            self._session_config = LazyConfigTree(
+                lambda path: self._show_config_text(path, effective=False),
+                lambda: self._list_top_nodes(effective=False))
         else:
-            session_config_text = running_config_text
+            self._session_config = self._running_config
 
-        if running_config_text:
-            self._running_config = ConfigTree(running_config_text)
-        else:
-            self._running_config = None
+    def _show_config_text(self, path, effective):
+        """
+        Returns:
+            str: running or working config under path, including defaults
+                 and independent of the edit level; empty if it does not exist
+        """
+        only = '--show-active-only' if effective else '--show-working-only'
+        try:
+            return self._run([self._cli_shell_api, only, '--show-show-defaults',
+                              '--show-ignore-edit', 'showConfig'] + path)
+        except VyOSError:
+            return ''
 
-        if session_config_text:
-            self._session_config = ConfigTree(session_config_text)
-        else:
-            self._session_config = None
+    def _list_top_nodes(self, effective):
+        """
+        Returns:
+            list: names of the top level nodes of the running or working config
+        """
+        op = 'listActiveNodes' if effective else 'listNodes'
+        try:
+            out = self._run([self._cli_shell_api, op])
+        except VyOSError:
+            return []
+        return re.findall(r"'([^']*)'", out)
+
+    def get_root_dict(self, effective=False, path=[]):
+        config = self._running_config if effective else self._session_config
+        if config:
+            return config.get_dict(path)
+        return {}
+
+    def _session_key(self, op):
+        env = self.__session_env if self.__session_env else os.environ
+        return (op,) + tuple(sorted((k, v) for k, v in env.items()
+                                    if k.startswith('VYATTA_')))
+
+    def _run_cached(self, op):
+        """
+        Run a path-less cli-shell-api query once per process and session
+        environment; a failing query is cached as None
+        """
+        key = self._session_key(op)
+        if key not in _session_query_cache:
+            try:
+                _session_query_cache[key] = self._run(self._make_command(op, ''))
+            except VyOSError:
+                _session_query_cache[key] = None
+        return _session_query_cache[key]
+
+    def _schema_query(self, path, query):
+        """
+        Answer a node type query from the interface definition cache, in
+        process. Returns None if the schema cannot decide: the path is not
+        part of the vyos-1x definitions, or it ends in a tag node value.
+        """
+        import vyos.xml
+        lpath = self._level + path.split()
+        try:
+            xml = vyos.xml.load_configuration()
+            if not xml.exists(lpath) or xml.is_tag_value(lpath):
+                return None
+            return bool(getattr(xml, query)(lpath))
+        except Exception:
+            return None
 
     def _make_command(self, op, path):
         args = path.split()
@@ -204,11 +401,7 @@ class ConfigSourceSession(ConfigSource):
         Returns:
             True if called from a configuration session, False otherwise.
         """
-        try:
-            self._run(self._make_command('inSession', ''))
-            return True
-        except VyOSError:
-            return False
+        return self._run_cached('inSession') is not None
 
     def show_config(self, path=[], default=None, effective=False):
         """
@@ -225,7 +418,9 @@ class ConfigSourceSession(ConfigSource):
         # restore original on exit.
         save_env = self.__session_env
 
-        env_str = self._run(self._make_command('getEditResetEnv', ''))
+        env_str = self._run_cached('getEditResetEnv')
+        if env_str is None:
+            raise VyOSError()
         env_list = re.findall(r'([A-Z_]+)=\'([^;\s]+)\'', env_str)
         root_env = os.environ
         for k, v in env_list:
@@ -265,6 +460,9 @@ class ConfigSourceSession(ConfigSource):
         Note:
             It also returns False if node doesn't exist.
         """
+        res = self._schema_query(path, 'is_multi')
+        if res is not None:
+            return res
         try:
             path = " ".join(self._level) + " " + path
             self._run(self._make_command('isMulti', path))
@@ -283,6 +481,9 @@ class ConfigSourceSession(ConfigSource):
         Note:
             It also returns False if node doesn't exist.
         """
+        res = self._schema_query(path, 'is_tag')
+        if res is not None:
+            return res
         try:
             path = " ".join(self._level) + " " + path
             self._run(self._make_command('isTag', path))
@@ -301,6 +502,9 @@ class ConfigSourceSession(ConfigSource):
         Note:
             It also returns False if node doesn't exist.
         """
+        res = self._schema_query(path, 'is_leaf')
+        if res is not None:
+            return res
         try:
             path = " ".join(self._level) + " " + path
             self._run(self._make_command('isLeaf', path))
@@ -308,12 +512,107 @@ class ConfigSourceSession(ConfigSource):
         except VyOSError:
             return False
 
+class ConfigTreeCache:
+    """
+    Content-addressed LRU cache of parsed config trees.
+
+    Entries are keyed by a digest of the config text, so a config string
+    that was already seen (typically the session config of the previous
+    commit showing up as the active config of the next one) is neither
+    re-escaped nor re-parsed by libvyosconfig. The dict representation of
+    the tree is computed on first use and kept alongside the tree.
+
+    Cached trees and dicts are shared between users and must be treated
+    as read-only.
+    """
+    def __init__(self, maxsize=4):
+        if maxsize < 1:
+            raise ValueError("Cache size must be a positive integer")
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(config_text):
+        return hashlib.sha256(config_text.encode()).hexdigest()
+
+    def _entry(self, config_text):
+        key = self._key(config_text)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        # ConfigTree() raises ValueError on parse failure, nothing is cached then
+        entry = {'tree': ConfigTree(config_text), 'dict': None}
+        self._entries[key] = entry
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def get_tree(self, config_text):
+        """
+        Returns:
+            ConfigTree: parsed tree for config_text, None for empty text
+        """
+        if not config_text:
+            return None
+        return self._entry(config_text)['tree']
+
+    def get_dict(self, config_text):
+        """
+        Returns:
+            dict: dict representation of config_text, {} for empty text
+        """
+        if not config_text:
+            return {}
+        # the tree has normally been looked up by get_tree() already,
+        # do not count that as another hit
+        entry = self._entries.get(self._key(config_text))
+        if entry is None:
+            entry = self._entry(config_text)
+        if entry['dict'] is None:
+            entry['dict'] = json.loads(entry['tree'].to_json())
+        return entry['dict']
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: cache size and hit/miss/eviction counters
+        """
+        return {'size': len(self._entries), 'maxsize': self._maxsize,
+                'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions}
+
 class ConfigSourceString(ConfigSource):
-    def __init__(self, running_config_text=None, session_config_text=None):
+    def __init__(self, running_config_text=None, session_config_text=None,
+                 cache=None):
         super().__init__()
+        self._cache = cache
+        self._running_config_text = running_config_text
+        self._session_config_text = session_config_text
 
         try:
-            self._running_config = ConfigTree(running_config_text) if running_config_text else None
-            self._session_config = ConfigTree(session_config_text) if session_config_text else None
+            if cache is not None:
+                self._running_config = cache.get_tree(running_config_text)
+                self._session_config = cache.get_tree(session_config_text)
+            else:
+                self._running_config = ConfigTree(running_config_text) if running_config_text else None
+                self._session_config = ConfigTree(session_config_text) if session_config_text else None
         except ValueError:
             raise ConfigSourceError(f"Init error in {type(self)}")
+
+    def get_root_dict(self, effective=False, path=[]):
+        if self._cache is None:
+            return super().get_root_dict(effective, path)
+        if effective:
+            return self._cache.get_dict(self._running_config_text)
+        return self._cache.get_dict(self._session_config_text)
@@ -281,3 +281,105 @@ class ConfigTree(object):
         else:
             raise ConfigTreeError("Path [{}] doesn't exist".format(path_str))
 
+    # number of arguments after the path of each apply_ops() operation
+    _op_args = {
+        'set': (0, 1),
+        'replace': (1, 1),
+        'add_value': (1, 1),
+        'delete': (0, 0),
+        'delete_value': (1, 1),
+        'rename': (1, 1),
+        'copy': (1, 1),
+        'set_tag': (0, 0),
+    }
+
+    def _check_op(self, op):
+        """ Return the error of a malformed apply_ops() operation, or None """
+        if not isinstance(op, (tuple, list)) or len(op) < 2:
+            return f"malformed operation {op!r}"
+        name, path, *args = op
+        if name not in self._op_args:
+            return f"unknown operation '{name}'"
+        low, high = self._op_args[name]
+        if not low <= len(args) <= high:
+            return f"wrong number of arguments for '{name}'"
+        paths = [path, args[0]] if name == 'copy' else [path]
+        for p in paths:
+            if not isinstance(p, list):
+                return "expected a list, got a {}".format(type(p))
+        if name in ('add_value', 'delete_value', 'replace', 'rename') and args[0] is None:
+            return f"missing value for '{name}'"
+        return None
+
+    def apply_ops(self, ops):
+        """Apply a sequence of modifications to the config tree.
+        ops: iterable of tuples, the first element being the operation:
+             ('set', path[, value]), ('replace', path, value),
+             ('add_value', path, value), ('delete', path),
+             ('delete_value', path, value), ('rename', path, new_name),
+             ('copy', old_path, new_path), ('set_tag', path)
+
+        Semantics of the individual operations are the same as those of the
+        corresponding methods, but the per-call overhead is paid only once;
+        'replace' is set() of a value replacing the current one, as is 'set'.
+        All operations are checked before any is applied: a malformed one
+        (unknown operation, path not a list, missing value) raises
+        ConfigTreeError and leaves the tree unchanged. Operations failing
+        on the tree (e.g. renaming a missing node) are collected and
+        reported in a single ConfigTreeError, which leaves the tree with all
+        other operations applied.
+        """
+        ops = list(ops)
+        errors = []
+        for index, op in enumerate(ops):
+            error = self._check_op(op)
+            if error:
+                errors.append(f"{index}: {error}")
+        if errors:
+            raise ConfigTreeError("; ".join(errors))
+
+        config = self.__config
+        set_valueless = self.__set_valueless
+        set_replace_value = self.__set_replace_value
+        set_add_value = self.__set_add_value
+        delete = self.__delete
+        delete_value = self.__delete_value
+        rename = self.__rename
+        copy = self.__copy
+        exists = self.__exists
+        set_tag = self.__set_tag
+
+        def encode(path):
+            return " ".join(map(str, path)).encode()
+
+        for index, (op, path, *args) in enumerate(ops):
+            path_str = encode(path)
+            if op == 'set' or op == 'replace':
+                if not args or args[0] is None:
+                    set_valueless(config, path_str)
+                else:
+                    set_replace_value(config, path_str, str(args[0]).encode())
+            elif op == 'add_value':
+                set_add_value(config, path_str, str(args[0]).encode())
+            elif op == 'delete':
+                delete(config, path_str)
+            elif op == 'delete_value':
+                delete_value(config, path_str, str(args[0]).encode())
+            elif op == 'rename':
+                new_path = path[:-1] + [args[0]]
+                if exists(config, encode(new_path)):
+                    errors.append(f"{index}: path [{new_path}] already exists")
+                elif rename(config, path_str, str(args[0]).encode()) != 0:
+                    errors.append(f"{index}: path [{path}] doesn't exist")
+            elif op == 'copy':
+                new_path_str = encode(args[0])
+                if exists(config, new_path_str):
+                    errors.append(f"{index}: path [{args[0]}] already exists")
+                elif copy(config, path_str, new_path_str) != 0:
+                    errors.append(f"{index}: path [{path}] doesn't exist")
+            elif op == 'set_tag':
+                if set_tag(config, path_str) != 0:
+                    errors.append(f"{index}: path [{path}] doesn't exist")
+
+        if errors:
+            raise ConfigTreeError("; ".join(errors))
@@ -0,0 +1,251 @@
+# Copyright 2022 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Streaming access to the connection tracking table as dumped by
+"conntrack -o xml". Flows are parsed incrementally and handed out one by
+one, so the complete table is never held in memory.
+"""
+
+import heapq
+import ipaddress
+from collections import Counter
+from subprocess import Popen
+from subprocess import PIPE
+from subprocess import DEVNULL
+from xml.parsers import expat
+
+conntrack = '/usr/sbin/conntrack'
+
+ORIGINAL = 'original'
+REPLY = 'reply'
+INDEPENDENT = 'independent'
+
+
+class ConntrackError(Exception):
+    pass
+
+
+# elements grouping values, every other element inside a flow is a value
+_containers = ('conntrack', 'flow', 'meta', 'layer3', 'layer4', 'counters')
+
+
+class _FlowParser:
+    """ expat handlers building a dict per <flow> element
+
+    {'type': 'new',
+     'original': {'src': '192.0.2.1', 'dst': '198.51.100.1', 'proto': 'tcp',
+                  'sport': '40000', 'dport': '80', 'packets': '3', 'bytes': '180'},
+     'reply': {...},
+     'independent': {'state': 'ESTABLISHED', 'timeout': '431999', 'use': '1', ...}}
+    """
+    def __init__(self):
+        self.parser = expat.ParserCreate()
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self.start
+        self.parser.EndElementHandler = self.end
+        self.parser.CharacterDataHandler = self.text
+        self.flows = []
+        self.done = False
+        self._flow = None
+        self._meta = None
+        self._text = ''
+
+    def start(self, name, attrs):
+        self._text = ''
+        if name == 'flow':
+            self._flow = {'type': attrs.get('type', '')}
+        elif name == 'meta':
+            self._meta = {}
+            self._flow[attrs.get('direction')] = self._meta
+        elif name == 'layer4':
+            self._meta['proto'] = attrs.get('protoname', '')
+
+    def text(self, data):
+        self._text += data
+
+    def end(self, name):
+        if name not in _containers:
+            if self._meta is not None:
+                self._meta[name] = self._text
+        elif name == 'meta':
+            self._meta = None
+        elif name == 'flow':
+            self.flows.append(self._flow)
+            self._flow = None
+        elif name == 'conntrack':
+            self.done = True
+        self._text = ''
+
+
+def parse_flows(chunks):
+    """ Incrementally parse conntrack XML output
+    chunks:  iterable of str or bytes, e.g. a file object or pipe
+    return:  generator of flow dicts, see _FlowParser
+
+    Parsing stops at the closing </conntrack> tag, data following it is
+    not consumed from <chunks>.
+    """
+    parser = _FlowParser()
+    for chunk in chunks:
+        try:
+            parser.parser.Parse(chunk, False)
+        except expat.ExpatError:
+            # anything following </conntrack> in the same chunk
+            if not parser.done:
+                raise
+        yield from parser.flows
+        parser.flows = []
+        if parser.done:
+            return
+
+
+def match_flow(flow, proto=None, src=None, dst=None):
+    """ Check a flow against protocol and original source/destination address
+    filters, None matches everything
+    """
+    original = flow.get(ORIGINAL, {})
+    if proto and original.get('proto', '') != proto:
+        return False
+    for address, key in ((src, 'src'), (dst, 'dst')):
+        if address is None:
+            continue
+        try:
+            if ipaddress.ip_address(original.get(key, '')) != ipaddress.ip_address(address):
+                return False
+        except ValueError:
+            return False
+    return True
+
+
+def filter_flows(flows, proto=None, src=None, dst=None):
+    """ Generator of all <flows> passing match_flow() """
+    if not (proto or src or dst):
+        return flows
+    return (flow for flow in flows if match_flow(flow, proto, src, dst))
+
+
+def dump_command(family=None, proto=None, src=None, dst=None, nat=None):
+    """ conntrack command line listing the matching flows as XML
+    family:  'ipv4' or 'ipv6'
+    nat:     'source' or 'destination' to only list source/destination NAT flows
+    """
+    command = [conntrack, '-o', 'xml', '-L']
+    if family:
+        command += ['-f', family]
+    if proto:
+        command += ['-p', proto]
+    if nat == 'source':
+        command.append('-n')
+    elif nat == 'destination':
+        command.append('-g')
+    if src:
+        command += ['--orig-src', str(src)]
+    if dst:
+        command += ['--orig-dst', str(dst)]
+    return command
+
+
+def dump_flows(family=None, proto=None, src=None, dst=None, nat=None):
+    """ Stream flows from the kernel conntrack table, the filters are
+    evaluated by conntrack itself
+    return:  generator of flow dicts, see _flow()
+    """
+    command = dump_command(family, proto, src, dst, nat)
+    process = Popen(command, stdout=PIPE, stderr=DEVNULL)
+    try:
+        yield from parse_flows(iter(lambda: process.stdout.read(65536), b''))
+        code = process.wait()
+    finally:
+        # the consumer stopped early
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+    if code:
+        raise ConntrackError(f'conntrack failed with exit code {code}')
+
+
+class FlowAggregator:
+    """ Single pass aggregation of (NAT) flows
+
+    Flows are only counted, memory use depends on the number of distinct
+    addresses, port blocks and rules but not on the number of flows.
+
+    nat:         'source' or 'destination', selects which side of the flow
+                 is the translated one
+    port_block:  size of the translated port blocks flows are counted in
+    rule:        optional callable returning the NAT rule for a translated
+                 address, or None if no rule matches
+    """
+    groups = ('protocol', 'source', 'destination', 'translation', 'port_block', 'rule')
+
+    def __init__(self, nat='source', port_block=512, rule=None):
+        self.nat = nat
+        self.port_block = port_block
+        self.rule = rule
+        self.flows = 0
+        self.counters = {group: Counter() for group in self.groups}
+        self._rule_cache = {}
+
+    def _translation(self, flow):
+        """ Translated address and port of a flow """
+        reply = flow.get(REPLY, {})
+        if self.nat == 'destination':
+            return reply.get('src'), reply.get('sport')
+        return reply.get('dst'), reply.get('dport')
+
+    def add(self, flow):
+        original = flow.get(ORIGINAL, {})
+        counters = self.counters
+        self.flows += 1
+        counters['protocol'][original.get('proto', 'unknown')] += 1
+        counters['source'][original.get('src')] += 1
+        counters['destination'][original.get('dst')] += 1
+
+        address, port = self._translation(flow)
+        counters['translation'][address] += 1
+        if port:
+            start = int(port) // self.port_block * self.port_block
+            counters['port_block'][f'{address}:{start}-{start + self.port_block - 1}'] += 1
+
+        if self.rule:
+            if address not in self._rule_cache:
+                self._rule_cache[address] = self.rule(address)
+            counters['rule'][self._rule_cache[address]] += 1
+        return self
+
+    def update(self, flows):
+        for flow in flows:
+            self.add(flow)
+        return self
+
+    def top(self, group, count=10):
+        """ <count> largest entries of <group> as list of (key, flows) """
+        return heapq.nlargest(count, self.counters[group].items(), key=lambda x: x[1])
+
+    def to_dict(self, count=10):
+        """ Summary with the top <count> entries of every group, the protocol
+        and rule groups are complete """
+        summary = {'flows': self.flows, 'nat': self.nat, 'port_block_size': self.port_block}
+        for group in self.groups:
+            if group == 'rule' and not self.rule:
+                continue
+            entries = self.counters[group]
+            top = entries.items() if group in ('protocol', 'rule') else self.top(group, count)
+            summary[group] = {'distinct': len(entries),
+                              'top': [{'key': key, 'flows': flows} for key, flows in
+                                      sorted(top, key=lambda x: x[1], reverse=True)]}
+        return summary
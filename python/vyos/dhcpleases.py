@@ -0,0 +1,269 @@
+# Copyright 2022 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Incrementally maintained index of an ISC DHCP server (IPv4) lease file.
+
+dhcpd appends a new lease declaration every time a lease changes and only
+periodically rewrites the file. The index remembers how far the file was
+parsed, so every update only parses the declarations appended since, and
+keeps the most recent lease of every address together with lease counters
+per pool and binding state.
+"""
+
+import os
+import re
+import json
+import calendar
+from functools import lru_cache
+
+# the record kept per address, in this order
+fields = ('start', 'end', 'state', 'hardware_address', 'hostname', 'pool',
+          'tstp', 'tsfp', 'atsfp', 'cltt')
+
+pool_key = 'shared-networkname'
+
+
+@lru_cache(maxsize=4096)
+def _date(date):
+    # YYYY/MM/DD to the epoch of its midnight UTC, dates repeat a lot
+    year, month, day = date.split('/')
+    return calendar.timegm((int(year), int(month), int(day), 0, 0, 0))
+
+
+def parse_time(value):
+    """
+    lease time as found in the lease file to a UTC epoch, None for "never"
+    "4 2022/01/13 10:00:00" or "epoch 1642068000" (db-time-format local)
+    """
+    value = value.split('#', 1)[0].strip()
+    if value == 'never':
+        return None
+    weekday, _, value = value.partition(' ')
+    if weekday == 'epoch':
+        return int(value)
+    date, _, time = value.partition(' ')
+    hours, minutes, seconds = time.split(':')
+    return _date(date) + int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def parse_lease(statements):
+    """ list of the statements of a lease declaration to an index record """
+    lease = dict.fromkeys(fields, '')
+    lease['start'] = lease['end'] = None
+    for statement in statements:
+        key, _, value = statement.partition(' ')
+        if key == 'starts':
+            lease['start'] = parse_time(value)
+        elif key == 'ends':
+            lease['end'] = parse_time(value)
+        elif key == 'binding':
+            # binding state active
+            lease['state'] = value.split(' ', 1)[-1]
+        elif key == 'hardware':
+            # hardware ethernet 00:50:56:00:00:01
+            lease['hardware_address'] = value.split(' ', 1)[-1]
+        elif key == 'client-hostname':
+            lease['hostname'] = unquote(value)
+        elif key in ('tstp', 'tsfp', 'atsfp', 'cltt'):
+            lease[key] = value
+        elif key == 'set':
+            # set shared-networkname = "LAN";
+            name, _, value = value.partition('=')
+            if name.strip() == pool_key:
+                lease['pool'] = unquote(value.strip())
+    return [lease[field] for field in fields]
+
+
+# dhcpd writes top level declarations with the closing brace on column 0
+# and all the statements inside indented
+_declaration = re.compile(rb'^(\S[^\n]*)\{\n(.*?)^\}[^\n]*\n', re.M | re.S)
+
+
+def parse_declarations(data):
+    """
+    Parse the lease declarations in <data> (bytes)
+    return: (list of (ip, record), number of bytes consumed), a declaration
+            still being written at the end of <data> is not consumed
+    """
+    declarations = {}
+    consumed = 0
+
+    for match in _declaration.finditer(data):
+        consumed = match.end()
+        header = match.group(1).split()
+        # other declarations such as failover peer states are of no interest
+        if len(header) != 2 or header[0] != b'lease':
+            continue
+        # only the last declaration of an address matters, do not parse the others
+        declarations.pop(header[1], None)
+        declarations[header[1]] = match.group(2)
+
+    leases = []
+    for ip, body in declarations.items():
+        statements = [line.strip()[:-1] for line in
+                      body.decode(errors='replace').split('\n') if line.endswith(';')]
+        leases.append((ip.decode(), parse_lease(statements)))
+
+    return leases, consumed
+
+
+class LeaseIndex:
+    """
+    Latest lease per address and lease counters per pool and binding state
+
+    Example:
+    >>> from vyos.dhcpleases import LeaseIndex
+    >>> index = LeaseIndex('/config/dhcpd.leases').update()
+    >>> index.pool_stats()
+    {'LAN': {'active': 12, 'free': 3}}
+    """
+    version = 1
+
+    def __init__(self, lease_file, index_file=None):
+        """
+        lease_file: the dhcpd lease file
+        index_file: where the index is persisted between invocations,
+                    no persistence if None
+        """
+        self.lease_file = lease_file
+        self.index_file = index_file
+        self._reset()
+        if index_file:
+            self._load()
+
+    def _reset(self):
+        self.inode = None
+        self.offset = 0
+        self.leases = {}
+        self.pools = {}
+        self.modified = True
+
+    def _load(self):
+        try:
+            with open(self.index_file) as f:
+                # never trust an index written by someone else
+                if os.fstat(f.fileno()).st_uid != os.getuid():
+                    return
+                index = json.load(f)
+            if index.get('version') != self.version or index.get('lease_file') != self.lease_file:
+                return
+            self.inode = index['inode']
+            self.offset = index['offset']
+            self.leases = index['leases']
+            self.pools = index['pools']
+            self.modified = False
+        except (OSError, ValueError, KeyError):
+            self._reset()
+
+    def save(self):
+        """ persist the index, failures only cost a full parse next time """
+        if not self.index_file or not self.modified:
+            return
+        index = {
+            'version': self.version,
+            'lease_file': self.lease_file,
+            'inode': self.inode,
+            'offset': self.offset,
+            'leases': self.leases,
+            'pools': self.pools,
+        }
+        tmp = f'{self.index_file}.{os.getpid()}'
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(index, f, separators=(',', ':'))
+            os.replace(tmp, self.index_file)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        else:
+            self.modified = False
+
+    def _count(self, record, increment):
+        pool = record[fields.index('pool')]
+        state = record[fields.index('state')]
+        counters = self.pools.setdefault(pool, {})
+        counters[state] = counters.get(state, 0) + increment
+        if not counters[state]:
+            del counters[state]
+            if not counters:
+                del self.pools[pool]
+
+    def add(self, ip, record):
+        """
+        record a lease declaration, it replaces any previous declaration of
+        the address as when dhcpd reads the lease file
+        """
+        current = self.leases.get(ip)
+        if current is not None:
+            self._count(current, -1)
+        self.leases[ip] = record
+        self._count(record, 1)
+
+    def update(self):
+        """ parse the declarations appended to the lease file since the last update """
+        try:
+            f = open(self.lease_file, 'rb')
+        except FileNotFoundError:
+            self._reset()
+            return self
+
+        with f:
+            stat = os.fstat(f.fileno())
+            # dhcpd periodically writes a new compacted lease file
+            if stat.st_ino != self.inode or stat.st_size < self.offset:
+                self._reset()
+                self.inode = stat.st_ino
+            if stat.st_size == self.offset:
+                return self
+            f.seek(self.offset)
+            leases, consumed = parse_declarations(f.read())
+
+        for ip, record in leases:
+            self.add(ip, record)
+        if consumed:
+            self.offset += consumed
+            self.modified = True
+        return self
+
+    def get(self, state=None, pool=None):
+        """
+        generator of lease dicts with the keys of <fields> and 'ip'
+        state:  iterable of binding states to return, all if None
+        pool:   only return leases of this pool
+        """
+        pool_index = fields.index('pool')
+        state_index = fields.index('state')
+        for ip, record in self.leases.items():
+            if pool is not None and record[pool_index] != pool:
+                continue
+            if state is not None and record[state_index] not in state:
+                continue
+            lease = dict(zip(fields, record))
+            lease['ip'] = ip
+            yield lease
+
+    def pool_stats(self):
+        """ dict() of pool name to a dict() of binding state to number of leases """
+        return self.pools
@@ -15,9 +15,144 @@
 
 import os
 import re
+import errno
+import struct
 
+from fnmatch import fnmatch
+
+from vyos.ioctl import ethtool
 from vyos.util import popen
 
+# linux/ethtool.h
+ETHTOOL_GRINGPARAM = 0x10
+ETHTOOL_GPAUSEPARAM = 0x12
+ETHTOOL_GSTRINGS = 0x1b
+ETHTOOL_GSSET_INFO = 0x37
+ETHTOOL_GFEATURES = 0x3a
+ETHTOOL_GLINKSETTINGS = 0x4c
+ETH_SS_FEATURES = 4
+ETH_SS_LINK_MODES = 7
+ETH_GSTRING_LEN = 32
+AUTONEG_ENABLE = 1
+
+_sset_info = struct.Struct('=IIQI')
+_gstrings = struct.Struct('=III')
+_gfeatures = struct.Struct('=II')
+_link_settings = struct.Struct('=IIBBBBBBBbBBBB28x')
+_ringparam = struct.Struct('=9I')
+_pauseparam = struct.Struct('=4I')
+
+# features shown by "ethtool --show-features" under their legacy name, made
+# of all the kernel features matching the pattern
+_legacy_features = {
+    'rx-checksumming': 'rx-checksum',
+    'tx-checksumming': 'tx-checksum-*',
+    'scatter-gather': 'tx-scatter-gather*',
+    'tcp-segmentation-offload': 'tx-tcp*-segmentation',
+    'udp-fragmentation-offload': 'tx-udp-fragmentation',
+    'generic-segmentation-offload': 'tx-generic-segmentation',
+    'generic-receive-offload': 'rx-gro',
+    'large-receive-offload': 'rx-lro',
+    'rx-vlan-offload': 'rx-vlan-hw-parse',
+    'tx-vlan-offload': 'tx-vlan-hw-insert',
+    'ntuple-filters': 'rx-ntuple-filter',
+    'receive-hashing': 'rx-hashing',
+}
+
+# kernel string sets and the size of the link mode bitmaps, they are the same
+# for all interfaces and only queried once per process
+_string_sets = {}
+_link_mode_words = None
+
+
+def _unsupported(e):
+    return e.errno == errno.EOPNOTSUPP
+
+
+def get_strings(ifname, string_set):
+    """ names of a kernel string set (ETH_SS_*) """
+    if string_set not in _string_sets:
+        data = bytearray(_sset_info.pack(ETHTOOL_GSSET_INFO, 0, 1 << string_set, 0))
+        ethtool(ifname, data)
+        _, _, mask, count = _sset_info.unpack(data)
+        if not mask:
+            raise OSError(errno.EOPNOTSUPP, os.strerror(errno.EOPNOTSUPP))
+
+        data = bytearray(_gstrings.pack(ETHTOOL_GSTRINGS, string_set, count))
+        data += bytes(count * ETH_GSTRING_LEN)
+        ethtool(ifname, data)
+        names = []
+        for offset in range(_gstrings.size, len(data), ETH_GSTRING_LEN):
+            name = data[offset:offset + ETH_GSTRING_LEN].split(b'\0', 1)[0]
+            names.append(name.decode())
+        _string_sets[string_set] = names
+    return _string_sets[string_set]
+
+
+def get_link_settings(ifname):
+    """
+    auto-negotiation state and supported link modes of an interface
+    return a tuple (autoneg, ['10baseT/Half', ...])
+    """
+    global _link_mode_words
+    if _link_mode_words is None:
+        # handshake: the kernel answers with the negated number of words
+        data = bytearray(_link_settings.pack(ETHTOOL_GLINKSETTINGS, *[0] * 13))
+        ethtool(ifname, data)
+        _link_mode_words = -_link_settings.unpack(data)[9]
+
+    words = _link_mode_words
+    data = bytearray(_link_settings.pack(ETHTOOL_GLINKSETTINGS, *[0] * 8, words, 0, 0, 0, 0))
+    data += bytes(3 * words * 4)
+    ethtool(ifname, data)
+    autoneg = _link_settings.unpack_from(data)[5]
+
+    # three bitmaps follow: supported, advertising and link partner
+    supported = 0
+    for index, word in enumerate(struct.unpack_from(f'={words}I', data, _link_settings.size)):
+        supported |= word << (32 * index)
+
+    modes = []
+    if supported:
+        names = get_strings(ifname, ETH_SS_LINK_MODES)
+        modes = [name for bit, name in enumerate(names) if supported & (1 << bit)]
+    return autoneg == AUTONEG_ENABLE, modes
+
+
+def get_features(ifname):
+    """
+    state of all kernel features of an interface and of their legacy names
+    as shown by "ethtool --show-features"
+    return a dict() name -> {'enabled': bool, 'fixed': bool}
+    """
+    names = get_strings(ifname, ETH_SS_FEATURES)
+    blocks = (len(names) + 31) // 32
+    data = bytearray(_gfeatures.pack(ETHTOOL_GFEATURES, blocks)) + bytes(blocks * 16)
+    ethtool(ifname, data)
+    # one block of available, requested, active and never_changed per 32 features
+    words = struct.unpack_from(f'={blocks * 4}I', data, _gfeatures.size)
+
+    features = {}
+    for index, name in enumerate(names):
+        if not name:
+            continue
+        available, _, active, never_changed = words[4 * (index // 32):4 * (index // 32) + 4]
+        bit = 1 << (index % 32)
+        features[name] = {
+            'enabled' : bool(active & bit),
+            'fixed' : bool(not available & bit or never_changed & bit),
+        }
+
+    for legacy, pattern in _legacy_features.items():
+        parts = [state for name, state in features.items() if fnmatch(name, pattern)]
+        if parts:
+            features[legacy] = {
+                'enabled' : any(state['enabled'] for state in parts),
+                'fixed' : all(state['fixed'] for state in parts),
+            }
+    return features
+
+
 class Ethtool:
     """
     Class is used to retrive and cache information about an ethernet adapter
@@ -56,6 +191,78 @@ class Ethtool:
             link = os.readlink(sysfs_file)
             self._driver_name = os.path.basename(link)
 
+        try:
+            self._load_ioctl(ifname)
+        except OSError:
+            # no ethtool ioctl support, e.g. unknown interface
+            self._reset()
+            self._load_ethtool(ifname)
+
+    def _reset(self):
+        # per instance, the class attributes are shared by all interfaces
+        self._features = {}
+        self._speed_duplex = {}
+        self._ring_buffers = {}
+        self._ring_buffers_max = {}
+        self._auto_negotiation = False
+        self._flow_control = False
+        self._flow_control_enabled = None
+
+    def _add_speed_duplex(self, mode):
+        # link modes are named <speed>base<media>/<duplex>
+        speed = mode.split('base')[0]
+        duplex = mode.split('/')[-1].lower()
+        if speed not in self._speed_duplex:
+            self._speed_duplex.update({ speed : {}})
+        if duplex not in self._speed_duplex[speed]:
+            self._speed_duplex[speed].update({ duplex : ''})
+
+    def _load_ioctl(self, ifname):
+        """ Read all adapter information in-process with SIOCETHTOOL """
+        self._reset()
+        pattern = re.compile(r'\d+base.*')
+
+        try:
+            self._auto_negotiation, modes = get_link_settings(ifname)
+            for mode in modes:
+                if pattern.search(mode):
+                    self._add_speed_duplex(mode)
+        except OSError as e:
+            if not _unsupported(e):
+                raise
+
+        try:
+            self._features = get_features(ifname)
+        except OSError as e:
+            if not _unsupported(e):
+                raise
+
+        try:
+            data = bytearray(_ringparam.pack(ETHTOOL_GRINGPARAM, *[0] * 8))
+            ethtool(ifname, data)
+            values = _ringparam.unpack(data)[1:]
+            # zero means unsupported, shown as n/a by ethtool
+            for index, key in enumerate(['rx', 'rx_mini', 'rx_jumbo', 'tx']):
+                if values[index]:
+                    self._ring_buffers_max[key] = str(values[index])
+                if values[index + 4]:
+                    self._ring_buffers[key] = str(values[index + 4])
+        except OSError as e:
+            if not _unsupported(e):
+                raise
+
+        # Flow control is not supported by all NICs (e.g. vmxnet3)
+        try:
+            data = bytearray(_pauseparam.pack(ETHTOOL_GPAUSEPARAM, 0, 0, 0))
+            ethtool(ifname, data)
+            self._flow_control = True
+            self._flow_control_enabled = 'on' if _pauseparam.unpack(data)[1] else 'off'
+        except OSError as e:
+            if not _unsupported(e):
+                raise
+
+    def _load_ethtool(self, ifname):
+        """ Read all adapter information by parsing the ethtool command """
         # Build a dictinary of supported link-speed and dupley settings.
         out, err = popen(f'ethtool {ifname}')
         reading = False
@@ -69,12 +276,7 @@ class Ethtool:
             if reading:
                 for block in line.split():
                     if pattern.search(block):
-                        speed = block.split('base')[0]
-                        duplex = block.split('/')[-1].lower()
-                        if speed not in self._speed_duplex:
-                            self._speed_duplex.update({ speed : {}})
-                        if duplex not in self._speed_duplex[speed]:
-                            self._speed_duplex[speed].update({ duplex : ''})
+                        self._add_speed_duplex(block)
             if 'Auto-negotiation:' in line:
                 # Split the following string: Auto-negotiation: off
                 # we are only interested in off or on
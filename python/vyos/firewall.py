@@ -235,3 +235,129 @@ def parse_policy_set(set_conf, def_suffix):
         mss = set_conf['tcp_mss']
         out.append(f'tcp option maxseg size set {mss}')
     return " ".join(out)
+
+# Functions below used by op-mode to show rules read with "nft -j"
+
+# statements which are not shown as rule conditions
+nft_hidden_statements = ['counter', 'drop', 'reject', 'return']
+
+# meta keys nft prints without the "meta" keyword
+nft_unqualified_meta = ['iif', 'oif', 'iifname', 'oifname', 'iifgroup', 'oifgroup']
+
+# keys whose values nft prints as quoted strings
+nft_string_keys = ['iifname', 'oifname', 'hour', 'day', 'time']
+
+def nft_expression(expr):
+    """ nft wording of the left hand side of a match or mangle statement """
+    if 'payload' in expr:
+        payload = expr['payload']
+        if 'protocol' in payload:
+            return f"{payload['protocol']} {payload['field']}"
+        return f"@{payload['base']},{payload['offset']},{payload['len']}"
+    if 'meta' in expr:
+        key = expr['meta']['key']
+        return key if key in nft_unqualified_meta else f'meta {key}'
+    if 'ct' in expr:
+        return f"ct {expr['ct']['key']}"
+    if 'tcp option' in expr:
+        option = expr['tcp option']
+        return f"tcp option {option['name']} {option['field']}" if 'field' in option \
+            else f"tcp option {option['name']}"
+    for op in ('&', '|', '^'):
+        if op in expr:
+            return f' {op} '.join(nft_value(x, nested=True) for x in expr[op])
+    return nft_value(expr)
+
+def nft_key(expr):
+    """ key of a meta or ct expression, to format its values """
+    for kind in ('meta', 'ct'):
+        if kind in expr:
+            return expr[kind]['key']
+    return None
+
+def nft_value(value, key=None, nested=False):
+    """ nft wording of a value, key being the meta or ct key it is compared to """
+    if isinstance(value, dict):
+        if 'set' in value:
+            return nft_value(value['set'], key)
+        if 'prefix' in value:
+            return f"{value['prefix']['addr']}/{value['prefix']['len']}"
+        if 'range' in value:
+            return '-'.join(nft_value(x, key) for x in value['range'])
+        if '|' in value:
+            return nft_value(value['|'], key, nested)
+        return nft_expression(value)
+    if isinstance(value, list) and nested:
+        # flags of a bitwise expression
+        return '(' + ' | '.join(nft_value(x, key) for x in value) + ')'
+    if isinstance(value, list):
+        if len(value) == 1:
+            return nft_value(value[0], key)
+        return '{ ' + ', '.join(nft_value(x, key) for x in value) + ' }'
+    if isinstance(value, bool):
+        return 'exists' if value else 'missing'
+    if key == 'mark' and isinstance(value, int):
+        return f'0x{value:08x}'
+    if key in nft_string_keys:
+        return f'"{value}"'
+    return str(value)
+
+def nft_limit(limit):
+    """ nft wording of a limit statement """
+    over = 'over ' if limit.get('inv') else ''
+    rate_unit = limit.get('rate_unit', 'packets')
+    rate = limit['rate'] if rate_unit == 'packets' else f"{limit['rate']} {rate_unit}"
+    out = f"limit rate {over}{rate}/{limit.get('per', 'second')}"
+    burst = limit.get('burst', 0)
+    burst_unit = limit.get('burst_unit', 'packets')
+    # nft omits the default burst of packet limits
+    if burst and not (burst_unit == 'packets' and burst == 5):
+        out += f' burst {burst} {burst_unit}'
+    return out
+
+def nft_log(log):
+    """ nft wording of a log statement """
+    out = 'log'
+    if not log:
+        return out
+    if 'prefix' in log:
+        out += f' prefix "{log["prefix"]}"'
+    for option in ('group', 'snaplen', 'queue-threshold', 'level'):
+        if option in log:
+            out += f' {option} {log[option]}'
+    if 'flags' in log:
+        flags = log['flags'] if isinstance(log['flags'], list) else [log['flags']]
+        out += ' flags ' + ','.join(flags)
+    return out
+
+def nft_conditions(expr):
+    """ Text of the matches and statements of a rule read with "nft -j", in
+    the wording of "nft list", without counter and verdict statements """
+    conditions = []
+    for statement in expr:
+        key = next(iter(statement), '')
+        if key in nft_hidden_statements:
+            continue
+        data = statement[key]
+        if key == 'match':
+            left = nft_expression(data['left'])
+            right = nft_value(data['right'], nft_key(data['left']))
+            # nft shows the == operator after a bitwise expression
+            bitwise = any(op in data['left'] for op in ('&', '|', '^'))
+            implicit = ('in',) if bitwise else ('==', 'in')
+            op = '' if data['op'] in implicit else f"{data['op']} "
+            conditions.append(f'{left} {op}{right}')
+        elif key == 'mangle':
+            value = nft_value(data['value'], nft_key(data['key']))
+            conditions.append(f"{nft_expression(data['key'])} set {value}")
+        elif key == 'limit':
+            conditions.append(nft_limit(data))
+        elif key == 'log':
+            conditions.append(nft_log(data))
+        elif key in ('jump', 'goto'):
+            conditions.append(f"{key} {data['target']}")
+        elif data is None:
+            conditions.append(key)
+        else:
+            conditions.append(f'{key} {nft_value(data)}')
+    return ' '.join(conditions)
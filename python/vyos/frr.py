@@ -67,6 +67,8 @@ Apply the new configuration:
 
 import tempfile
 import re
+import shlex
+from itertools import groupby
 from vyos import util
 from vyos.util import chown
 from vyos.util import cmd
@@ -74,6 +76,9 @@ import logging
 from logging.handlers import SysLogHandler
 import os
 import sys
+import time
+import socket
+import threading
 
 LOG = logging.getLogger(__name__)
 DEBUG = False
@@ -90,9 +95,17 @@ _frr_daemons = ['zebra', 'bgpd', 'fabricd', 'isisd', 'ospf6d', 'ospfd', 'pbrd',
 path_vtysh = '/usr/bin/vtysh'
 path_frr_reload = '/usr/lib/frr/frr-reload.py'
 path_config = '/run/frr'
+path_vty = '/run/frr'
 
 default_add_before = r'(ip prefix-list .*|route-map .*|line vty|end)'
 
+# How FRRConfig.commit_configuration() and FRRTransaction apply a new
+# configuration: 'reload' runs frr-reload with the complete configuration,
+# 'delta' only sends the changed lines through vtysh (see apply_delta())
+apply_mode = 'reload'
+
+_skip_line_re = re.compile(r'^(!.*|end|exit(-\S+)?|frr (version|defaults) .*|)$')
+
 class FrrError(Exception):
     pass
 
@@ -128,6 +141,130 @@ def init_debugging():
     if DEBUG:
         LOG.setLevel(logging.DEBUG)
 
+# vtysh status codes (lib/command.h) signalling success
+_vty_success = (0, 10)
+_vty_header_re = re.compile(r'^(Building configuration\.\.\.\n)?\n?(Current configuration:\n)?')
+
+class VTYClient:
+    """ Connection to the VTY unix socket of a single FRR daemon, speaking
+    the same protocol as vtysh: a command is sent as NUL terminated string,
+    the answer is terminated by three NUL bytes and the command status
+    """
+    def __init__(self, daemon, timeout=300):
+        if daemon not in _frr_daemons:
+            raise ValueError(f'The specified daemon type is not supported {repr(daemon)}')
+        self.daemon = daemon
+        self.path = os.path.join(path_vty, f'{daemon}.vty')
+        self.lock = threading.Lock()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(self.path)
+        # vtysh connections start in view mode
+        self._command('enable')
+
+    def _command(self, command):
+        self._sock.sendall(command.encode() + b'\0')
+        data = bytearray()
+        while not (len(data) >= 4 and data[-4:-1] == b'\0\0\0'):
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise ConnectionError(f'{self.path}: connection closed by {self.daemon}')
+            data += chunk
+        return data[-1], data[:-4].decode(errors='replace').replace('\r', '')
+
+    def command(self, command):
+        """ Execute <command> in the current node of the connection
+        return:  tuple of vtysh status code and output
+        """
+        with self.lock:
+            return self._command(command)
+
+    def configure(self, lines):
+        """ Execute <lines> in configuration mode, stops at the first failing
+        command. Always returns to enable mode before returning.
+        return:  tuple of vtysh status code and output
+        """
+        with self.lock:
+            status, output = self._command('configure terminal')
+            try:
+                for line in lines:
+                    if status not in _vty_success:
+                        break
+                    status, out = self._command(line)
+                    output += out
+            finally:
+                self._command('end')
+            return status, output
+
+    def close(self):
+        self._sock.close()
+
+
+class VTYPool:
+    """ Cache of VTYClient connections for long running processes like
+    vyos-configd. Connections are re-established once if they broke since
+    their last use, e.g. because the daemon has been restarted.
+    """
+    def __init__(self):
+        self.clients = {}
+
+    def _run(self, daemon, func, *args):
+        for attempt in range(2):
+            client = self.clients.get(daemon)
+            try:
+                if not client:
+                    client = self.clients[daemon] = VTYClient(daemon)
+                return getattr(client, func)(*args)
+            except OSError:
+                self.clients.pop(daemon, None)
+                if client:
+                    client.close()
+                if attempt:
+                    raise
+
+    def command(self, daemon, command):
+        return self._run(daemon, 'command', command)
+
+    def configure(self, daemon, lines):
+        return self._run(daemon, 'configure', lines)
+
+    def close(self):
+        for client in self.clients.values():
+            client.close()
+        self.clients = {}
+
+
+_vty_pool = None
+
+def enable_vty_pool():
+    """ Talk to the FRR daemons through pooled VTY socket connections instead
+    of a vtysh process per call whenever the daemon is known. Calls fall back
+    to vtysh if the socket can not be used.
+    """
+    global _vty_pool
+    if not _vty_pool:
+        _vty_pool = VTYPool()
+    return _vty_pool
+
+
+def disable_vty_pool():
+    global _vty_pool
+    if _vty_pool:
+        _vty_pool.close()
+    _vty_pool = None
+
+
+def _vty_pool_call(func, daemon, *args):
+    """ Run <func> on the VTY pool, None if the pool is not usable """
+    if not _vty_pool or not daemon:
+        return None
+    try:
+        return getattr(_vty_pool, func)(daemon, *args)
+    except OSError as e:
+        LOG.debug(f'vty: {daemon} not reachable, using vtysh: {e}')
+        return None
+
+
 def get_configuration(daemon=None, marked=False):
     """ Get current running FRR configuration
     daemon:  Collect only configuration for the specified FRR daemon,
@@ -140,17 +277,25 @@ def get_configuration(daemon=None, marked=False):
     if daemon and daemon not in _frr_daemons:
         raise ValueError(f'The specified daemon type is not supported {repr(daemon)}')
 
-    cmd = f"{path_vtysh} -c 'show run'"
-    if daemon:
-        cmd += f' -d {daemon}'
+    result = _vty_pool_call('command', daemon, 'show running-config')
+    if result:
+        code, output = result
+        if code not in _vty_success:
+            raise OSError(code, output)
+        # Remove header lines in front of the configuration
+        config = _vty_header_re.sub('', output, count=1)
+    else:
+        cmd = f"{path_vtysh} -c 'show run'"
+        if daemon:
+            cmd += f' -d {daemon}'
 
-    output, code = util.popen(cmd, stderr=util.STDOUT)
-    if code:
-        raise OSError(code, output)
+        output, code = util.popen(cmd, stderr=util.STDOUT)
+        if code:
+            raise OSError(code, output)
 
-    config = output.replace('\r', '')
-    # Remove first header lines from FRR config
-    config = config.split("\n", 3)[-1]
+        config = output.replace('\r', '')
+        # Remove first header lines from FRR config
+        config = config.split("\n", 3)[-1]
     # Mark the configuration with end tags
     if marked:
         config = mark_configuration(config)
@@ -226,14 +371,200 @@ def save_configuration():
     return cmd(f'{path_vtysh} -n -w')
 
 
-def execute(command):
+def _config_contexts(config):
+    """ Split FRR configuration into its contexts
+    config:  (str) configuration as shown by "show running-config"
+    return:  dict mapping a context (tuple of the enclosing context lines,
+             () for the top level) to the list of commands inside it
+
+    example: {(): ['router bgp 65000'],
+              ('router bgp 65000',): ['neighbor 192.0.2.1 remote-as 65001',
+                                      'address-family ipv4 unicast'],
+              ('router bgp 65000', 'address-family ipv4 unicast'): ['network 192.0.2.0/24']}
+    """
+    contexts = {(): []}
+    stack = []
+    for line in config.split('\n'):
+        command = line.strip()
+        indent = len(line) - len(line.lstrip())
+        if command.startswith('exit'):
+            # a context might be empty, e.g. "route-map FOO deny 10"
+            for i, (level, header) in enumerate(stack):
+                if level == indent:
+                    contexts.setdefault(tuple(h for _, h in stack[:i + 1]), [])
+            continue
+        if _skip_line_re.match(command):
+            continue
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        context = tuple(header for _, header in stack)
+        contexts.setdefault(context, []).append(command)
+        stack.append((indent, command))
+    return contexts
+
+
+def _negate(command):
+    if command.startswith('no '):
+        return command[3:]
+    return f'no {command}'
+
+
+# Options inside a context holding a single value: a new value replaces the
+# old one, which must not be removed first - e.g. "no neighbor <peer> remote-as"
+# deletes the neighbor. The group is the option without its value.
+_single_value_options = [re.compile(p) for p in (
+    r'^(neighbor \S+ remote-as) ',
+    r'^(neighbor \S+ peer-group) ',
+    r'^(neighbor \S+ description) ',
+    r'^(neighbor \S+ update-source) ',
+    r'^(neighbor \S+ local-as) ',
+    r'^(neighbor \S+ ebgp-multihop) ',
+    r'^(neighbor \S+ ttl-security hops) ',
+    r'^(neighbor \S+ timers connect) ',
+    r'^(neighbor \S+ timers) \d+ \d+$',
+    r'^(neighbor \S+ weight) ',
+    r'^(bgp router-id) ',
+    r'^(ospf router-id) ',
+    r'^(ospf6 router-id) ',
+    r'^(timers bgp) ',
+    r'^(description) ',
+    r'^(set (?:metric|local-preference|weight|tag|origin)) ',
+)]
+
+
+def _command_key(command):
+    """ The single value option set by a command, None for commands which
+    have to be removed with "no <command>" when they are replaced, e.g.
+    "network <prefix>" or "redistribute <protocol>"
+    """
+    for option in _single_value_options:
+        match = option.match(command)
+        if match:
+            return match.group(1)
+    return None
+
+
+def delta_commands(original, config):
+    """ vtysh configuration mode commands changing <original> into <config>
+    original:  (str) configuration currently active in FRR
+    config:    (str) new configuration
+
+    return:    list of commands for configure(), removals are done deepest
+               context first and in reverse order, additions in order
+    """
+    old = _config_contexts(original)
+    new = _config_contexts(config)
+    top_level = set(new[()])
+
+    remove = []
+    for context in sorted(old, key=len, reverse=True):
+        # the complete top level context is removed by "no <context>"
+        if context and context[0] not in top_level:
+            continue
+        commands = new.get(context, [])
+        current = set(commands)
+        replaced = {_command_key(c) for c in commands if c not in old[context]} if context else set()
+        replaced.discard(None)
+        for command in reversed(old[context]):
+            if command in current:
+                continue
+            # nested contexts are removed with their commands, FRR has no
+            # "no address-family"
+            if context and (*context, command) in old:
+                if command.startswith('address-family '):
+                    continue
+            elif _command_key(command) in replaced:
+                continue
+            remove.append((context, _negate(command)))
+
+    add = []
+    for context in sorted(new, key=len):
+        previous = set(old.get(context, []))
+        add.extend((context, c) for c in new[context] if c not in previous)
+
+    commands = []
+    for context, entries in groupby(remove + add, key=lambda x: x[0]):
+        if commands:
+            commands += ['end', 'configure terminal']
+        commands += context
+        for _, command in entries:
+            commands.append(command)
+            # return from a newly created context to continue in this one
+            if (*context, command) in new and not command.startswith('no '):
+                commands.append('exit')
+    return commands
+
+
+def apply_delta(original, config, daemon=None):
+    """ Apply only the changes between <original> and <config> through a
+    single vtysh call
+    return:  True on success, False if the changes could not be applied and
+             the configuration needs a full reload
+    """
+    commands = delta_commands(original, config)
+    if not commands:
+        return True
+
+    LOG.debug(f'apply_delta: {len(commands)} command(s) for {daemon}')
+    if DEBUG:
+        for i, e in enumerate(commands):
+            LOG.debug(f'apply_delta: command    {i:3} {e}')
+    try:
+        configure(commands, daemon=daemon)
+    except (ConfigurationNotValid, OSError) as e:
+        LOG.debug(f'apply_delta: failed, falling back to frr-reload: {e}')
+        return False
+    return True
+
+
+def _commit_configuration(config, daemon, original=None):
+    """ Apply configuration using frr-reload, retrying on failure. When
+    running in 'delta' apply_mode and the <original> configuration is known,
+    only the changed lines are applied and frr-reload is used on error
+    """
+    if apply_mode == 'delta' and original is not None:
+        if apply_delta(original, config, daemon=daemon):
+            return
+
+    # https://github.com/FRRouting/frr/issues/10132
+    # https://github.com/FRRouting/frr/issues/10133
+    count = 0
+    count_max = 5
+    while count < count_max:
+        count += 1
+        try:
+            reload_configuration(config, daemon=daemon)
+            break
+        except:
+            # we just need to re-try the commit of the configuration
+            # for the listed FRR issues above
+            pass
+    if count >= count_max:
+        raise ConfigurationNotValid(f'Config commit retry counter ({count_max}) exceeded')
+
+
+def execute(command, daemon=None):
     """ Run commands inside vtysh
     command:  str containing commands to execute inside a vtysh session
+    daemon:   Run the command only on the specified FRR daemon
     """
     if not isinstance(command, str):
         raise ValueError(f'command needs to be a string: {repr(command)}')
 
-    cmd = f"{path_vtysh} -c '{command}'"
+    if daemon and daemon not in _frr_daemons:
+        raise ValueError(f'The specified daemon type is not supported {repr(daemon)}')
+
+    result = _vty_pool_call('command', daemon, command)
+    if result:
+        code, output = result
+        if code not in _vty_success:
+            raise OSError(code, output)
+        return output
+
+    cmd = f'{path_vtysh}'
+    if daemon:
+        cmd += f' -d {daemon}'
+    cmd += f' -c {shlex.quote(command)}'
 
     output, code = util.popen(cmd, stderr=util.STDOUT)
     if code:
@@ -259,13 +590,20 @@ def configure(lines, daemon=False):
     if daemon and daemon not in _frr_daemons:
         raise ValueError(f'The specified daemon type is not supported {repr(daemon)}')
 
+    result = _vty_pool_call('configure', daemon, lines)
+    if result:
+        code, output = result
+        if code not in _vty_success:
+            raise ConfigurationNotValid(f'Configuration FRR failed: {repr(output)}')
+        return output
+
     cmd = f'{path_vtysh}'
     if daemon:
         cmd += f' -d {daemon}'
 
     cmd += " -c 'configure terminal'"
     for x in lines:
-        cmd += f" -c '{x}'"
+        cmd += f' -c {shlex.quote(x)}'
 
     output, code = util.popen(cmd, stderr=util.STDOUT)
     if code == 1:
@@ -401,6 +739,339 @@ def _find_elements(config, pattern, start_at=0):
     return [i for i, element in enumerate(config[start_at:], start=0) if re.match(pattern + '$', element)]
 
 
+_regex_special = set('.^$*+?{}[]\\|()')
+
+
+def _scan_alternatives(pattern):
+    '''Split <pattern> at every "|" that is not nested inside a group or a
+    character class. Returns None for an unbalanced pattern.'''
+    alternatives = []
+    depth = 0
+    last = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            # skip character class, a leading "]" or "^]" is a literal
+            i += 1
+            if i < len(pattern) and pattern[i] == '^':
+                i += 1
+            if i < len(pattern) and pattern[i] == ']':
+                i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            if i >= len(pattern):
+                return None
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth < 0:
+                return None
+        elif c == '|' and depth == 0:
+            alternatives.append(pattern[last:i])
+            last = i + 1
+        i += 1
+    if depth:
+        return None
+    alternatives.append(pattern[last:])
+    return alternatives
+
+
+def _literal_prefixes(pattern):
+    r'''Return the literal text every match of <pattern> starts with, one entry
+    per top level alternative. None is returned if any alternative could match a
+    line which does not start a top level section (indented or empty lines).
+
+    example: r'^router bgp \d+'                   -> ['router bgp ']
+             r'(ip prefix-list .*|route-map .*)'  -> ['ip prefix-list ', 'route-map ']
+             r'(\s+)?ip protocol bgp'              -> None
+    '''
+    if pattern.startswith('^'):
+        pattern = pattern[1:]
+
+    alternatives = _scan_alternatives(pattern)
+    if alternatives is None:
+        return None
+    # unwrap a single group spanning the complete pattern, e.g. (foo|bar)
+    if (len(alternatives) == 1 and pattern.startswith('(') and pattern.endswith(')')
+            and not pattern.startswith('(?')):
+        # the inner part is only balanced if both brackets belong together
+        inner = _scan_alternatives(pattern[1:-1])
+        if inner is not None:
+            alternatives = inner
+
+    prefixes = []
+    for alternative in alternatives:
+        if alternative.startswith('^'):
+            alternative = alternative[1:]
+        prefix = ''
+        for i, c in enumerate(alternative):
+            if c in _regex_special:
+                # the last literal character is optional
+                if c in '*?{':
+                    prefix = prefix[:-1]
+                break
+            prefix += c
+        if not prefix or prefix[0].isspace():
+            return None
+        prefixes.append(prefix)
+    return prefixes
+
+
+def _is_header(line):
+    return bool(line) and not line[0].isspace()
+
+
+class FRRConfigModel:
+    r'''Section indexed representation of a FRR configuration
+
+    Every line starting at column zero opens a new section, which also holds all
+    following indented lines, e.g. "router bgp 65000", "interface eth0",
+    "route-map FOO permit 10", "ip prefix-list BAR seq 5 permit any", "exit" or
+    "!". Sections are indexed by the first keyword of their header, so a search
+    for an anchored pattern like r'^router bgp \d+' only inspects the headers of
+    the "router" sections and the lines of the matching blocks instead of every
+    line of the configuration.
+    '''
+    def __init__(self, lines=[]):
+        self.sections = self._split(lines)
+        self._index = None
+
+    @staticmethod
+    def _split(lines):
+        sections = []
+        for line in lines:
+            if _is_header(line) or not sections:
+                sections.append([line])
+            else:
+                sections[-1].append(line)
+        return sections
+
+    def lines(self):
+        return [line for section in self.sections for line in section]
+
+    def _keys(self):
+        if self._index is None:
+            index = {}
+            for i, section in enumerate(self.sections):
+                if _is_header(section[0]):
+                    index.setdefault(section[0].split(None, 1)[0], []).append(i)
+            self._index = index
+        return self._index
+
+    def _candidates(self, prefixes):
+        '''Ordered section numbers whose header may match one of <prefixes>'''
+        index = self._keys()
+        found = set()
+        for prefix in prefixes:
+            key = prefix.split(None, 1)[0]
+            if key != prefix:
+                # the complete first keyword is part of the prefix
+                found.update(index.get(key, []))
+                continue
+            for k, sections in index.items():
+                if k.startswith(prefix):
+                    found.update(sections)
+        return sorted(found)
+
+    def _find_stop(self, stop_re, start):
+        '''Position (section, offset) of the first line after the header of
+        section <start> matching <stop_re>'''
+        for offset, line in enumerate(self.sections[start][1:], start=1):
+            if stop_re.match(line):
+                return (start, offset)
+        for i in range(start + 1, len(self.sections)):
+            for offset, line in enumerate(self.sections[i]):
+                if stop_re.match(line):
+                    return (i, offset)
+        return None
+
+    def modify_section(self, start_pattern, replacement, stop_pattern, remove_stop_mark, count):
+        '''Replace every block from a line matching <start_pattern> up to the
+        next line matching <stop_pattern> with <replacement> (list of lines).
+        Returns the number of replaced blocks.'''
+        prefixes = _literal_prefixes(start_pattern)
+        if prefixes is None:
+            return self._modify_lines(start_pattern, replacement, stop_pattern,
+                                      remove_stop_mark, count)
+
+        start_re = re.compile(start_pattern + '$')
+        stop_re = re.compile(stop_pattern)
+        blocks = []
+        resume = (0, 0)
+        for start in self._candidates(prefixes):
+            if count and count <= len(blocks):
+                break
+            if (start, 0) < resume or not start_re.match(self.sections[start][0]):
+                continue
+            stop = self._find_stop(stop_re, start)
+            if not stop:
+                break
+            blocks.append((start, stop))
+            resume = (stop[0], stop[1] + 1) if remove_stop_mark else stop
+
+        # Replace from the back so section numbers of pending blocks stay valid
+        for start, (stop, offset) in reversed(blocks):
+            end = offset + 1 if remove_stop_mark else offset
+            self.sections[start:stop + 1] = self._split(replacement + self.sections[stop][end:])
+        if blocks:
+            self._index = None
+        LOG.debug(f'modify_section: replaced {len(blocks)} block(s) {repr(start_pattern)}')
+        return len(blocks)
+
+    def _modify_lines(self, start_pattern, replacement, stop_pattern, remove_stop_mark, count):
+        '''Line based implementation for patterns which might also match
+        lines inside of a section'''
+        start_re = re.compile(start_pattern + '$')
+        stop_re = re.compile(stop_pattern)
+        config = self.lines()
+        _count = 0
+        i = 0
+        while not count or _count < count:
+            start = next((n for n in range(i, len(config)) if start_re.match(config[n])), None)
+            if start is None:
+                break
+            stop = next((n for n in range(start + 1, len(config)) if stop_re.match(config[n])), None)
+            if stop is None:
+                break
+            config[start:stop + 1 if remove_stop_mark else stop] = replacement
+            _count += 1
+            i = start + len(replacement)
+
+        if _count:
+            self.sections = self._split(config)
+            self._index = None
+        LOG.debug(f'modify_section: replaced {_count} block(s) {repr(start_pattern)}')
+        return _count
+
+    def add_before(self, before_pattern, addition):
+        '''Insert the lines of <addition> before the first line matching
+        <before_pattern>. Returns False if no such line exists.'''
+        before_re = re.compile(before_pattern + '$')
+        prefixes = _literal_prefixes(before_pattern)
+        if prefixes is None:
+            config = self.lines()
+            start = next((n for n, line in enumerate(config) if before_re.match(line)), None)
+            if start is None:
+                return False
+            config[start:start] = addition
+            self.sections = self._split(config)
+        else:
+            start = next((s for s in self._candidates(prefixes)
+                          if before_re.match(self.sections[s][0])), None)
+            if start is None:
+                return False
+            self.sections[start:start] = self._split(addition)
+        self._index = None
+        LOG.debug(f'add_before: added {len(addition)} line(s) before {repr(before_pattern)}')
+        return True
+
+
+class FRRTransaction:
+    '''Commit scoped FRR configuration transaction
+
+    While a transaction is active, FRRConfig.load_configuration() and
+    commit_configuration() operate on a working copy per FRR daemon. The
+    running configuration of a daemon is read only once and the changes of
+    all conf_mode scripts are applied by a single frr-reload per daemon, and
+    one save, when the transaction is committed.
+
+    owners lists the scripts which took part in the transaction, so that a
+    failure to commit it can be reported against them.
+    '''
+    def __init__(self):
+        self.original = {}
+        self.staged = {}
+        self.commits = {}
+        self.owners = []
+        self.timing = {'load': {}, 'reload': {}}
+
+    def load(self, daemon):
+        if daemon in self.staged:
+            return self.staged[daemon]
+        if daemon not in self.original:
+            start = time.monotonic()
+            self.original[daemon] = get_configuration(daemon=daemon)
+            self.timing['load'][daemon] = time.monotonic() - start
+        return self.original[daemon]
+
+    def stage(self, daemon, config):
+        if daemon not in _frr_daemons:
+            raise ValueError(f'The specified daemon type is not supported {repr(daemon)}')
+        self.staged[daemon] = config
+        self.commits[daemon] = self.commits.get(daemon, 0) + 1
+
+    def commit(self):
+        '''Apply all staged configurations, daemons are reloaded in the
+        order of _frr_daemons. Returns the timing information.'''
+        start = time.monotonic()
+        changed = False
+        for daemon in sorted(self.staged, key=_frr_daemons.index):
+            # frr-reload of an unchanged configuration is a no-op
+            if self.staged[daemon] == self.original.get(daemon):
+                continue
+            _start = time.monotonic()
+            _commit_configuration(self.staged[daemon], daemon,
+                                  original=self.original.get(daemon))
+            self.timing['reload'][daemon] = time.monotonic() - _start
+            changed = True
+
+        if changed:
+            _start = time.monotonic()
+            # Save configuration to /run/frr/config/frr.conf
+            save_configuration()
+            self.timing['save'] = time.monotonic() - _start
+
+        self.timing['total'] = time.monotonic() - start
+        LOG.debug(f'commit_transaction: {self.timing}')
+        return self.timing
+
+
+_transaction = None
+
+def begin_transaction(owner=None):
+    """ Start a commit scoped transaction, or join the active one
+    owner:  name of the script taking part in the transaction
+    """
+    global _transaction
+    if not _transaction:
+        _transaction = FRRTransaction()
+    if owner and owner not in _transaction.owners:
+        _transaction.owners.append(owner)
+    return _transaction
+
+
+def transaction_active():
+    return _transaction is not None
+
+
+def current_transaction():
+    """ return:  the active FRRTransaction object or None """
+    return _transaction
+
+
+def commit_transaction():
+    """ Apply and close the active transaction
+    return:  FRRTransaction object of the committed transaction or None
+    """
+    global _transaction
+    transaction = _transaction
+    _transaction = None
+    if transaction:
+        transaction.commit()
+    return transaction
+
+
+def abort_transaction():
+    """ Drop all staged changes of the active transaction """
+    global _transaction
+    _transaction = None
+
+
 class FRRConfig:
     '''Main FRR Configuration manipulation object
     Using this object the user could load, manipulate and commit the configuration to FRR
@@ -418,11 +1089,20 @@ class FRRConfig:
             raise ValueError(
                 'The config element needs to be a string or list type object')
 
-        if config:
+        if config and DEBUG:
             LOG.debug(f'__init__: frr library initiated with initial config')
             for i, e in enumerate(self.config):
                 LOG.debug(f'__init__: initial              {i:3} {e}')
 
+    @property
+    def config(self):
+        '''Current configuration as list of lines'''
+        return self._model.lines()
+
+    @config.setter
+    def config(self, lines):
+        self._model = FRRConfigModel(lines)
+
     def load_configuration(self, daemon=None):
         '''Load the running configuration from FRR into the config object
         daemon: str with name of the FRR Daemon to load configuration from or
@@ -432,17 +1112,21 @@ class FRRConfig:
         '''
         init_debugging()
 
-        self.imported_config = get_configuration(daemon=daemon)
+        if _transaction:
+            self.imported_config = _transaction.load(daemon)
+        else:
+            self.imported_config = get_configuration(daemon=daemon)
         if daemon:
             LOG.debug(f'load_configuration: Configuration loaded from FRR daemon {daemon}')
         else:
             LOG.debug(f'load_configuration: Configuration loaded from FRR integrated config')
 
         self.original_config = self.imported_config.split('\n')
-        self.config = self.original_config.copy()
+        self.config = self.original_config
 
-        for i, e in enumerate(self.imported_config.split('\n')):
-            LOG.debug(f'load_configuration:  loaded    {i:3} {e}')
+        if DEBUG:
+            for i, e in enumerate(self.original_config):
+                LOG.debug(f'load_configuration:  loaded    {i:3} {e}')
         return
 
     def test_configuration(self):
@@ -450,7 +1134,7 @@ class FRRConfig:
         This will exception if FRR failes to load the current configuration object
         '''
         LOG.debug('test_configation: Testing configuration')
-        mark_configuration('\n'.join(self.config))
+        mark_configuration(str(self))
 
     def commit_configuration(self, daemon=None):
         '''
@@ -460,24 +1144,20 @@ class FRRConfig:
         Configuration is automatically saved after apply
         '''
         LOG.debug('commit_configuration:  Commiting configuration')
-        for i, e in enumerate(self.config):
-            LOG.debug(f'commit_configuration: new_config {i:3} {e}')
-
-        # https://github.com/FRRouting/frr/issues/10132
-        # https://github.com/FRRouting/frr/issues/10133
-        count = 0
-        count_max = 5
-        while count < count_max:
-            count += 1
-            try:
-                reload_configuration('\n'.join(self.config), daemon=daemon)
-                break
-            except:
-                # we just need to re-try the commit of the configuration
-                # for the listed FRR issues above
-                pass
-        if count >= count_max:
-            raise ConfigurationNotValid(f'Config commit retry counter ({count_max}) exceeded')
+        config = str(self)
+        if DEBUG:
+            for i, e in enumerate(config.split('\n')):
+                LOG.debug(f'commit_configuration: new_config {i:3} {e}')
+
+        if _transaction:
+            # applied once for all scripts by commit_transaction()
+            LOG.debug(f'commit_configuration:  Staging configuration for {daemon}')
+            _transaction.stage(daemon, config)
+            return
+
+        # only a configuration loaded from FRR is known to be active
+        original = self.imported_config if self.imported_config else None
+        _commit_configuration(config, daemon, original=original)
 
         # Save configuration to /run/frr/config/frr.conf
         save_configuration()
@@ -490,37 +1170,10 @@ class FRRConfig:
             return ValueError("The replacement element needs to be a string or list type object")
         LOG.debug(f'modify_section: starting search for {repr(start_pattern)} until {repr(stop_pattern)}')
 
-        _count = 0
-        _next_start = 0
-        while True:
-            if count and count <= _count:
-                # Break out of the loop after specified amount of matches
-                LOG.debug(f'modify_section: reached limit ({_count}), exiting loop at line {_next_start}')
-                break
-            # While searching, always assume that the user wants to search for the exact pattern he entered
-            # To be more specific the user needs a override, eg. a "pattern.*"
-            _w = _find_first_block(
-                self.config, start_pattern+'$', stop_pattern, start_at=_next_start)
-            if not _w:
-                # Reached the end, no more elements to remove
-                LOG.debug(f'modify_section: No more config sections found, exiting')
-                break
-            start_element, end_element = _w
-            LOG.debug(f'modify_section:   found match between {start_element} and {end_element}')
-            for i, e in enumerate(self.config[start_element:end_element+1 if remove_stop_mark else end_element],
-                                  start=start_element):
-                LOG.debug(f'modify_section:   remove       {i:3} {e}')
-            del self.config[start_element:end_element +
-                            1 if remove_stop_mark else end_element]
-            if replacement:
-                # Append the replacement config at the current position
-                for i, e in enumerate(replacement, start=start_element):
-                    LOG.debug(f'modify_section:   add          {i:3} {e}')
-                self.config[start_element:start_element] = replacement
-            _count += 1
-            _next_start = start_element + len(replacement)
-
-        return _count
+        # While searching, always assume that the user wants to search for the exact pattern he entered
+        # To be more specific the user needs a override, eg. a "pattern.*"
+        return self._model.modify_section(start_pattern, replacement, stop_pattern,
+                                          remove_stop_mark, count)
 
     def add_before(self, before_pattern, addition):
         '''Add config block before this element in the configuration'''
@@ -529,16 +1182,10 @@ class FRRConfig:
         elif not isinstance(addition, list):
             return ValueError("The replacement element needs to be a string or list type object")
 
-        start = _find_first_element(self.config, before_pattern)
-        if start < 0:
-            return False
-        for i, e in enumerate(addition, start=start):
-            LOG.debug(f'add_before:   add          {i:3} {e}')
-        self.config[start:start] = addition
-        return True
+        return self._model.add_before(before_pattern, addition)
 
     def __str__(self):
-        return '\n'.join(self.config)
+        return '\n'.join(self._model.lines())
 
     def __repr__(self):
         return f'frr({repr(str(self))})'
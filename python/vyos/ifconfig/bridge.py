@@ -17,12 +17,12 @@ from netifaces import interfaces
 import json
 
 from vyos.ifconfig.interface import Interface
+from vyos.ifconfig.bridgevlan import BridgeVLANBatch
+from vyos.ifconfig.bridgevlan import vlan_ids
 from vyos.validate import assert_boolean
 from vyos.validate import assert_positive
 from vyos.util import cmd
 from vyos.util import dict_search
-from vyos.configdict import get_vlan_ids
-from vyos.configdict import list_diff
 
 @Interface.register
 class BridgeIf(Interface):
@@ -273,28 +273,10 @@ class BridgeIf(Interface):
         self.set_vlan_filter(vlan_filter)
 
         ifname = config['ifname']
-        if int(vlan_filter):
-            add_vlan = []
-            cur_vlan_ids = get_vlan_ids(ifname)
-
-            tmp = dict_search('vif', config)
-            if tmp:
-                for vif, vif_config in tmp.items():
-                    add_vlan.append(vif)
-
-            # Remove redundant VLANs from the system
-            for vlan in list_diff(cur_vlan_ids, add_vlan):
-                cmd = f'bridge vlan del dev {ifname} vid {vlan} self'
-                self._cmd(cmd)
-
-            for vlan in add_vlan:
-                cmd = f'bridge vlan add dev {ifname} vid {vlan} self'
-                self._cmd(cmd)
-
-            # VLAN of bridge parent interface is always 1
-            # VLAN 1 is the default VLAN for all unlabeled packets
-            cmd = f'bridge vlan add dev {ifname} vid 1 pvid untagged self'
-            self._cmd(cmd)
+        # VLANs of the bridge and its ports are programmed all at once, once
+        # the ports are enslaved
+        vlans = BridgeVLANBatch(self.debug)
+        vlan_ports = []
 
         tmp = dict_search('member.interface', config)
         if tmp:
@@ -332,38 +314,17 @@ class BridgeIf(Interface):
                     lower.set_path_priority(value)
 
                 if int(vlan_filter):
-                    add_vlan = []
-                    native_vlan_id = None
-                    allowed_vlan_ids= []
-                    cur_vlan_ids = get_vlan_ids(interface)
-
-                    if 'native_vlan' in interface_config:
-                        vlan_id = interface_config['native_vlan']
-                        add_vlan.append(vlan_id)
-                        native_vlan_id = vlan_id
-
-                    if 'allowed_vlan' in interface_config:
-                        for vlan in interface_config['allowed_vlan']:
-                            vlan_range = vlan.split('-')
-                            if len(vlan_range) == 2:
-                                for vlan_add in range(int(vlan_range[0]),int(vlan_range[1]) + 1):
-                                    add_vlan.append(str(vlan_add))
-                                    allowed_vlan_ids.append(str(vlan_add))
-                            else:
-                                add_vlan.append(vlan)
-                                allowed_vlan_ids.append(vlan)
-
-                    # Remove redundant VLANs from the system
-                    for vlan in list_diff(cur_vlan_ids, add_vlan):
-                        cmd = f'bridge vlan del dev {interface} vid {vlan} master'
-                        self._cmd(cmd)
-
-                    for vlan in allowed_vlan_ids:
-                        cmd = f'bridge vlan add dev {interface} vid {vlan} master'
-                        self._cmd(cmd)
-                    # Setting native VLAN to system
-                    if native_vlan_id:
-                        cmd = f'bridge vlan add dev {interface} vid {native_vlan_id} pvid untagged master'
-                        self._cmd(cmd)
+                    vlan_ports.append((interface, interface_config))
+
+        if int(vlan_filter):
+            # VLAN of bridge parent interface is always 1
+            # VLAN 1 is the default VLAN for all unlabeled packets
+            vlans.port(ifname, vlan_ids(dict_search('vif', config) or {}), pvid=1, flag='self')
+
+            for interface, interface_config in vlan_ports:
+                vlans.port(interface, vlan_ids(interface_config.get('allowed_vlan')),
+                           pvid=interface_config.get('native_vlan'), flag='master')
+
+            vlans.apply()
 
         super().update(config)
@@ -0,0 +1,136 @@
+# Copyright 2022 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+from vyos.util import cmd
+
+# flags of a VLAN which is the port VLAN ID and sent untagged
+_native = {'PVID', 'Egress Untagged'}
+
+
+def vlan_ids(vlans):
+    """
+    set of VLAN ids from CLI values such as ['10', '100-200']
+
+    Example:
+    >>> vlan_ids(['10', '20-22'])
+    {10, 20, 21, 22}
+    """
+    vids = set()
+    for vlan in vlans or []:
+        start, _, stop = str(vlan).partition('-')
+        vids.update(range(int(start), int(stop or start) + 1))
+    return vids
+
+
+def vlan_ranges(vids):
+    """
+    sorted list of "vid" arguments covering all VLAN ids, using the range
+    syntax for consecutive ids
+
+    Example:
+    >>> vlan_ranges({1, 2, 3, 10})
+    ['1-3', '10']
+    """
+    ranges = []
+    start = stop = None
+    for vid in sorted(vids):
+        if stop is not None and vid == stop + 1:
+            stop = vid
+            continue
+        if start is not None:
+            ranges.append(f'{start}-{stop}' if start != stop else f'{start}')
+        start = stop = vid
+    if start is not None:
+        ranges.append(f'{start}-{stop}' if start != stop else f'{start}')
+    return ranges
+
+
+def get_vlan_state():
+    """
+    VLANs of all bridges and bridge ports from a single "bridge vlan show"
+    return a dict() interface name -> {vid: set of flags}
+    """
+    state = {}
+    for entry in json.loads(cmd('bridge -json -compressvlans vlan show') or '[]'):
+        vlans = state.setdefault(entry['ifname'], {})
+        for vlan in entry.get('vlans', []):
+            flags = set(vlan.get('flags', []))
+            for vid in range(vlan['vlan'], vlan.get('vlanEnd', vlan['vlan']) + 1):
+                vlans[vid] = flags
+    return state
+
+
+class BridgeVLANBatch:
+    """
+    Collect the VLAN changes of bridges and bridge ports and apply them with
+    a single "bridge -batch" run. Only the difference to the VLANs currently
+    programmed is applied, consecutive VLAN ids are sent as one range.
+
+    Example:
+    >>> batch = BridgeVLANBatch()
+    >>> batch.port('eth1', vlan_ids(['2-4094']), pvid='1')
+    >>> batch.apply()
+    """
+    def __init__(self, debug=''):
+        self.debug = debug
+        self.commands = []
+        self._state = None
+
+    @property
+    def state(self):
+        # read on first use, bridge ports must be enslaved before
+        if self._state is None:
+            self._state = get_vlan_state()
+        return self._state
+
+    def port(self, ifname, tagged, pvid=None, flag='master'):
+        """
+        Program the VLANs of a bridge port (flag 'master') or of the bridge
+        itself (flag 'self')
+        ifname:  interface name
+        tagged:  set of VLAN ids to allow tagged
+        pvid:    VLAN id to use for untagged frames, if any
+        """
+        current = self.state.get(ifname, {})
+        pvid = int(pvid) if pvid is not None else None
+        desired = set(tagged) | ({pvid} if pvid is not None else set())
+
+        remove = set(current) - desired
+        # VLANs already present without flags are left alone, a VLAN with
+        # flags (the previous native VLAN) is added again to reset them
+        add = {vid for vid in tagged if vid != pvid and current.get(vid, None) != set()}
+
+        for vid in vlan_ranges(remove):
+            self.commands.append(f'vlan del dev {ifname} vid {vid} {flag}')
+        for vid in vlan_ranges(add):
+            self.commands.append(f'vlan add dev {ifname} vid {vid} {flag}')
+        if pvid is not None and current.get(pvid) != _native:
+            self.commands.append(f'vlan add dev {ifname} vid {pvid} pvid untagged {flag}')
+
+        # keep the cached state in line for further calls on the same port
+        vlans = {vid: set() for vid in tagged}
+        if pvid is not None:
+            vlans[pvid] = set(_native)
+        self.state[ifname] = vlans
+
+    def apply(self):
+        """ run all collected commands, return the number of commands """
+        count = len(self.commands)
+        if self.commands:
+            cmd('bridge -batch -', self.debug, input='\n'.join(self.commands) + '\n')
+            self.commands = []
+        return count
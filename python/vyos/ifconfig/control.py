@@ -15,21 +15,80 @@
 
 import os
 
+from contextlib import contextmanager
 from inspect import signature
 from inspect import _empty
 
 from vyos.ifconfig.section import Section
+from vyos.ifconfig import netlink
 from vyos.util import popen
 from vyos.util import cmd
 from vyos.util import read_file
 from vyos.util import write_file
 from vyos import debug
 
+class SysfsBatch:
+    """
+    Collect the sysfs/procfs writes of an interface (or several) and apply
+    them at once: every file is read at most once and only written when the
+    desired value differs from the current one.
+
+    The counters of all batches of the process are kept in SysfsBatch.totals
+    and reported through the 'ifconfig' debug flag.
+    """
+    totals = {'read': 0, 'applied': 0, 'skipped': 0}
+
+    def __init__(self, debug=lambda message: None):
+        self._debug = debug
+        self.current = {}
+        self.pending = {}
+        self.counters = {'read': 0, 'applied': 0, 'skipped': 0}
+
+    def _count(self, counter):
+        self.counters[counter] += 1
+        self.totals[counter] += 1
+
+    def read(self, filename):
+        """ value of a file, the pending value if a write is queued """
+        if filename in self.pending:
+            return self.pending[filename]
+        if filename not in self.current:
+            self.current[filename] = read_file(filename)
+            self._count('read')
+        return self.current[filename]
+
+    def write(self, filename, value):
+        """ queue a write, a later write to the same file replaces it """
+        self.pending.pop(filename, None)
+        self.pending[filename] = str(value)
+
+    def flush(self):
+        """ apply the queued writes in order, return the counters of this batch """
+        pending, self.pending = self.pending, {}
+        for filename, value in pending.items():
+            if self.read(filename) == value:
+                self._count('skipped')
+                continue
+            write_file(filename, value)
+            self.current[filename] = value
+            self._count('applied')
+            self._debug(f"write '{value}' > '{filename}'")
+        self._debug('sysfs batch: {read} read, {applied} applied, '
+                    '{skipped} skipped'.format(**self.counters))
+        return self.counters
+
+
 class Control(Section):
     _command_get = {}
     _command_set = {}
     _signature = {}
 
+    # attribute name -> key of the netlink.get_link() dict
+    _netlink_get = {}
+    # attribute name -> {'key': keyword argument of netlink.set_link(),
+    # 'convert': optional, replaces the convert of _command_set}
+    _netlink_set = {}
+
     def __init__(self, **kargs):
         # some commands (such as operation comands - show interfaces, etc.)
         # need to query the interface statistics. If the interface
@@ -46,9 +105,12 @@ class Control(Section):
         return debug.message(message, self.debug)
 
     def _popen(self, command):
+        # the command could change any link
+        netlink.invalidate()
         return popen(command, self.debug)
 
     def _cmd(self, command):
+        netlink.invalidate()
         return cmd(command, self.debug)
 
     def _get_command(self, config, name):
@@ -109,15 +171,81 @@ class Control(Section):
         cmd = self._command_set[name]['shellcmd'].format(**config)
         return self._command_set[name].get('format', lambda _: _)(self._cmd(cmd))
 
+    def _get_netlink(self, config, name):
+        """
+        Using the defined names, get data from the cached netlink link attributes.
+        """
+        key = self._netlink_get[name]
+        # link states change outside of this process, never use the cache
+        link = netlink.get_link(config['ifname'], cached=key not in netlink.volatile)
+        return link[key]
+
+    def _set_netlink(self, config, name, value):
+        """
+        Using the defined names, set data with a netlink request.
+        """
+        # the code can pass int as int
+        value = str(value)
+
+        # shares the validation and conversion of the command
+        command = self._command_set.get(name, {})
+        validate = command.get('validate', None)
+        if validate:
+            try:
+                validate(**self._values(name, validate, value))
+            except Exception as e:
+                raise e.__class__(f'Could not set {name}. {e}')
+
+        convert = self._netlink_set[name].get('convert', command.get('convert', None))
+        if convert:
+            value = convert(value)
+
+        possible = command.get('possible', None)
+        if possible and not possible(config['ifname'], value):
+            return False
+
+        self._debug_msg(f"netlink set {config['ifname']} {name} '{value}'")
+        netlink.set_link(config['ifname'], **{self._netlink_set[name]['key']: value})
+        return None
+
     _sysfs_get = {}
     _sysfs_set = {}
 
+    # the SysfsBatch in use, see sysfs_batch()
+    _sysfs_batch = None
+
+    @contextmanager
+    def sysfs_batch(self):
+        """
+        Queue all sysfs writes made within the context and apply them when
+        leaving it, skipping the files already holding the desired value.
+
+        Example:
+        >>> with Interface('eth0').sysfs_batch() as batch:
+        ...     ...
+        >>> batch.counters
+        {'read': 14, 'applied': 1, 'skipped': 3}
+        """
+        if self._sysfs_batch is not None:
+            # nested, the outer context applies the writes
+            yield self._sysfs_batch
+            return
+
+        batch = self._sysfs_batch = SysfsBatch(self._debug_msg)
+        try:
+            yield batch
+        finally:
+            self._sysfs_batch = None
+            batch.flush()
+
     def _read_sysfs(self, filename):
         """
         Provide a single primitive w/ error checking for reading from sysfs.
         """
         value = None
         if os.path.exists(filename):
+            if self._sysfs_batch is not None:
+                return self._sysfs_batch.read(filename)
             value = read_file(filename)
             self._debug_msg("read '{}' < '{}'".format(value, filename))
         return value
@@ -127,6 +255,9 @@ class Control(Section):
         Provide a single primitive w/ error checking for writing to sysfs.
         """
         if os.path.isfile(filename):
+            if self._sysfs_batch is not None:
+                self._sysfs_batch.write(filename, value)
+                return True
             write_file(filename, str(value))
             self._debug_msg("write '{}' > '{}'".format(value, filename))
             return True
@@ -172,6 +303,8 @@ class Control(Section):
     def get_interface(self, name):
         if name in self._sysfs_get:
             return self._get_sysfs(self.config, name)
+        if name in self._netlink_get and netlink.available():
+            return self._get_netlink(self.config, name)
         if name in self._command_get:
             return self._get_command(self.config, name)
         raise KeyError(f'{name} is not a attribute of the interface we can get')
@@ -179,6 +312,8 @@ class Control(Section):
     def set_interface(self, name, value):
         if name in self._sysfs_set:
             return self._set_sysfs(self.config, name, value)
+        if name in self._netlink_set and netlink.available():
+            return self._set_netlink(self.config, name, value)
         if name in self._command_set:
             return self._set_command(self.config, name, value)
         raise KeyError(f'{name} is not a attribute of the interface we can set')
@@ -0,0 +1,223 @@
+# Copyright 2022 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import mmap
+import time
+import struct
+
+from vyos.ifconfig.operational import Operational
+
+
+def counter_delta(previous, now, bits=64):
+    """
+    difference between two samples of a counter of the given width: a 64 bit
+    counter going backwards was reset (e.g. the interface was re-created),
+    only 32 bit counters are expected to wrap
+    """
+    if now >= previous:
+        return now - previous
+    if bits == 32:
+        return (1 << 32) - previous + now
+    return now
+
+
+def rates(older, newer):
+    """
+    per second rates of all counters between two (timestamp, stats) samples
+    return a dict() with the same keys as the stats, None if no time elapsed
+    """
+    elapsed = newer[0] - older[0]
+    if elapsed <= 0:
+        return None
+    return {name: counter_delta(older[1][name], value) / elapsed
+            for name, value in newer[1].items()}
+
+
+class CounterHistory:
+    """
+    Fixed size ring buffer of interface counter samples, stored in a flat
+    file which is memory mapped so the collector and any number of readers
+    share it without parsing.
+
+    The file starts with a header (magic, version, number of slots, next
+    slot to write, number of valid samples, sequence) followed by the slots,
+    each one holding the sample timestamp and the Operational._stats_all
+    counters as native integers.
+
+    The sequence is a seqlock: it is odd while the collector writes a
+    sample, readers retry when it is odd or changed during their read.
+
+    Example:
+    >>> from vyos.ifconfig.history import CounterHistory
+    >>> history = CounterHistory('eth0')
+    >>> history.summary(300)['rx_bytes']
+    {'min': 0.0, 'avg': 1250.5, 'max': 4200.0}
+    """
+
+    directory = '/run/vyos/counters'
+
+    magic = b'VYOSHIST'
+    version = 2
+    # attempts of a reader to get a consistent copy of the samples
+    retries = 100
+
+    _header = struct.Struct('=8sIIIIQ')
+    _counters = Operational._stats_all
+    _slot = struct.Struct('=d' + 'Q' * len(_counters))
+
+    @classmethod
+    def filename(cls, ifname):
+        return os.path.join(cls.directory, f'{ifname}.hist')
+
+    @classmethod
+    def histories(cls):
+        """ interfaces having a counter history """
+        if not os.path.isdir(cls.directory):
+            return []
+        return [f[:-len('.hist')] for f in os.listdir(cls.directory) if f.endswith('.hist')]
+
+    def __init__(self, ifname, slots=60, create=False):
+        """
+        ifname: interface name
+        slots:  number of samples kept when the history is created, an
+                existing history keeps its size
+        create: create (or resize) the history file if needed, readers
+                must not create it
+        """
+        self.ifname = ifname
+        self._mmap = None
+
+        filename = self.filename(ifname)
+        size = self._header.size + slots * self._slot.size
+
+        if create:
+            os.makedirs(self.directory, exist_ok=True)
+            fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o644)
+        else:
+            fd = os.open(filename, os.O_RDONLY)
+
+        try:
+            current = os.fstat(fd).st_size
+            if create and not self._valid(fd, current, slots):
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, self._header.pack(self.magic, self.version, slots, 0, 0, 0), 0)
+                current = size
+            if current < self._header.size:
+                raise ValueError(f'invalid counter history for {ifname}')
+            access = mmap.ACCESS_WRITE if create else mmap.ACCESS_READ
+            self._mmap = mmap.mmap(fd, current, access=access)
+        finally:
+            os.close(fd)
+
+        magic, version, self.slots, _, _, _ = self._header.unpack_from(self._mmap, 0)
+        if magic != self.magic or version != self.version or \
+                current < self._header.size + self.slots * self._slot.size:
+            self.close()
+            raise ValueError(f'invalid counter history for {ifname}')
+
+    def _valid(self, fd, size, slots):
+        """ check an existing file can be reused as is """
+        if size != self._header.size + slots * self._slot.size:
+            return False
+        magic, version, current, _, _, _ = self._header.unpack(os.pread(fd, self._header.size, 0))
+        return magic == self.magic and version == self.version and current == slots
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def append(self, timestamp, stats):
+        """ record a sample, overwriting the oldest one once the buffer is full """
+        _, _, slots, head, count, sequence = self._header.unpack_from(self._mmap, 0)
+        values = [stats.get(name, 0) & 0xffffffffffffffff for name in self._counters]
+        # odd sequence: readers retry until the sample is fully written
+        self._header.pack_into(self._mmap, 0, self.magic, self.version, slots,
+                               head, count, sequence + 1)
+        self._slot.pack_into(self._mmap, self._header.size + head * self._slot.size,
+                             timestamp, *values)
+        self._header.pack_into(self._mmap, 0, self.magic, self.version, slots,
+                               (head + 1) % slots, min(count + 1, slots), sequence + 2)
+
+    def _read(self, slots, head, count):
+        """ samples of the given header values, possibly inconsistent """
+        samples = []
+        for index in range(head - count, head):
+            offset = self._header.size + (index % slots) * self._slot.size
+            timestamp, *values = self._slot.unpack_from(self._mmap, offset)
+            samples.append((timestamp, dict(zip(self._counters, values))))
+        return samples
+
+    def samples(self):
+        """ list of (timestamp, stats) tuples, oldest first """
+        for _ in range(self.retries):
+            _, _, slots, head, count, sequence = self._header.unpack_from(self._mmap, 0)
+            if not sequence & 1:
+                samples = self._read(slots, head, count)
+                if self._header.unpack_from(self._mmap, 0)[-1] == sequence:
+                    return samples
+            # the collector is writing a sample
+            time.sleep(0.001)
+        raise ValueError(f'counter history of {self.ifname} is being written')
+
+    def rates(self, window=None):
+        """
+        list of (timestamp, rates) between consecutive samples, oldest
+        first, restricted to the last <window> seconds when provided
+        """
+        samples = self.samples()
+        if window is not None and samples:
+            start = samples[-1][0] - window
+            # keep the sample preceding the window to rate its first interval
+            while len(samples) > 1 and samples[1][0] <= start:
+                samples.pop(0)
+        history = []
+        for older, newer in zip(samples, samples[1:]):
+            rate = rates(older, newer)
+            if rate is not None:
+                history.append((newer[0], rate))
+        return history
+
+    def current(self):
+        """ rates between the two most recent samples, None if unknown """
+        history = self.rates()
+        return history[-1][1] if history else None
+
+    def summary(self, window=None):
+        """
+        min/avg/max rate of every counter over the last <window> seconds
+        return a dict() {counter: {'min': .., 'avg': .., 'max': ..}},
+        None if less than two samples are available
+        """
+        history = self.rates(window)
+        if not history:
+            return None
+        summary = {}
+        for name in self._counters:
+            values = [rate[name] for _, rate in history]
+            summary[name] = {
+                'min': min(values),
+                'avg': sum(values) / len(values),
+                'max': max(values),
+            }
+        return summary
@@ -31,7 +31,6 @@ from netifaces import AF_INET6
 from vyos import ConfigError
 from vyos.configdict import list_diff
 from vyos.configdict import dict_merge
-from vyos.configdict import get_vlan_ids
 from vyos.template import render
 from vyos.util import mac2eui64
 from vyos.util import dict_search
@@ -50,7 +49,10 @@ from vyos.validate import assert_mtu
 from vyos.validate import assert_positive
 from vyos.validate import assert_range
 
+from vyos.ifconfig import netlink
 from vyos.ifconfig.control import Control
+from vyos.ifconfig.bridgevlan import BridgeVLANBatch
+from vyos.ifconfig.bridgevlan import vlan_ids
 from vyos.ifconfig.vrrp import VRRP
 from vyos.ifconfig.operational import Operational
 from vyos.ifconfig import Section
@@ -115,6 +117,27 @@ class Interface(Control):
         },
     }
 
+    # served from netlink instead of _command_get/_command_set when available
+    _netlink_get = {
+        'admin_state': 'admin_state',
+        'alias': 'alias',
+        'mac': 'mac',
+        'min_mtu': 'min_mtu',
+        'max_mtu': 'max_mtu',
+        'mtu': 'mtu',
+        'oper_state': 'oper_state',
+        'vrf': 'master',
+    }
+
+    _netlink_set = {
+        'admin_state': {'key': 'state'},
+        'alias': {'key': 'alias'},
+        'mac': {'key': 'address'},
+        'mtu': {'key': 'mtu'},
+        # the command converts to "master <vrf>" or "nomaster"
+        'vrf': {'key': 'master', 'convert': lambda v: v if v else ''},
+    }
+
     _command_set = {
         'admin_state': {
             'validate': lambda v: assert_list(v, ['up', 'down']),
@@ -1181,39 +1204,10 @@ class Interface(Control):
             bridge_vlan_filter = Section.klass(bridge)(bridge, create=True).get_vlan_filter()
 
             if int(bridge_vlan_filter):
-                cur_vlan_ids = get_vlan_ids(ifname)
-                add_vlan = []
-                native_vlan_id = None
-                allowed_vlan_ids= []
-
-                if 'native_vlan' in bridge_config:
-                    vlan_id = bridge_config['native_vlan']
-                    add_vlan.append(vlan_id)
-                    native_vlan_id = vlan_id
-
-                if 'allowed_vlan' in bridge_config:
-                    for vlan in bridge_config['allowed_vlan']:
-                        vlan_range = vlan.split('-')
-                        if len(vlan_range) == 2:
-                            for vlan_add in range(int(vlan_range[0]),int(vlan_range[1]) + 1):
-                                add_vlan.append(str(vlan_add))
-                                allowed_vlan_ids.append(str(vlan_add))
-                        else:
-                            add_vlan.append(vlan)
-                            allowed_vlan_ids.append(vlan)
-
-                # Remove redundant VLANs from the system
-                for vlan in list_diff(cur_vlan_ids, add_vlan):
-                    cmd = f'bridge vlan del dev {ifname} vid {vlan} master'
-                    self._cmd(cmd)
-
-                for vlan in allowed_vlan_ids:
-                    cmd = f'bridge vlan add dev {ifname} vid {vlan} master'
-                    self._cmd(cmd)
-                # Setting native VLAN to system
-                if native_vlan_id:
-                    cmd = f'bridge vlan add dev {ifname} vid {native_vlan_id} pvid untagged master'
-                    self._cmd(cmd)
+                vlans = BridgeVLANBatch(self.debug)
+                vlans.port(ifname, vlan_ids(bridge_config.get('allowed_vlan')),
+                           pvid=bridge_config.get('native_vlan'), flag='master')
+                vlans.apply()
 
     def set_dhcp(self, enable):
         """
@@ -1365,6 +1359,10 @@ class Interface(Control):
             import pprint
             pprint.pprint(config)
 
+        # start from fresh link attributes, they are then read once through
+        # netlink for this update and only fetched again after a change
+        netlink.invalidate()
+
         # Cache the configuration - it will be reused inside e.g. DHCP handler
         # XXX: maybe pass the option via __init__ in the future and rename this
         # method to apply()?
@@ -1451,72 +1449,75 @@ class Interface(Control):
         value = tmp if (tmp != None) else '0'
         self.set_tcp_ipv6_mss(value)
 
-        # Configure ARP cache timeout in milliseconds - has default value
-        tmp = dict_search('ip.arp_cache_timeout', config)
-        value = tmp if (tmp != None) else '30'
-        self.set_arp_cache_tmo(value)
-
-        # Configure ARP filter configuration
-        tmp = dict_search('ip.disable_arp_filter', config)
-        value = '0' if (tmp != None) else '1'
-        self.set_arp_filter(value)
-
-        # Configure ARP accept
-        tmp = dict_search('ip.enable_arp_accept', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_arp_accept(value)
-
-        # Configure ARP announce
-        tmp = dict_search('ip.enable_arp_announce', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_arp_announce(value)
-
-        # Configure ARP ignore
-        tmp = dict_search('ip.enable_arp_ignore', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_arp_ignore(value)
-
-        # Enable proxy-arp on this interface
-        tmp = dict_search('ip.enable_proxy_arp', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_proxy_arp(value)
-
-        # Enable private VLAN proxy ARP on this interface
-        tmp = dict_search('ip.proxy_arp_pvlan', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_proxy_arp_pvlan(value)
-
-        # IPv4 forwarding
-        tmp = dict_search('ip.disable_forwarding', config)
-        value = '0' if (tmp != None) else '1'
-        self.set_ipv4_forwarding(value)
-
-        # IPv4 source-validation
-        tmp = dict_search('ip.source_validation', config)
-        value = tmp if (tmp != None) else '0'
-        self.set_ipv4_source_validation(value)
-
-        # IPv6 forwarding
-        tmp = dict_search('ipv6.disable_forwarding', config)
-        value = '0' if (tmp != None) else '1'
-        self.set_ipv6_forwarding(value)
-
-        # IPv6 router advertisements
-        tmp = dict_search('ipv6.address.autoconf', config)
-        value = '2' if (tmp != None) else '1'
-        if 'dhcpv6' in new_addr:
-            value = '2'
-        self.set_ipv6_accept_ra(value)
-
-        # IPv6 address autoconfiguration
-        tmp = dict_search('ipv6.address.autoconf', config)
-        value = '1' if (tmp != None) else '0'
-        self.set_ipv6_autoconf(value)
-
-        # IPv6 Duplicate Address Detection (DAD) tries
-        tmp = dict_search('ipv6.dup_addr_detect_transmits', config)
-        value = tmp if (tmp != None) else '1'
-        self.set_ipv6_dad_messages(value)
+        # The sysctl settings below are read once and only written when they
+        # differ from the kernel, applied all at once when leaving the block
+        with self.sysfs_batch():
+            # Configure ARP cache timeout in milliseconds - has default value
+            tmp = dict_search('ip.arp_cache_timeout', config)
+            value = tmp if (tmp != None) else '30'
+            self.set_arp_cache_tmo(value)
+
+            # Configure ARP filter configuration
+            tmp = dict_search('ip.disable_arp_filter', config)
+            value = '0' if (tmp != None) else '1'
+            self.set_arp_filter(value)
+
+            # Configure ARP accept
+            tmp = dict_search('ip.enable_arp_accept', config)
+            value = '1' if (tmp != None) else '0'
+            self.set_arp_accept(value)
+
+            # Configure ARP announce
+            tmp = dict_search('ip.enable_arp_announce', config)
+            value = '1' if (tmp != None) else '0'
+            self.set_arp_announce(value)
+
+            # Configure ARP ignore
+            tmp = dict_search('ip.enable_arp_ignore', config)
+            value = '1' if (tmp != None) else '0'
+            self.set_arp_ignore(value)
+
+            # Enable proxy-arp on this interface
+            tmp = dict_search('ip.enable_proxy_arp', config)
+            value = '1' if (tmp != None) else '0'
+            self.set_proxy_arp(value)
+
+            # Enable private VLAN proxy ARP on this interface
+            tmp = dict_search('ip.proxy_arp_pvlan', config)
+            value = '1' if (tmp != None) else '0'
+            self.set_proxy_arp_pvlan(value)
+
+            # IPv4 forwarding
+            tmp = dict_search('ip.disable_forwarding', config)
+            value = '0' if (tmp != None) else '1'
+            self.set_ipv4_forwarding(value)
+
+            # IPv4 source-validation
+            tmp = dict_search('ip.source_validation', config)
+            value = tmp if (tmp != None) else '0'
+            self.set_ipv4_source_validation(value)
+
+            # IPv6 forwarding
+            tmp = dict_search('ipv6.disable_forwarding', config)
+            value = '0' if (tmp != None) else '1'
+            self.set_ipv6_forwarding(value)
+
+            # IPv6 router advertisements
+            tmp = dict_search('ipv6.address.autoconf', config)
+            value = '2' if (tmp != None) else '1'
+            if 'dhcpv6' in new_addr:
+                value = '2'
+            self.set_ipv6_accept_ra(value)
+
+            # IPv6 address autoconfiguration
+            tmp = dict_search('ipv6.address.autoconf', config)
+            value = '1' if (tmp != None) else '0'
+            self.set_ipv6_autoconf(value)
+
+            # IPv6 Duplicate Address Detection (DAD) tries
+            tmp = dict_search('ipv6.dup_addr_detect_transmits', config)
+            value = tmp if (tmp != None) else '1'
+            self.set_ipv6_dad_messages(value)
 
         # MTU - Maximum Transfer Unit
         if 'mtu' in config:
@@ -0,0 +1,263 @@
+# Copyright 2022 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Minimal in-process rtnetlink client to read and change the basic link
+attributes of an interface without forking "ip" for every call.
+
+Link attributes are cached per interface name, the cache is dropped for an
+interface when it is changed through this module and completely whenever
+the Control layer runs a command, as the command could change any link.
+The cache is a snapshot for the time of one Interface.update() or one
+script run (vyos-configd drops it before every script), and the link
+states are never served from it.
+"""
+
+import os
+import errno
+import socket
+import struct
+import ipaddress
+
+# linux/netlink.h
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_ACK = 0x4
+NLM_F_DUMP = 0x300
+
+# linux/rtnetlink.h
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+
+# linux/if_link.h
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_MTU = 4
+IFLA_MASTER = 10
+IFLA_OPERSTATE = 16
+IFLA_IFALIAS = 20
+IFLA_MIN_MTU = 50
+IFLA_MAX_MTU = 51
+
+# linux/if.h
+IFF_UP = 0x1
+
+# RFC 2863 operational states, as reported by ip
+operstates = ['UNKNOWN', 'NOTPRESENT', 'DOWN', 'LOWERLAYERDOWN', 'TESTING', 'DORMANT', 'UP']
+
+_nlmsghdr = struct.Struct('=IHHII')
+_ifinfomsg = struct.Struct('=BxHiII')
+_rtattr = struct.Struct('=HH')
+_u32 = struct.Struct('=I')
+_error = struct.Struct('=i')
+
+# set to False to use the ip command for everything
+enabled = True
+
+_socket = None
+_sequence = 0
+_links = {}
+
+# attributes changed outside of the process (carrier, admin state changed
+# by daemons), always read from the kernel
+volatile = ['admin_state', 'oper_state']
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def _attribute(kind, data):
+    length = _rtattr.size + len(data)
+    return _rtattr.pack(length, kind) + data + b'\0' * (_align(length) - length)
+
+
+def _attributes(data):
+    """ dict() of attribute type to raw value """
+    attributes = {}
+    offset = 0
+    while offset + _rtattr.size <= len(data):
+        length, kind = _rtattr.unpack_from(data, offset)
+        if length < _rtattr.size:
+            break
+        # the upper bits flag nested and byte order
+        attributes[kind & 0x3fff] = data[offset + _rtattr.size:offset + length]
+        offset += _align(length)
+    return attributes
+
+
+def _string(value):
+    return value.split(b'\0', 1)[0].decode(errors='replace')
+
+
+def _address(value):
+    # tunnels use their IP as link layer address, ip shows it the same way
+    if len(value) in (4, 16):
+        return str(ipaddress.ip_address(value))
+    return ':'.join(f'{byte:02x}' for byte in value)
+
+
+def _open():
+    global _socket
+    if _socket is None:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_CLOEXEC,
+                             socket.NETLINK_ROUTE)
+        sock.bind((0, 0))
+        _socket = sock
+    return _socket
+
+
+def available():
+    """ True if rtnetlink can be used in this process """
+    if not enabled:
+        return False
+    try:
+        _open()
+        return True
+    except OSError:
+        return False
+
+
+def _request(kind, flags, payload):
+    """
+    send a request, return the payloads of all the answers of type <kind>
+    raise OSError with the errno reported by the kernel
+    """
+    global _sequence
+    _sequence = (_sequence + 1) & 0xffffffff
+    sock = _open()
+    sock.send(_nlmsghdr.pack(_nlmsghdr.size + len(payload), kind,
+                             NLM_F_REQUEST | flags, _sequence, 0) + payload)
+
+    answers = []
+    while True:
+        data = sock.recv(65536)
+        offset = 0
+        while offset + _nlmsghdr.size <= len(data):
+            length, msgtype, _, sequence, _ = _nlmsghdr.unpack_from(data, offset)
+            if length < _nlmsghdr.size:
+                raise OSError(errno.EPROTO, 'invalid netlink message')
+            body = data[offset + _nlmsghdr.size:offset + length]
+            offset += _align(length)
+            if sequence != _sequence:
+                # left over of an earlier interrupted request
+                continue
+            if msgtype == NLMSG_DONE:
+                return answers
+            if msgtype == NLMSG_ERROR:
+                code = -_error.unpack_from(body)[0]
+                if code:
+                    raise OSError(code, os.strerror(code))
+                # acknowledgement
+                return answers
+            answers.append(body)
+        if not flags & NLM_F_DUMP and answers:
+            return answers
+
+
+def _link(body):
+    family, iftype, index, flags, change = _ifinfomsg.unpack_from(body)
+    attributes = _attributes(body[_ifinfomsg.size:])
+    link = {
+        'ifindex': index,
+        'flags': flags,
+        'ifname': _string(attributes.get(IFLA_IFNAME, b'')),
+        'admin_state': 'up' if flags & IFF_UP else 'down',
+        'alias': _string(attributes.get(IFLA_IFALIAS, b'')),
+        'master': None,
+        'mac': None,
+        'oper_state': 'UNKNOWN',
+    }
+    for key, kind in (('mtu', IFLA_MTU), ('min_mtu', IFLA_MIN_MTU), ('max_mtu', IFLA_MAX_MTU)):
+        if kind in attributes:
+            link[key] = _u32.unpack(attributes[kind][:4])[0]
+    if IFLA_ADDRESS in attributes:
+        link['mac'] = _address(attributes[IFLA_ADDRESS])
+    if IFLA_OPERSTATE in attributes:
+        state = attributes[IFLA_OPERSTATE][0]
+        link['oper_state'] = operstates[state] if state < len(operstates) else 'UNKNOWN'
+    if IFLA_MASTER in attributes:
+        master = _u32.unpack(attributes[IFLA_MASTER][:4])[0]
+        try:
+            link['master'] = socket.if_indextoname(master)
+        except OSError:
+            pass
+    return link
+
+
+def _ifinfo(flags=0, change=0):
+    return _ifinfomsg.pack(socket.AF_UNSPEC, 0, 0, flags, change)
+
+
+def get_links():
+    """ link attributes of all interfaces with a single dump, also refreshes the cache """
+    links = {}
+    for body in _request(RTM_GETLINK, NLM_F_DUMP, _ifinfo()):
+        link = _link(body)
+        links[link['ifname']] = link
+    _links.clear()
+    _links.update(links)
+    return links
+
+
+def get_link(ifname, cached=True):
+    """
+    link attributes of an interface as a dict() with the keys ifindex,
+    ifname, flags, admin_state, oper_state, alias, mac, mtu, min_mtu,
+    max_mtu and master (the name of the master interface or None)
+    """
+    if cached and ifname in _links:
+        return _links[ifname]
+    payload = _ifinfo() + _attribute(IFLA_IFNAME, ifname.encode() + b'\0')
+    link = _link(_request(RTM_GETLINK, 0, payload)[0])
+    _links[ifname] = link
+    return link
+
+
+def invalidate(ifname=None):
+    """ drop the cached attributes of an interface, of all if None """
+    if ifname is None:
+        _links.clear()
+    else:
+        _links.pop(ifname, None)
+
+
+def set_link(ifname, state=None, mtu=None, address=None, alias=None, master=None):
+    """
+    change link attributes of an interface with a single request, only the
+    arguments which are not None are changed
+    state:   'up' or 'down'
+    master:  name of the master interface, '' to release the interface
+    """
+    flags = change = 0
+    if state is not None:
+        flags = IFF_UP if state == 'up' else 0
+        change = IFF_UP
+
+    payload = _ifinfo(flags, change)
+    payload += _attribute(IFLA_IFNAME, ifname.encode() + b'\0')
+    if mtu is not None:
+        payload += _attribute(IFLA_MTU, _u32.pack(int(mtu)))
+    if address is not None:
+        payload += _attribute(IFLA_ADDRESS, bytes.fromhex(address.replace(':', '')))
+    if alias is not None:
+        payload += _attribute(IFLA_IFALIAS, alias.encode())
+    if master is not None:
+        index = socket.if_nametoindex(master) if master else 0
+        payload += _attribute(IFLA_MASTER, _u32.pack(index))
+
+    invalidate(ifname)
+    _request(RTM_NEWLINK, NLM_F_ACK, payload)
@@ -153,16 +153,23 @@ class Operational(Control):
     def reset_counters(self):
         os.remove(self.cachefile(self.ifname))
 
-    def get_stats(self):
-        """ return a dict() with the value for each interface counter """
+    def get_stats(self, snapshot=None):
+        """
+        return a dict() with the value for each interface counter
+
+        snapshot: optional vyos.ifconfig.snapshot.Snapshot to read the
+                  counters from instead of sysfs
+        """
+        if snapshot is not None and self.ifname in snapshot:
+            return snapshot.stats(self.ifname)
         stats = {}
         for counter in self._stats_all:
             stats[counter] = int(self.get_interface(counter))
         return stats
 
-    def formated_stats(self, indent=4):
+    def formated_stats(self, indent=4, snapshot=None):
         tabs = []
-        stats = self.get_stats()
+        stats = self.get_stats(snapshot)
         for rtx in self._stats_dir:
             tabs.append([f'{rtx.upper()}:', ] + [_ for _ in self._stat_names[rtx]])
             tabs.append(['', ] + [stats[_] for _ in self._stats_dir[rtx]])
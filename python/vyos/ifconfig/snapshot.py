@@ -0,0 +1,118 @@
+# Copyright 2022 VyOS maintainers and contributors <maintainers@vyos.io>
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+from vyos.util import cmd
+
+
+class Snapshot:
+    """
+    Link attributes, addresses and statistics of all interfaces, collected
+    with a single netlink dump (RTM_GETLINK/RTM_GETADDR through iproute2)
+    instead of one sysfs read or ip call per attribute and interface.
+
+    Example:
+    >>> from vyos.ifconfig.snapshot import Snapshot
+    >>> snapshot = Snapshot()
+    >>> snapshot.oper_state('eth0')
+    'up'
+    >>> snapshot.stats('eth0')['rx_bytes']
+    1234
+    """
+
+    command = 'ip -json -stats -details address show'
+
+    # Operational._stats_dir counter name -> ip -json stats64 key
+    _stats = {
+        'rx': {
+            'rx_bytes': 'bytes',
+            'rx_packets': 'packets',
+            'rx_errors': 'errors',
+            'rx_dropped': 'dropped',
+            'rx_over_errors': 'over_errors',
+            'multicast': 'multicast',
+        },
+        'tx': {
+            'tx_bytes': 'bytes',
+            'tx_packets': 'packets',
+            'tx_errors': 'errors',
+            'tx_dropped': 'dropped',
+            'tx_carrier_errors': 'carrier_errors',
+            'collisions': 'collisions',
+        },
+    }
+
+    def __init__(self, links=None):
+        """
+        links: the decoded "ip -json" output to use, by default it is
+               collected from the kernel
+        """
+        if links is None:
+            links = json.loads(cmd(self.command) or '[]')
+        self._links = {link['ifname']: link for link in links if 'ifname' in link}
+
+    def __contains__(self, ifname):
+        return ifname in self._links
+
+    def __iter__(self):
+        return iter(self._links)
+
+    def get(self, ifname):
+        """ raw ip -json dict of an interface, an empty dict if not found """
+        return self._links.get(ifname, {})
+
+    def oper_state(self, ifname):
+        """ operational state as found in sysfs: up, down, unknown, ... """
+        return self.get(ifname).get('operstate', 'unknown').lower()
+
+    def admin_state(self, ifname):
+        return 'up' if 'UP' in self.get(ifname).get('flags', []) else 'down'
+
+    def alias(self, ifname):
+        return self.get(ifname).get('ifalias', '')
+
+    def mac(self, ifname):
+        return self.get(ifname).get('address')
+
+    def mtu(self, ifname):
+        return self.get(ifname).get('mtu')
+
+    def vrf(self, ifname):
+        return self.get(ifname).get('master')
+
+    def addresses(self, ifname):
+        """
+        assigned addresses in the same format and order as
+        Interface.get_addr(): IPv4 addresses first, then IPv6
+        """
+        addr_info = self.get(ifname).get('addr_info', [])
+        return [f"{a['local']}/{a['prefixlen']}" for family in ('inet', 'inet6')
+                for a in addr_info if a.get('family') == family and 'local' in a]
+
+    def stats(self, ifname):
+        """
+        counters using the names of Operational.get_stats(),
+        None if the interface is not part of the snapshot
+        """
+        if ifname not in self._links:
+            return None
+        stats64 = self._links[ifname].get('stats64', {})
+        stats = {}
+        for rtx, names in self._stats.items():
+            values = stats64.get(rtx, {})
+            for name, key in names.items():
+                stats[name] = int(values.get(key, 0))
+        return stats
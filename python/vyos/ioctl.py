@@ -17,9 +17,11 @@ import sys
 import os
 import socket
 import fcntl
+import ctypes
 import struct
 
 SIOCGIFFLAGS = 0x8913
+SIOCETHTOOL = 0x8946
 
 def get_terminal_size():
     """ pull the terminal size """
@@ -34,3 +36,13 @@ def get_interface_flags(intf):
     raw = fcntl.ioctl(sock.fileno(), SIOCGIFFLAGS, intf + nullif)
     flags, = struct.unpack('H', raw[16:18])
     return flags
+
+def ethtool(intf, data):
+    """ Run a SIOCETHTOOL request, data is a bytearray holding the ethtool
+        command structure, it is updated in place with the kernel answer """
+    buffer = ctypes.create_string_buffer(bytes(data), len(data))
+    # struct ifreq: interface name and a pointer to the command structure
+    ifreq = struct.pack('16sP', intf.encode(), ctypes.addressof(buffer)).ljust(40, b'\0')
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        fcntl.ioctl(sock.fileno(), SIOCETHTOOL, ifreq)
+    data[:] = buffer.raw
@@ -15,16 +15,48 @@
 
 import sys
 import os
+import re
 import json
 import subprocess
+import importlib.machinery
+import importlib.util
 import vyos.version
 import vyos.defaults
 import vyos.systemversions as systemversions
 import vyos.formatversions as formatversions
+from vyos.configtree import ConfigTree
+
+# A migration script defining migrate(config) at module level is run in the
+# migrator process on the already parsed ConfigTree. Its command line part
+# must be guarded by "if __name__ == '__main__'" so it can be imported.
+_migrate_function = re.compile(r'^def migrate\(', re.MULTILINE)
 
 class MigratorError(Exception):
     pass
 
+def load_migration_script(migrate_script):
+    """
+    Import a migration script providing migrate(config); return None if the
+    script has not been converted and has to run as a separate process.
+    """
+    try:
+        with open(migrate_script, 'r') as f:
+            if not _migrate_function.search(f.read()):
+                return None
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    name = 'vyos_migration_' + re.sub(r'\W', '_', migrate_script)
+    loader = importlib.machinery.SourceFileLoader(name, migrate_script)
+    spec = importlib.util.spec_from_loader(name, loader)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        loader.exec_module(module)
+    except Exception:
+        # let the script report its error when run on its own
+        return None
+    return module
+
 class Migrator(object):
     def __init__(self, config_file, force=False, set_vintage='vyos'):
         self._config_file = config_file
@@ -33,6 +65,9 @@ class Migrator(object):
         self._config_file_vintage = None
         self._log_file = None
         self._changed = False
+        # config migrated in-process, written once before the next
+        # script run as a process and after the last script
+        self._config = None
 
     def read_config_file_versions(self):
         """
@@ -92,6 +127,49 @@ class Migrator(object):
         os.umask(mask)
         return log
 
+    def load_config(self):
+        """
+        Parse the config file once for all in-process migration scripts.
+        """
+        if self._config is None:
+            with open(self._config_file, 'r') as f:
+                self._config = ConfigTree(f.read())
+        return self._config
+
+    def save_config(self):
+        """
+        Write the in-process migrated config back to the config file.
+        """
+        if self._config is None:
+            return
+        config, self._config = self._config, None
+        with open(self._config_file, 'w') as f:
+            f.write(config.to_string())
+
+    def run_migration_script(self, migrate_script):
+        """
+        Run a single migration script, in-process if it provides migrate()
+        otherwise as a separate process on the config file.
+        """
+        if not os.path.exists(migrate_script):
+            raise FileNotFoundError(migrate_script)
+
+        module = load_migration_script(migrate_script)
+        if module is None:
+            # the script reads and writes the config file itself
+            self.save_config()
+            subprocess.check_call([migrate_script, self._config_file])
+            return
+
+        try:
+            module.migrate(self.load_config())
+        except SystemExit as err:
+            if err.code not in (None, 0):
+                raise MigratorError(f'exit status {err.code}')
+        except Exception as err:
+            # not to be mistaken for a missing script
+            raise MigratorError(err) from err
+
     def run_migration_scripts(self, config_file_versions, system_versions):
         """
         Run migration scripts iteratively, until config file version equals
@@ -124,8 +202,7 @@ class Migrator(object):
                         '{}-to-{}'.format(cfg_ver, next_ver))
 
                 try:
-                    subprocess.check_call([migrate_script,
-                        self._config_file])
+                    self.run_migration_script(migrate_script)
                 except FileNotFoundError:
                     pass
                 except Exception as err:
@@ -143,6 +220,13 @@ class Migrator(object):
 
             rev_versions[key] = cfg_ver
 
+        try:
+            self.save_config()
+        except Exception as err:
+            print("\nMigration error: failed to save {0}: {1}."
+                  "".format(self._config_file, err))
+            sys.exit(1)
+
         if log:
             log.close()
 
@@ -389,7 +389,21 @@ def _mangle_dict_keys(data, regex, replacement, abs_path=[], no_tag_node_value_m
     return new_dict
 
 def mangle_dict_keys(data, regex, replacement, abs_path=[], no_tag_node_value_mangle=False):
-    return _mangle_dict_keys(data, regex, replacement, abs_path=abs_path, no_tag_node_value_mangle=no_tag_node_value_mangle, mod=0)
+    # _mangle_dict_keys() extends the path in place, never hand it the
+    # caller's list (or the shared default)
+    return _mangle_dict_keys(data, regex, replacement, abs_path=list(abs_path), no_tag_node_value_mangle=no_tag_node_value_mangle, mod=0)
+
+def copy_config_dict(data):
+    """ Returns a deep copy of a config dict.
+
+    Config dicts only hold dicts, lists and strings, this plain structural
+    copy is considerably cheaper than copy.deepcopy().
+    """
+    if isinstance(data, dict):
+        return {k: copy_config_dict(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [copy_config_dict(v) for v in data]
+    return data
 
 def _get_sub_dict(d, lpath):
     k = lpath[0]
@@ -12,6 +12,7 @@
 # if not, write to the Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA 02111-1307 USA 
 
 from vyos.xml import kw
+from vyos.util import copy_config_dict
 
 # As we index by key, the name is first and then the data:
 # {'dummy': {
@@ -23,6 +24,24 @@ from vyos.xml import kw
 # the tagNode data.
 
 
+def index(tree):
+    """
+    returns a flat table of the tree, indexed by the tuple of the node path
+    (without tagNode values), of (node type, multi, valueless) flags
+    """
+    r = {}
+
+    def _walk(inside, node):
+        r[inside] = (node.get(kw.node), node.get(kw.multi), node.get(kw.valueless))
+        for k, v in node.items():
+            if kw.found(k) or not isinstance(v, dict):
+                continue
+            _walk(inside + (k,), v)
+
+    _walk((), tree)
+    return r
+
+
 class XML(dict):
     def __init__(self):
         self[kw.tree] = {}
@@ -31,10 +50,13 @@ class XML(dict):
         self[kw.default] = {}
         self[kw.tags] = []
         self[kw.component_version] = {}
+        self[kw.index] = {}
 
         dict.__init__(self)
 
         self.tree = self[kw.tree]
+        # defaults() results, by (path, flat)
+        self._defaults = {}
         # the options which matched the last incomplete world we had
         # or the last word in a list
         self.options = []
@@ -255,6 +277,19 @@ class XML(dict):
         return dict(sort_component)
 
     def defaults(self, lpath, flat):
+        """
+        returns the default values under lpath, computed once per path;
+        the caller gets its own copy and is free to modify it
+        """
+        return copy_config_dict(self._cached_defaults(lpath, flat))
+
+    def _cached_defaults(self, lpath, flat):
+        key = (tuple(lpath), flat)
+        if key not in self._defaults:
+            self._defaults[key] = self._compute_defaults(lpath, flat)
+        return self._defaults[key]
+
+    def _compute_defaults(self, lpath, flat):
         d = self[kw.default]
         for k in lpath:
             d = d.get(k, {})
@@ -267,7 +302,7 @@ class XML(dict):
             for k in d:
                 under = k.replace('-','_')
                 if isinstance(d[k],dict):
-                    r[under] = self.defaults(lpath + [k], flat)
+                    r[under] = self._cached_defaults(lpath + [k], flat)
                     continue
                 r[under] = d[k]	
             return r
@@ -291,18 +326,23 @@ class XML(dict):
         return _flatten(lpath, len(lpath), d)
 
     def multi_to_list(self, lpath, conf, defaults=False):
+        # the schema position is carried down along with conf, instead of
+        # resolving every key from the root of the tree
+        return self._multi_to_list(self._position(lpath), conf, defaults)
+
+    def _multi_to_list(self, position, conf, defaults):
         r = {}
         for k in conf:
             # key mangling could also be done here
             # it would prevent two parsing of the config tree
             # under = k.replace('-','_')
             under = k
-            fpath = lpath + [k]
+            inner = self._step(position, k)
             if isinstance(conf[k],dict):
-                r[under] = self.multi_to_list(fpath, conf[k], defaults)
+                r[under] = self._multi_to_list(inner, conf[k], defaults)
                 continue
             value = conf[k]
-            if self.is_multi(fpath) and not isinstance(value, list):
+            if self._flags(inner)[1] is True and not isinstance(value, list):
                 if not defaults:
                     value = [value]
                 else:
@@ -310,6 +350,43 @@ class XML(dict):
             r[under] = value
         return r
 
+    def _index(self):
+        if not self[kw.index]:
+            # cache generated without index, or loaded from the XML files
+            self[kw.index] = index(self[kw.tree])
+        return self[kw.index]
+
+    # A position in the schema is the pair (schema path, pending) where
+    # pending is True when the next word of a configuration path is a
+    # tagNode value; the schema path is None for paths not in the schema.
+
+    def _step(self, position, word):
+        spath, pending = position
+        if spath is None:
+            return position
+        if pending:
+            return (spath, False)
+        spath = spath + (word,)
+        flags = self._index().get(spath)
+        if flags is None:
+            return (None, False)
+        return (spath, flags[0] == kw.tagNode)
+
+    def _position(self, lpath, with_tag=True):
+        if not with_tag:
+            spath = tuple(lpath)
+            return (spath if spath in self._index() else None, False)
+        position = ((), False)
+        for word in lpath:
+            position = self._step(position, word)
+        return position
+
+    def _flags(self, position):
+        spath = position[0]
+        if spath is None:
+            return (None, None, None)
+        return self._index()[spath]
+
     # from functools import lru_cache
     # @lru_cache(maxsize=100)
     # XXX: need to use cachetool instead - for later
@@ -338,22 +415,31 @@ class XML(dict):
         return tree.get(tag, None)
 
     def is_multi(self, lpath, with_tag=True):
-        tree = self._get(lpath, kw.multi, with_tag)
-        if tree is None:
+        multi = self._flags(self._position(lpath, with_tag))[1]
+        if multi is None:
             return None
-        return tree is True
+        return multi is True
 
     def is_tag(self, lpath, with_tag=True):
-        tree = self._get(lpath, kw.node, with_tag)
-        if tree is None:
+        node = self._flags(self._position(lpath, with_tag))[0]
+        if node is None:
             return None
-        return tree == kw.tagNode
+        return node == kw.tagNode
 
     def is_leaf(self, lpath, with_tag=True):
-        tree = self._get(lpath, kw.node, with_tag)
-        if tree is None:
+        node = self._flags(self._position(lpath, with_tag))[0]
+        if node is None:
             return None
-        return tree == kw.leafNode
+        return node == kw.leafNode
 
     def exists(self, lpath, with_tag=True):
-        return self._get(lpath, kw.node, with_tag) is not None
+        return self._flags(self._position(lpath, with_tag))[0] is not None
+
+    def is_tag_value(self, lpath):
+        """
+        returns True if the last element of the configuration path lpath
+        is the value of a tagNode, e.g. eth0 in ['interfaces', 'ethernet', 'eth0']
+        """
+        if len(lpath) < 2:
+            return False
+        return bool(self.is_tag(lpath[:-1])) and not self.is_tag_value(lpath[:-1])
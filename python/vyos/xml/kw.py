@@ -33,6 +33,7 @@ owners = '[owners]'
 tags = '[tags]'
 default = '[default]'
 component_version = '[component_version]'
+index = '[index]'
 
 # nodes
 
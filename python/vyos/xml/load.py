@@ -300,5 +300,7 @@ def xml(folder):
     # fix the configuration root node for completion
     # as we moved all the name "up" the chain to use them as index.
     xml[kw.tree][kw.node] = kw.plainNode
+    # flat path index, saved along with the tree in the generated cache
+    xml[kw.index] = definition.index(xml[kw.tree])
     # XXX: do the others
     return xml
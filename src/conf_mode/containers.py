@@ -24,6 +24,7 @@ from json import dumps as json_write
 
 from vyos.config import Config
 from vyos.configdict import dict_merge
+from vyos.configdict import merge_defaults_for_tag_nodes
 from vyos.configdict import node_changed
 from vyos.util import call
 from vyos.util import cmd
@@ -72,9 +73,7 @@ def get_config(config=None):
 
     # Merge per-container default values
     if 'name' in container:
-        default_values = defaults(base + ['name'])
-        for name in container['name']:
-            container['name'][name] = dict_merge(default_values, container['name'][name])
+        merge_defaults_for_tag_nodes(container['name'], base + ['name'])
 
     # Delete container network, delete containers
     tmp = node_changed(conf, ['container', 'network'])
@@ -21,6 +21,7 @@ from sys import argv
 
 from vyos.config import Config
 from vyos.configdict import dict_merge
+from vyos.configdict import merge_defaults_for_tag_nodes
 from vyos.configdict import node_changed
 from vyos.configverify import verify_common_route_maps
 from vyos.configverify import verify_route_map
@@ -107,9 +108,7 @@ def get_config(config=None):
     ospf = dict_merge(default_values, ospf)
 
     if 'neighbor' in ospf:
-        default_values = defaults(base + ['neighbor'])
-        for neighbor in ospf['neighbor']:
-            ospf['neighbor'][neighbor] = dict_merge(default_values, ospf['neighbor'][neighbor])
+        merge_defaults_for_tag_nodes(ospf['neighbor'], base + ['neighbor'])
 
     if 'area' in ospf:
         default_values = defaults(base + ['area', 'virtual-link'])
@@ -133,10 +132,8 @@ def get_config(config=None):
                 ospf['interface'][interface])
 
     if 'redistribute' in ospf and 'table' in ospf['redistribute']:
-        default_values = defaults(base + ['redistribute', 'table'])
-        for table in ospf['redistribute']['table']:
-            ospf['redistribute']['table'][table] = dict_merge(default_values,
-                ospf['redistribute']['table'][table])
+        merge_defaults_for_tag_nodes(ospf['redistribute']['table'],
+                                     base + ['redistribute', 'table'])
 
     # We also need some additional information from the config, prefix-lists
     # and route-maps for instance. They will be used in verify().
@@ -20,7 +20,10 @@ import json
 import re
 import tabulate
 
+from functools import lru_cache
+
 from vyos.config import Config
+from vyos.firewall import nft_conditions
 from vyos.util import cmd
 from vyos.util import dict_search_args
 
@@ -86,29 +89,44 @@ def get_config_firewall(conf, name=None, ipv6=False, interfaces=True):
         get_firewall_interfaces(conf, firewall, name, ipv6)
     return firewall
 
-def get_nftables_details(name, ipv6=False):
-    suffix = '6' if ipv6 else ''
-    command = f'sudo nft list chain ip{suffix} filter {name}'
+@lru_cache(maxsize=None)
+def get_nftables_ruleset():
+    """ Index of all nftables rules, read with a single nft call
+    return:  dict of (family, table, chain) to list of rules
+    """
     try:
-        results = cmd(command)
+        ruleset = json.loads(cmd('sudo nft -j list ruleset'))
     except:
         return {}
 
+    index = {}
+    for entry in ruleset.get('nftables', []):
+        if 'rule' not in entry:
+            continue
+        rule = entry['rule']
+        key = (rule['family'], rule['table'], rule['chain'])
+        index.setdefault(key, []).append(rule)
+    return index
+
+def get_nftables_details(name, ipv6=False):
+    family = 'ip6' if ipv6 else 'ip'
+    comment_re = re.compile(rf'{re.escape(name)}[\- ](\d+|default-action)')
+
     out = {}
-    for line in results.split('\n'):
-        comment_search = re.search(rf'{name}[\- ](\d+|default-action)', line)
+    for rule in get_nftables_ruleset().get((family, 'filter', name), []):
+        comment_search = comment_re.search(rule.get('comment', ''))
         if not comment_search:
             continue
 
-        rule = {}
+        details = {}
         rule_id = comment_search[1]
-        counter_search = re.search(r'counter packets (\d+) bytes (\d+)', line)
-        if counter_search:
-            rule['packets'] = counter_search[1]
-            rule['bytes'] = counter_search[2]
+        for statement in rule.get('expr', []):
+            if 'counter' in statement:
+                details['packets'] = str(statement['counter']['packets'])
+                details['bytes'] = str(statement['counter']['bytes'])
 
-        rule['conditions'] = re.sub(r'(\b(counter packets \d+ bytes \d+|drop|reject|return|log)\b|comment "[\w\-]+")', '', line).strip()
-        out[rule_id] = rule
+        details['conditions'] = nft_conditions(rule.get('expr', []))
+        out[rule_id] = details
     return out
 
 def output_firewall_name(name, name_conf, ipv6=False, single_rule_id=None):
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 #
-# Copyright (C) 2018-2021 VyOS maintainers and contributors
+# Copyright (C) 2018-2022 VyOS maintainers and contributors
 #
 # This program is free software; you can redistribute it and/or modify
 # it under the terms of the GNU General Public License version 2 or later as
@@ -16,6 +16,8 @@
 #
 # TODO: merge with show_dhcpv6.py
 
+import os
+
 from json import dumps
 from argparse import ArgumentParser
 from ipaddress import ip_address
@@ -23,14 +25,16 @@ from tabulate import tabulate
 from sys import exit
 from collections import OrderedDict
 from datetime import datetime
-
-from isc_dhcp_leases import Lease, IscDhcpLeases
+from datetime import timedelta
+from time import time
 
 from vyos.config import Config
+from vyos.dhcpleases import LeaseIndex
 from vyos.util import is_systemd_service_running
 
 lease_file = "/config/dhcpd.leases"
-pool_key = "shared-networkname"
+# per user as op-mode commands run with the privileges of the calling user
+lease_index_file = f"/tmp/vyos-dhcp-leases-{os.getuid()}.index"
 
 lease_display_fields = OrderedDict()
 lease_display_fields['ip'] = 'IP address'
@@ -44,92 +48,55 @@ lease_display_fields['hostname'] = 'Hostname'
 
 lease_valid_states = ['all', 'active', 'free', 'expired', 'released', 'abandoned', 'reset', 'backup']
 
-def in_pool(lease, pool):
-    if pool_key in lease.sets:
-        if lease.sets[pool_key] == pool:
-            return True
-
-    return False
-
-def utc_to_local(utc_dt):
-    return datetime.fromtimestamp((utc_dt - datetime(1970,1,1)).total_seconds())
+def epoch_to_local(epoch):
+    return datetime.fromtimestamp(epoch).strftime("%Y/%m/%d %H:%M:%S")
 
 def get_lease_data(lease):
     data = {}
 
     # isc-dhcp lease times are in UTC so we need to convert them to local time to display
-    try:
-        data["start"] = utc_to_local(lease.start).strftime("%Y/%m/%d %H:%M:%S")
-    except:
-        data["start"] = ""
-
-    try:
-        data["end"] = utc_to_local(lease.end).strftime("%Y/%m/%d %H:%M:%S")
-    except:
-        data["end"] = ""
-
-    try:
-        data["remaining"] = lease.end - datetime.utcnow()
+    data["start"] = epoch_to_local(lease["start"]) if lease["start"] is not None else ""
+    data["end"] = epoch_to_local(lease["end"]) if lease["end"] is not None else ""
+
+    data["remaining"] = ""
+    if lease["end"] is not None:
+        remaining = int(lease["end"] - time())
         # negative timedelta prints wrong so bypass it
-        if (data["remaining"].days >= 0):
-            # substraction gives us a timedelta object which can't be formatted with strftime
-            # so we use str(), split gets rid of the microseconds
-            data["remaining"] = str(data["remaining"]).split('.')[0]
-        else:
-            data["remaining"] = ""
-    except:
-        data["remaining"] = ""
+        if remaining >= 0:
+            data["remaining"] = str(timedelta(seconds=remaining))
 
     # currently not used but might come in handy
     # todo: parse into datetime string
     for prop in ['tstp', 'tsfp', 'atsfp', 'cltt']:
-        if prop in lease.data:
-            data[prop] = lease.data[prop]
-        else:
-            data[prop] = ''
-
-    data["hardware_address"] = lease.ethernet
-    data["hostname"] = lease.hostname
+        data[prop] = lease[prop]
 
-    data["state"] = lease.binding_state
-    data["ip"] = lease.ip
+    data["hardware_address"] = lease["hardware_address"]
+    data["hostname"] = lease["hostname"]
 
-    try:
-        data["pool"] = lease.sets[pool_key]
-    except:
-        data["pool"] = ""
+    data["state"] = lease["state"]
+    data["ip"] = lease["ip"]
+    data["pool"] = lease["pool"]
 
     return data
 
-def get_leases(config, leases, state, pool=None, sort='ip'):
-    # get leases from file
-    leases = IscDhcpLeases(lease_file).get()
+def get_lease_index():
+    # only the lease declarations appended since the last invocation are parsed
+    index = LeaseIndex(lease_file, lease_index_file).update()
+    index.save()
+    return index
 
-    # filter leases by state
-    if 'all' not in state:
-        leases = list(filter(lambda x: x.binding_state in state, leases))
-
-    # filter leases by pool name
+def get_leases(config, index, state, pool=None, sort='ip'):
+    # the index only keeps the most recent lease of every address
     if pool is not None:
-        if config.exists_effective("service dhcp-server shared-network-name {0}".format(pool)):
-            leases = list(filter(lambda x: in_pool(x, pool), leases))
-        else:
+        if not config.exists_effective("service dhcp-server shared-network-name {0}".format(pool)):
             print("Pool {0} does not exist.".format(pool))
             exit(0)
 
     # should maybe filter all state=active by lease.valid here?
-
-    # sort by start time to dedupe (newest lease overrides older)
-    leases = sorted(leases, key = lambda lease: lease.start)
-
-    # dedupe by converting to dict
-    leases_dict = {}
-    for lease in leases:
-        # dedupe by IP
-        leases_dict[lease.ip] = lease
+    leases = index.get(state=None if 'all' in state else state, pool=pool)
 
     # convert the lease data
-    leases = list(map(get_lease_data, leases_dict.values()))
+    leases = list(map(get_lease_data, leases))
 
     # apply output/display sort
     if sort == 'ip':
@@ -151,19 +118,22 @@ def show_leases(leases):
 
     print(output)
 
-def get_pool_size(config, pool):
-    size = 0
-    subnets = config.list_effective_nodes("service dhcp-server shared-network-name {0} subnet".format(pool))
-    for s in subnets:
-        ranges = config.list_effective_nodes("service dhcp-server shared-network-name {0} subnet {1} range".format(pool, s))
-        for r in ranges:
-            start = config.return_effective_value("service dhcp-server shared-network-name {0} subnet {1} range {2} start".format(pool, s, r))
-            stop = config.return_effective_value("service dhcp-server shared-network-name {0} subnet {1} range {2} stop".format(pool, s, r))
-
-            # Add +1 because both range boundaries are inclusive
-            size += int(ip_address(stop)) - int(ip_address(start)) + 1
-
-    return size
+def get_pool_sizes(config):
+    """ number of addresses in the ranges of every shared network """
+    sizes = {}
+    networks = config.get_config_dict(['service', 'dhcp-server', 'shared-network-name'],
+                                      effective=True, get_first_key=True)
+    for pool, network in networks.items():
+        size = 0
+        for subnet in network.get('subnet', {}).values():
+            for r in subnet.get('range', {}).values():
+                if 'start' not in r or 'stop' not in r:
+                    continue
+                # Add +1 because both range boundaries are inclusive
+                size += int(ip_address(r['stop'])) - int(ip_address(r['start'])) + 1
+        sizes[pool] = size
+
+    return sizes
 
 def show_pool_stats(stats):
     headers = ["Pool", "Size", "Leases", "Available", "Usage"]
@@ -215,8 +185,10 @@ if __name__ == '__main__':
     if not is_systemd_service_running('isc-dhcp-server.service'):
         print("WARNING: DHCP server is configured but not started. Data may be stale.")
 
+    index = get_lease_index()
+
     if args.leases:
-        leases = get_leases(conf, lease_file, args.state, args.pool, args.sort)
+        leases = get_leases(conf, index, args.state, args.pool, args.sort)
 
         if args.json:
             print(dumps(leases, indent=4))
@@ -233,10 +205,15 @@ if __name__ == '__main__':
             pools = conf.list_effective_nodes("service dhcp-server shared-network-name")
 
         # Get pool usage stats
+        sizes = get_pool_sizes(conf)
+        counters = index.pool_stats()
         stats = []
         for p in pools:
-            size = get_pool_size(conf, p)
-            leases = len(get_leases(conf, lease_file, state='active', pool=p))
+            if p not in sizes:
+                print("Pool {0} does not exist.".format(p))
+                exit(0)
+            size = sizes[p]
+            leases = counters.get(p, {}).get('active', 0)
 
             use_percentage = round(leases / size * 100) if size != 0 else 0
 
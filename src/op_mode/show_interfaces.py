@@ -19,11 +19,15 @@ import os
 import re
 import sys
 import glob
+import time
 import argparse
 
 from vyos.ifconfig import Section
 from vyos.ifconfig import Interface
 from vyos.ifconfig import VRRP
+from vyos.ifconfig.history import CounterHistory
+from vyos.ifconfig.history import rates
+from vyos.ifconfig.snapshot import Snapshot
 from vyos.util import cmd, call
 
 
@@ -31,6 +35,8 @@ from vyos.util import cmd, call
 interfaces = ['eno', 'ens', 'enp', 'enx', 'eth', 'vmnet', 'lo', 'tun', 'wan', 'pppoe']
 glob_ifnames = '/sys/class/net/({})*'.format('|'.join(interfaces))
 
+history_service = 'vyos-counter-history.service'
+
 
 actions = {}
 def register(name):
@@ -65,6 +71,8 @@ def filtered_interfaces(ifnames, iftypes, vif, vrrp):
         for iftype in iftypes:
             yield from filtered_interfaces(ifnames, iftype, vif, vrrp)
 
+    vrrp_interfaces = VRRP.active_interfaces() if vrrp else []
+
     for ifname in Section.interfaces(iftypes):
         # Bail out early if interface name not part of our search list
         if ifnames and ifname not in ifnames:
@@ -78,14 +86,26 @@ def filtered_interfaces(ifnames, iftypes, vif, vrrp):
         if vif and not '.' in ifname:
             continue
 
-        if vrrp:
-            vrrp_interfaces = VRRP.active_interfaces()
-            if ifname not in vrrp_interfaces:
-                continue
+        if vrrp and ifname not in vrrp_interfaces:
+            continue
 
         yield interface
 
 
+def ip_addr_show():
+    """
+    "ip addr show" output of all interfaces in one call, split per interface
+    with the leading interface index removed
+    """
+    blocks = {}
+    for block in re.split(r'^\d+:\s+', cmd('ip addr show'), flags=re.M):
+        if not block:
+            continue
+        ifname = re.split(r'[:@]', block, 1)[0]
+        blocks[ifname] = block.rstrip('\n')
+    return blocks
+
+
 def split_text(text, used=0):
     """
     take a string and attempt to split it to fit with the width of the screen
@@ -167,12 +187,17 @@ def pppoe(ifname):
 @register('show')
 def run_show_intf(ifnames, iftypes, vif, vrrp):
     handled = []
+    snapshot = Snapshot()
+    addr_show = ip_addr_show()
     for interface in filtered_interfaces(ifnames, iftypes, vif, vrrp):
         handled.append(interface.ifname)
         cache = interface.operational.load_counters()
 
-        out = cmd(f'ip addr show {interface.ifname}')
-        out = re.sub(f'^\d+:\s+','',out)
+        out = addr_show.get(interface.ifname)
+        if out is None:
+            # interface created after the dump
+            out = cmd(f'ip addr show {interface.ifname}')
+            out = re.sub(f'^\d+:\s+','',out)
         if re.search('link/tunnel6', out):
             tunnel = cmd(f'ip -6 tun show {interface.ifname}')
             # tun0: ip/ipv6 remote ::2 local ::1 encaplimit 4 hoplimit 64 tclass inherit flowlabel inherit (flowinfo 0x00000000)
@@ -186,12 +211,15 @@ def run_show_intf(ifnames, iftypes, vif, vrrp):
             when = interface.operational.strtime(timestamp)
             print(f'    Last clear: {when}')
 
-        description = interface.get_alias()
+        if interface.ifname in snapshot:
+            description = snapshot.alias(interface.ifname)
+        else:
+            description = interface.get_alias()
         if description:
             print(f'    Description: {description}')
 
         print()
-        print(interface.operational.formated_stats())
+        print(interface.operational.formated_stats(snapshot=snapshot))
 
     for ifname in ifnames:
         if ifname not in handled and ifname.startswith('pppoe'):
@@ -215,18 +243,27 @@ def run_show_intf_brief(ifnames, iftypes, vif, vrrp):
     print(format1 % ("---------", "----------", "---", "-----------"))
 
     handled = []
+    snapshot = Snapshot()
     for interface in filtered_interfaces(ifnames, iftypes, vif, vrrp):
         handled.append(interface.ifname)
 
-        oper_state = interface.operational.get_state()
-        admin_state = interface.get_admin_state()
+        if interface.ifname in snapshot:
+            oper_state = snapshot.oper_state(interface.ifname)
+            admin_state = snapshot.admin_state(interface.ifname)
+            addresses = snapshot.addresses(interface.ifname)
+            description = snapshot.alias(interface.ifname)
+        else:
+            oper_state = interface.operational.get_state()
+            admin_state = interface.get_admin_state()
+            addresses = interface.get_addr()
+            description = interface.get_alias()
 
         intf = [interface.ifname,]
 
         oper = ['u', ] if oper_state in ('up', 'unknown') else ['D', ]
         admin = ['u', ] if admin_state in ('up', 'unknown') else ['A', ]
-        addrs = [_ for _ in interface.get_addr() if not _.startswith('fe80::')] or ['-', ]
-        descs = list(split_text(interface.get_alias(),0))
+        addrs = [_ for _ in addresses if not _.startswith('fe80::')] or ['-', ]
+        descs = list(split_text(description,0))
 
         while intf or oper or admin or addrs or descs:
             i = intf.pop(0) if intf else ''
@@ -257,13 +294,17 @@ def run_show_counters(ifnames, iftypes, vif, vrrp):
     formating = '%-12s %10s %10s     %10s %10s'
     print(formating % ('Interface', 'Rx Packets', 'Rx Bytes', 'Tx Packets', 'Tx Bytes'))
 
+    snapshot = Snapshot()
     for interface in filtered_interfaces(ifnames, iftypes, vif, vrrp):
-        oper = interface.operational.get_state()
+        if interface.ifname in snapshot:
+            oper = snapshot.oper_state(interface.ifname)
+        else:
+            oper = interface.operational.get_state()
 
         if oper not in ('up','unknown'):
             continue
 
-        stats = interface.operational.get_stats()
+        stats = interface.operational.get_stats(snapshot)
         cache = interface.operational.load_counters()
         print(formating % (
             interface.ifname,
@@ -274,6 +315,99 @@ def run_show_counters(ifnames, iftypes, vif, vrrp):
         ))
 
 
+def rate_to_human(value, unit):
+    """ format a per second rate with SI prefixes: 1.25 Mbps """
+    for prefix in ('', 'K', 'M', 'G'):
+        if value < 1000:
+            break
+        value /= 1000
+    else:
+        prefix = 'T'
+    return f'{value:.2f} {prefix}{unit}'
+
+
+def load_history(ifname):
+    try:
+        return CounterHistory(ifname)
+    except (OSError, ValueError):
+        return None
+
+
+@register('show-rate')
+def run_show_rate(ifnames, iftypes, vif, vrrp):
+    formating = '%-12s %14s %12s     %14s %12s'
+    print(formating % ('Interface', 'Rx bps', 'Rx pps', 'Tx bps', 'Tx pps'))
+
+    interfaces = [_.ifname for _ in filtered_interfaces(ifnames, iftypes, vif, vrrp)]
+
+    current = {}
+    for ifname in interfaces:
+        history = load_history(ifname)
+        if history:
+            with history:
+                try:
+                    current[ifname] = history.current()
+                except ValueError:
+                    pass
+
+    # without a collected history, measure the rate over one second
+    missing = [_ for _ in interfaces if current.get(_) is None]
+    if missing:
+        before = (time.time(), Snapshot())
+        time.sleep(1)
+        after = (time.time(), Snapshot())
+        for ifname in missing:
+            older, newer = before[1].stats(ifname), after[1].stats(ifname)
+            if older is not None and newer is not None:
+                current[ifname] = rates((before[0], older), (after[0], newer))
+
+    for ifname in interfaces:
+        rate = current.get(ifname)
+        if not rate:
+            continue
+        print(formating % (
+            ifname,
+            rate_to_human(rate['rx_bytes'] * 8, 'bps'),
+            rate_to_human(rate['rx_packets'], 'pps'),
+            rate_to_human(rate['tx_bytes'] * 8, 'bps'),
+            rate_to_human(rate['tx_packets'], 'pps'),
+        ))
+
+
+@register('show-rate-history')
+def run_show_rate_history(ifnames, iftypes, vif, vrrp):
+    # the collector only runs once a history was asked for
+    if call(f'systemctl is-active --quiet {history_service}') != 0:
+        if call(f'sudo systemctl start {history_service}') != 0:
+            print('Unable to start the interface counter history collection')
+        else:
+            print('Interface counter history collection started, '
+                  'rates are available after two samples (20 seconds)')
+        return
+
+    windows = (('1m', 60), ('5m', 300), ('all', None))
+    formating = '%-12s %-6s %12s %12s %12s     %12s %12s %12s'
+    print(formating % ('Interface', 'Window', 'Rx min', 'Rx avg', 'Rx max',
+                       'Tx min', 'Tx avg', 'Tx max'))
+
+    for interface in filtered_interfaces(ifnames, iftypes, vif, vrrp):
+        history = load_history(interface.ifname)
+        if not history:
+            continue
+        with history:
+            for name, window in windows:
+                try:
+                    summary = history.summary(window)
+                except ValueError:
+                    break
+                if not summary:
+                    break
+                rx, tx = summary['rx_bytes'], summary['tx_bytes']
+                print(formating % ((interface.ifname, name) + tuple(
+                    rate_to_human(_ * 8, 'bps') for _ in (
+                        rx['min'], rx['avg'], rx['max'], tx['min'], tx['avg'], tx['max']))))
+
+
 @register('clear')
 def run_clear_intf(ifnames, iftypes, vif, vrrp):
     for interface in filtered_interfaces(ifnames, iftypes, vif, vrrp):
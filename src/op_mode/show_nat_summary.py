@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+'''
+show nat translations summary
+'''
+
+import argparse
+import ipaddress
+import json
+import sys
+import tabulate
+
+from vyos.config import Config
+from vyos.configsource import ConfigSourceError
+from vyos.configsource import VyOSError
+from vyos.configtree import ConfigTreeError
+from vyos.conntrack import ConntrackError
+from vyos.conntrack import FlowAggregator
+from vyos.conntrack import dump_flows
+from vyos.conntrack import parse_flows
+from vyos.util import get_interface_address
+
+headers = {
+    'protocol': ('Protocol', 'Flows'),
+    'rule': ('Rule', 'Flows'),
+    'source': ('Top source addresses', 'Flows'),
+    'destination': ('Top destination addresses', 'Flows'),
+    'translation': ('Top translation addresses', 'Flows'),
+    'port_block': ('Top translation port blocks', 'Flows'),
+}
+
+def translation_matcher(translation):
+    """ Callable checking if an address is part of a NAT rule translation """
+    if '-' in translation:
+        start, stop = (ipaddress.ip_address(x) for x in translation.split('-', 1))
+        return lambda address: start <= ipaddress.ip_address(address) <= stop
+    network = ipaddress.ip_network(translation, strict=False)
+    return lambda address: ipaddress.ip_address(address) in network
+
+def interface_addresses(interface):
+    """ Addresses of an interface, a masquerade rule translates to them """
+    tmp = get_interface_address(interface)
+    if not tmp:
+        return set()
+    return {addr['local'] for addr in tmp.get('addr_info', []) if 'local' in addr}
+
+def nat_rules(nat_type):
+    """ Callable mapping a translated address to the configured NAT rule.
+    Rules with explicit translation addresses take precedence over
+    masquerade rules, which are matched by the addresses of their outbound
+    interface. Flows of masquerade rules for any interface cannot be told
+    apart and are counted as "masquerade". """
+    conf = Config()
+    rules = conf.get_config_dict(['nat', nat_type, 'rule'], key_mangling=('-', '_'),
+                                 get_first_key=True)
+    explicit = []
+    masquerade = []
+    masquerade_any = False
+    for rule in sorted(rules, key=int):
+        translation = rules[rule].get('translation', {}).get('address')
+        if not translation:
+            continue
+        if translation == 'masquerade':
+            interface = rules[rule].get('outbound_interface', 'any')
+            if interface == 'any':
+                masquerade_any = True
+            else:
+                addresses = interface_addresses(interface)
+                masquerade.append((rule, addresses.__contains__))
+            continue
+        try:
+            explicit.append((rule, translation_matcher(translation)))
+        except ValueError:
+            continue
+
+    def rule_of(address):
+        for rule, matcher in explicit + masquerade:
+            try:
+                if matcher(address):
+                    return rule
+            except ValueError:
+                continue
+        return 'masquerade' if masquerade_any else None
+    return rule_of
+
+def print_summary(summary):
+    print(f"Flows: {summary['flows']}")
+    for group, header in headers.items():
+        if group not in summary:
+            continue
+        rows = [(entry['key'], entry['flows']) for entry in summary[group]['top']]
+        print()
+        print(tabulate.tabulate(rows, header))
+
+def main():
+    parser = argparse.ArgumentParser(description=sys.modules[__name__].__doc__)
+    parser.add_argument('--type', help='NAT type (source, destination)', required=True,
+                        choices=['source', 'destination'])
+    parser.add_argument('--top', help='number of top entries per group', default=10, type=int)
+    parser.add_argument('--port-block-size', help='size of the translation port blocks',
+                        default=512, type=int)
+    parser.add_argument('--file', help='read the conntrack xml from a file', type=str)
+    parser.add_argument('--json', help='print summary as JSON', action='store_true')
+
+    arg = parser.parse_args()
+
+    try:
+        rule = nat_rules(arg.type)
+    except (ConfigSourceError, ConfigTreeError, VyOSError, OSError, ValueError) as e:
+        # the summary is still useful without the rule mapping
+        print(f'Unable to map the NAT translations to rules: {e}', file=sys.stderr)
+        rule = None
+
+    aggregator = FlowAggregator(nat=arg.type, port_block=arg.port_block_size, rule=rule)
+    try:
+        if arg.file:
+            with open(arg.file) as f:
+                aggregator.update(parse_flows(f))
+        else:
+            aggregator.update(dump_flows(family='ipv4', nat=arg.type))
+    except (ConntrackError, FileNotFoundError) as e:
+        print(f'Unable to read the NAT translations: {e}')
+        sys.exit(1)
+
+    summary = aggregator.to_dict(arg.top)
+    if arg.json:
+        print(json.dumps(summary, indent=4))
+    else:
+        print_summary(summary)
+
+if __name__ == '__main__':
+    main()
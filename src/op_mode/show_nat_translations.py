@@ -22,12 +22,15 @@ import os
 import sys
 import ipaddress
 import argparse
-import xmltodict
 
-from vyos.util import popen
-from vyos.util import DEVNULL
+from vyos.conntrack import ORIGINAL
+from vyos.conntrack import REPLY
+from vyos.conntrack import INDEPENDENT
+from vyos.conntrack import dump_flows
+from vyos.conntrack import filter_flows
+from vyos.conntrack import parse_flows
 
-conntrack = '/usr/sbin/conntrack'
+family = None
 
 verbose_format = "%-20s %-18s %-20s %-18s"
 normal_format = "%-20s %-20s %-4s  %-8s %s"
@@ -39,122 +42,66 @@ def headers(verbose, pipe):
     return normal_format % ('Pre-NAT', 'Post-NAT', 'Prot', 'Timeout', 'Type' if pipe else '')
 
 
-def command(srcdest, proto, ipaddr):
-    command = f'{conntrack} -o xml -L'
-
-    if proto:
-        command += f' -p {proto}'
-
+def filters(srcdest, ipaddr):
     if srcdest == 'source':
-        command += ' -n'
-        if ipaddr:
-            command += f' --orig-src {ipaddr}'
+        return {'src': ipaddr}
     if srcdest == 'destination':
-        command += ' -g'
-        if ipaddr:
-            command += f' --orig-dst {ipaddr}'
-
-    return command
+        return {'dst': ipaddr}
+    return {}
 
 
-def run(command):
-    xml, code = popen(command,stderr=DEVNULL)
-    if code:
-        sys.exit('conntrack failed')
-    return xml
+def run(srcdest, proto, ipaddr):
+    # filtering is done by conntrack, flows are parsed while they arrive
+    return dump_flows(family=family, proto=proto, nat=srcdest, **filters(srcdest, ipaddr))
 
 
 def content(xmlfile):
-    xml = ''
     with open(xmlfile,'r') as r:
-        xml += r.read()
-    return xml
+        yield from parse_flows(r)
 
 
 def pipe():
-    xml = ''
-    while True:
-        line = sys.stdin.readline()
-        xml += line
-        if '</conntrack>' in line:
-            break
-
+    yield from parse_flows(sys.stdin)
     sys.stdin = open('/dev/tty')
-    return xml
 
 
-def process(data, stats, protocol, pipe, verbose, flowtype=''):
-    if not data:
-        return
+def address(flow, direction, host, port):
+    data = flow[direction]
+    return '%s:%s' % (data[host], data[port]) if port in data else data[host]
 
-    parsed = xmltodict.parse(data)
 
+def process(flows, stats, protocol, pipe, verbose, flowtype=''):
     print(headers(verbose, pipe))
 
-    # to help the linter to detect typos
-    ORIGINAL = 'original'
-    REPLY = 'reply'
-    INDEPENDANT = 'independent'
-    SPORT = 'sport'
-    DPORT = 'dport'
-    SRC = 'src'
-    DST = 'dst'
-
-    for rule in parsed['conntrack']['flow']:
-        src, dst, sport, dport, proto = {}, {}, {}, {}, {}
-        packet_count, byte_count = {}, {}
-        timeout, use = 0, 0
+    for rule in flows:
+        if ORIGINAL not in rule or REPLY not in rule:
+            continue
 
+        original = rule[ORIGINAL]
+        reply = rule[REPLY]
+        independent = rule.get(INDEPENDENT, {})
+        timeout = independent.get('timeout', 0)
+        use = independent.get('use', 0)
         rule_type = rule.get('type', '')
 
-        for meta in rule['meta']:
-            # print(meta)
-            direction = meta['@direction']
-
-            if direction in (ORIGINAL, REPLY):
-                if 'layer3' in meta:
-                    l3 = meta['layer3']
-                    src[direction] = l3[SRC]
-                    dst[direction] = l3[DST]
-
-                if 'layer4' in meta:
-                    l4 = meta['layer4']
-                    sp = l4.get(SPORT, '')
-                    dp = l4.get(DPORT, '')
-                    if sp:
-                        sport[direction] = sp
-                    if dp:
-                        dport[direction] = dp
-                    proto[direction] = l4.get('@protoname','')
-
-                if stats and 'counters' in meta:
-                    packet_count[direction] = meta['packets']
-                    byte_count[direction] = meta['bytes']
-                continue
-
-            if direction == INDEPENDANT:
-                timeout = meta['timeout']
-                use = meta['use']
-                continue
-
-        in_src = '%s:%s' % (src[ORIGINAL], sport[ORIGINAL]) if ORIGINAL in sport else src[ORIGINAL]
-        in_dst = '%s:%s' % (dst[ORIGINAL], dport[ORIGINAL]) if ORIGINAL in dport else dst[ORIGINAL]
+        in_src = address(rule, ORIGINAL, 'src', 'sport')
+        in_dst = address(rule, ORIGINAL, 'dst', 'dport')
 
         # inverted the the perl code !!?
-        out_dst = '%s:%s' % (dst[REPLY], dport[REPLY]) if REPLY in dport else dst[REPLY]
-        out_src = '%s:%s' % (src[REPLY], sport[REPLY]) if REPLY in sport else src[REPLY]
+        out_dst = address(rule, REPLY, 'dst', 'dport')
+        out_src = address(rule, REPLY, 'src', 'sport')
 
         if flowtype == 'source':
-            v = ORIGINAL in sport and REPLY in dport
-            f = '%s:%s' % (src[ORIGINAL], sport[ORIGINAL]) if v else src[ORIGINAL]
-            t = '%s:%s' % (dst[REPLY], dport[REPLY]) if v else dst[REPLY]
+            v = 'sport' in original and 'dport' in reply
+            f = '%s:%s' % (original['src'], original['sport']) if v else original['src']
+            t = '%s:%s' % (reply['dst'], reply['dport']) if v else reply['dst']
         else:
-            v = ORIGINAL in dport and REPLY in sport
-            f = '%s:%s' % (dst[ORIGINAL], dport[ORIGINAL]) if v else dst[ORIGINAL]
-            t = '%s:%s' % (src[REPLY], sport[REPLY]) if v else src[REPLY]
+            v = 'dport' in original and 'sport' in reply
+            f = '%s:%s' % (original['dst'], original['dport']) if v else original['dst']
+            t = '%s:%s' % (reply['src'], reply['sport']) if v else reply['src']
 
         # Thomas: I do not believe proto should be an option
-        p = proto.get('original', '')
+        p = original.get('proto', '')
         if protocol and p != protocol:
             continue
 
@@ -170,9 +117,9 @@ def process(data, stats, protocol, pipe, verbose, flowtype=''):
             print(normal_format % (f, t, p, timeout, rule_type if rule_type else ''))
 
         if stats:
-            for direction in ('original', 'reply'):
-                if direction in packet_count:
-                    print('  %-8s: packets %s, bytes %s' % direction, packet_count[direction], byte_count[direction])
+            for direction in (ORIGINAL, REPLY):
+                if 'packets' in rule[direction]:
+                    print('  %-8s: packets %s, bytes %s' % (direction, rule[direction]['packets'], rule[direction].get('bytes', 0)))
 
 
 def main():
@@ -191,12 +138,14 @@ def main():
         sys.exit('Unknown NAT type!')
 
     if arg.pipe:
-        process(pipe(), arg.stats, arg.proto, arg.pipe, arg.verbose, arg.type)
+        flows = filter_flows(pipe(), **filters(arg.type, arg.ipaddr))
+        process(flows, arg.stats, arg.proto, arg.pipe, arg.verbose, arg.type)
     elif arg.file:
-        process(content(arg.file), arg.stats, arg.proto, arg.pipe, arg.verbose, arg.type)
+        flows = filter_flows(content(arg.file), **filters(arg.type, arg.ipaddr))
+        process(flows, arg.stats, arg.proto, arg.pipe, arg.verbose, arg.type)
     else:
         try:
-            process(run(command(arg.type, arg.proto, arg.ipaddr)), arg.stats, arg.proto, arg.pipe, arg.verbose, arg.type)
+            process(run(arg.type, arg.proto, arg.ipaddr), arg.stats, arg.proto, arg.pipe, arg.verbose, arg.type)
         except:
             pass
 
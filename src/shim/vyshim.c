@@ -19,7 +19,7 @@
 #include <stdio.h>
 #include <string.h>
 #include <unistd.h>
-#include <string.h>
+#include <errno.h>
 #include <sys/time.h>
 #include <time.h>
 #include <stdint.h>
@@ -29,8 +29,14 @@
 #include "mkjson.h"
 
 /*
+ * vyshim [VYOS_TAGNODE_VALUE=<value>] <script> [<args>]
+ * vyshim --batch [VYOS_TAGNODE_VALUE=<value>] <script> [<args>] [-- ...]
  *
- *
+ * Run conf_mode scripts through vyos-configd, falling back to executing them
+ * if the daemon does not handle them. In batch mode all scripts, separated
+ * by "--", are sent in a single message and run in order. The commit engine
+ * calls vyshim once per script; batch mode is for callers which know the
+ * scripts of a commit up front and is not used by the commit path.
  */
 
 #if DEBUG
@@ -50,6 +56,10 @@
 
 #define COMMIT_MARKER "/var/tmp/initial_in_commit"
 
+#define BATCH_OPTION "--batch"
+#define BATCH_SEPARATOR "--"
+#define MAX_BATCH 1024
+
 enum {
     SUCCESS =      1 << 0,
     ERROR_COMMIT = 1 << 1,
@@ -62,6 +72,7 @@ volatile int timeout = 0;
 
 int initialization(void *);
 int pass_through(char **, int);
+int run_batch(void *, char **, int);
 void timer_handler(int);
 
 double get_posix_clock_time(void);
@@ -81,6 +92,13 @@ int main(int argc, char* argv[])
     debug_print("Connecting to vyos-configd ...\n");
     zmq_connect(requester, SOCKET_PATH);
 
+    if (argc > 1 && !strcmp(argv[1], BATCH_OPTION)) {
+        int ret = run_batch(requester, argv, argc);
+        zmq_close(requester);
+        zmq_ctx_destroy(context);
+        return ret;
+    }
+
     for (int i = 1; i < argc ; i++) {
         strncat(&string_node_data[0], argv[i], 127);
     }
@@ -242,9 +260,6 @@ int pass_through(char **argv, int ex_index)
     pid_t child_pid;
 
     newargv = &argv[ex_index];
-    if (ex_index > 1) {
-        putenv(argv[ex_index - 1]);
-    }
 
     debug_print("pass-through invoked\n");
 
@@ -252,10 +267,14 @@ int pass_through(char **argv, int ex_index)
         debug_print("fork() failed\n");
         return -1;
     } else if (child_pid == 0) {
+        // only the script gets the tag node value, not later batch entries
+        if (ex_index > 1) {
+            putenv(argv[ex_index - 1]);
+        }
         if (-1 == execv(argv[ex_index], newargv)) {
             debug_print("pass_through execve failed %s: %s\n",
                         argv[ex_index], strerror(errno));
-            return -1;
+            _exit(127);
         }
     } else if (child_pid > 0) {
         int status;
@@ -275,6 +294,150 @@ int pass_through(char **argv, int ex_index)
     return 0;
 }
 
+/*
+ * Append a JSON string of the node data of a batch entry: its arguments
+ * concatenated as for a single node message
+ */
+static void append_node_data(char **buf, size_t *len, size_t *size, char **args)
+{
+    size_t data_len = 0;
+
+    for (int i = 0; args[i] != NULL; i++) {
+        data_len += strlen(args[i]);
+    }
+
+    // worst case every character is escaped, plus quotes and terminator
+    size_t needed = *len + 2 * data_len + 3;
+    if (needed > *size) {
+        *size = needed * 2;
+        *buf = realloc(*buf, *size);
+    }
+
+    char *out = *buf + *len;
+    *out++ = '"';
+    for (int i = 0; args[i] != NULL; i++) {
+        for (char *c = args[i]; *c != '\0'; c++) {
+            if (*c == '"' || *c == '\\') {
+                *out++ = '\\';
+            }
+            *out++ = *c;
+        }
+    }
+    *out++ = '"';
+    *out = '\0';
+    *len = out - *buf;
+}
+
+/*
+ * Send the entries [first, count) of a batch, receive one result code byte
+ * per processed entry; return the number of result codes
+ */
+static int send_batch(void *requester, char **entries[], int first, int count,
+                      char *codes)
+{
+    const char *head = "{\"type\": \"batch\", \"data\": [";
+    size_t size = 1024;
+    size_t len = strlen(head);
+    char *msg = malloc(size);
+
+    strcpy(msg, head);
+    for (int i = first; i < count; i++) {
+        if (i > first) {
+            msg[len++] = ',';
+            msg[len] = '\0';
+        }
+        append_node_data(&msg, &len, &size, entries[i]);
+    }
+    if (len + 3 > size) {
+        size = len + 3;
+        msg = realloc(msg, size);
+    }
+    strcpy(msg + len, "]}");
+    len += 2;
+
+    debug_print("Sending batch: %s\n", msg);
+    zmq_send(requester, msg, len, 0);
+    int received = zmq_recv(requester, codes, MAX_BATCH, 0);
+    free(msg);
+
+    if (received > count - first) {
+        received = count - first;
+    }
+    return received;
+}
+
+/*
+ * Batch mode: split the arguments at "--" into entries, send them to
+ * vyos-configd and run those it does not handle. After the entries to run
+ * here the remainder is sent again, see python/vyos/configdbatch.py.
+ */
+int run_batch(void *requester, char **argv, int argc)
+{
+    char **entries[MAX_BATCH];
+    int ex_index[MAX_BATCH];
+    char codes[MAX_BATCH];
+    int count = 0;
+
+    for (int i = 2; i < argc; i++) {
+        if (!strcmp(argv[i], BATCH_SEPARATOR)) {
+            // terminate the previous entry
+            argv[i] = NULL;
+            continue;
+        }
+        if (i == 2 || argv[i - 1] == NULL) {
+            if (count == MAX_BATCH) {
+                fprintf(stderr, "vyshim: more than %d scripts in a batch\n",
+                        MAX_BATCH);
+                return -1;
+            }
+            // pass_through() expects the arguments to start at ex_index
+            entries[count] = &argv[i];
+            ex_index[count] = strstr(argv[i], "VYOS_TAGNODE_VALUE") == argv[i] ? 2 : 1;
+            count++;
+        }
+    }
+
+    int init_timeout = 0;
+    if (access(COMMIT_MARKER, F_OK) != -1) {
+        init_timeout = initialization(requester);
+        if (!init_timeout) remove(COMMIT_MARKER);
+    }
+
+    int first = 0;
+    while (first < count) {
+        int received = 0;
+        if (!init_timeout) {
+            received = send_batch(requester, entries, first, count, codes);
+        }
+
+        if (received <= 0) {
+            // no daemon, run all remaining scripts here
+            for (int i = first; i < count; i++) {
+                int ret = pass_through(entries[i] - 1, ex_index[i]);
+                if (ret) return ret;
+            }
+            return 0;
+        }
+
+        for (int i = 0; i < received; i++) {
+            int err = (int)codes[i];
+            int entry = first + i;
+
+            if (err & (PASS | ERROR_DAEMON)) {
+                debug_print("Running entry %d\n", entry);
+                int ret = pass_through(entries[entry] - 1, ex_index[entry]);
+                if (ret) return ret;
+            } else if (err & ERROR_COMMIT) {
+                debug_print("Received ERROR_COMMIT for entry %d\n", entry);
+                return -1;
+            }
+        }
+        first += received;
+    }
+
+    return 0;
+}
+
 void timer_handler(int signum)
 {
     debug_print("timer_handler invoked\n");
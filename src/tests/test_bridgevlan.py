@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+from vyos.ifconfig.bridgevlan import BridgeVLANBatch
+from vyos.ifconfig.bridgevlan import vlan_ids
+from vyos.ifconfig.bridgevlan import vlan_ranges
+
+class TestBridgeVLAN(TestCase):
+    def test_ranges(self):
+        self.assertEqual(vlan_ids(['10', '20-22']), {10, 20, 21, 22})
+        self.assertEqual(vlan_ranges({1, 2, 3, 10, 12, 13}), ['1-3', '10', '12-13'])
+        self.assertEqual(vlan_ranges(set()), [])
+
+    def test_trunk(self):
+        batch = BridgeVLANBatch()
+        # freshly enslaved port with the default VLAN 1
+        batch._state = {'eth1': {1: {'PVID', 'Egress Untagged'}}}
+        batch.port('eth1', vlan_ids(['2-4094']), pvid='1')
+        self.assertEqual(batch.commands, [
+            'vlan add dev eth1 vid 2-4094 master',
+        ])
+
+    def test_delta(self):
+        batch = BridgeVLANBatch()
+        batch._state = {'eth1': {vid: set() for vid in range(2, 101)}}
+        batch._state['eth1'][1] = {'PVID', 'Egress Untagged'}
+        # native VLAN moves from 1 to 50, 90-100 removed
+        batch.port('eth1', vlan_ids(['2-89', '200']), pvid='50')
+        self.assertEqual(batch.commands, [
+            'vlan del dev eth1 vid 1 master',
+            'vlan del dev eth1 vid 90-100 master',
+            'vlan add dev eth1 vid 200 master',
+            'vlan add dev eth1 vid 50 pvid untagged master',
+        ])
+
+        # nothing left to do once applied
+        batch.commands = []
+        batch.port('eth1', vlan_ids(['2-89', '200']), pvid='50')
+        self.assertEqual(batch.commands, [])
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+from vyos.config import Config
+from vyos.configsource import ConfigSource
+
+class ConfigSourceDict(ConfigSource):
+    def __init__(self, root_dict):
+        super().__init__()
+        self._root_dict = root_dict
+
+    def get_root_dict(self, effective=False, path=[]):
+        return self._root_dict
+
+    def set_level(self, path):
+        self._level = path
+
+    def is_tag(self, path):
+        return self._level + path.split() == ['interfaces', 'bridge']
+
+    def is_multi(self, path):
+        return self._level + path.split() == ['interfaces', 'bridge', 'br0', 'address']
+
+    def is_leaf(self, path):
+        return self._level + path.split() == ['interfaces', 'bridge', 'br0', 'hello-time']
+
+class TestConfig(TestCase):
+    def setUp(self):
+        source = ConfigSourceDict({'interfaces': {'bridge': {'br0': {
+            'hello-time': '5', 'member': {'interface': {'eth1': {}}}}}}})
+        self.config = Config(config_source=source)
+
+    def test_defaults_mangled(self):
+        bridge = self.config.get_config_dict(['interfaces', 'bridge'],
+                                             key_mangling=('-', '_'),
+                                             get_first_key=True,
+                                             with_defaults=True)
+        # configured values win over defaults
+        self.assertEqual(bridge['br0']['hello_time'], '5')
+        self.assertEqual(bridge['br0']['max_age'], '20')
+        self.assertNotIn('hello-time', bridge['br0'])
+
+    def test_defaults(self):
+        bridge = self.config.get_config_dict(['interfaces', 'bridge'],
+                                             with_defaults=True)
+        self.assertEqual(list(bridge['bridge']), ['br0'])
+        self.assertEqual(bridge['bridge']['br0']['hello-time'], '5')
+        self.assertEqual(bridge['bridge']['br0']['max-age'], '20')
+        # no mangled default keys mixed into the dashed dict
+        self.assertEqual([key for key in bridge['bridge']['br0'] if '_' in key], [])
+
+    def test_memo_copy(self):
+        first = self.config.get_config_dict(['interfaces', 'bridge'])
+        first['bridge']['br0']['hello-time'] = '10'
+        second = self.config.get_config_dict(['interfaces', 'bridge'])
+        self.assertEqual(second['bridge']['br0']['hello-time'], '5')
+
+    def test_level(self):
+        self.config.set_level(['interfaces'])
+        # the source is queried relative to the config edit level
+        self.assertTrue(self.config.is_tag('bridge'))
+        self.config.set_level(['interfaces', 'bridge', 'br0'])
+        self.assertTrue(self.config.is_multi('address'))
+        self.assertTrue(self.config.is_leaf('hello-time'))
+        self.assertFalse(self.config.is_tag('bridge'))
@@ -54,3 +54,38 @@ class TestConfigParser(TestCase):
     def test_rename_duplicate(self):
         with self.assertRaises(vyos.configtree.ConfigTreeError):
             self.config.rename(["top-level-tag-node", "foo"], "bar")
+
+    def test_apply_ops(self):
+        self.config.apply_ops([
+            ("set", ["top-level-leaf-node"], "bar"),
+            ("add_value", ["normal-node", "normal-node-child", "multi-node"], "value2"),
+            ("rename", ["top-level-tag-node", "bar"], "quux"),
+            ("delete", ["trailing-leaf-node-without-value"]),
+        ])
+        self.assertEqual(self.config.return_value(["top-level-leaf-node"]), "bar")
+        self.assertIn("value2", self.config.return_values(["normal-node", "normal-node-child", "multi-node"]))
+        self.assertTrue(self.config.exists(["top-level-tag-node", "quux"]))
+        self.assertFalse(self.config.exists(["trailing-leaf-node-without-value"]))
+
+    def test_apply_ops_errors(self):
+        with self.assertRaises(vyos.configtree.ConfigTreeError):
+            self.config.apply_ops([
+                ("rename", ["top-level-tag-node", "foo"], "bar"),
+                ("set", ["top-level-leaf-node"], "bar"),
+            ])
+        # operations after a failed one are still applied
+        self.assertEqual(self.config.return_value(["top-level-leaf-node"]), "bar")
+
+    def test_apply_ops_replace(self):
+        self.config.apply_ops([("replace", ["top-level-leaf-node"], "quux")])
+        self.assertEqual(self.config.return_value(["top-level-leaf-node"]), "quux")
+
+    def test_apply_ops_invalid(self):
+        before = self.config.to_string()
+        for ops in ([("set", ["top-level-leaf-node"], "bar"), ("frobnicate", ["foo"])],
+                    [("set", ["top-level-leaf-node"], "bar"), ("delete", "top-level-tag-node")],
+                    [("set", ["top-level-leaf-node"], "bar"), ("add_value", ["normal-node"])]):
+            with self.assertRaises(vyos.configtree.ConfigTreeError):
+                self.config.apply_ops(ops)
+            # nothing is applied when an operation is malformed
+            self.assertEqual(self.config.to_string(), before)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from vyos.configdbatch import R_SUCCESS, R_ERROR_COMMIT, R_ERROR_DAEMON, R_PASS
+from vyos.configdbatch import encode_results, decode_results, run_batch
+from vyos.configdbatch import schedule
+
+# configd runs the scripts named "cfg-*", everything else is passed through
+def batch(nodes, results=None, **kwargs):
+    ran = []
+    def run_node(node):
+        ran.append(node)
+        if not node.startswith('cfg-'):
+            return R_PASS
+        return (results or {}).get(node, R_SUCCESS)
+    res = run_batch(nodes, run_node, lambda node: not node.startswith('cfg-'), **kwargs)
+    return res, ran
+
+class TestConfigdBatch(TestCase):
+    def test_encoding(self):
+        results = [R_SUCCESS, R_PASS, R_ERROR_COMMIT]
+        self.assertEqual(encode_results(results), b'\x01\x08\x02')
+        self.assertEqual(decode_results(encode_results(results)), results)
+        self.assertEqual(encode_results([]), b'')
+
+    def test_success(self):
+        res, ran = batch(['cfg-a', 'cfg-b', 'cfg-c'])
+        self.assertEqual(res, [R_SUCCESS] * 3)
+        self.assertEqual(ran, ['cfg-a', 'cfg-b', 'cfg-c'])
+
+    def test_pass(self):
+        # consecutive pass-through scripts are reported together, nothing
+        # after them runs until the client resubmits
+        res, ran = batch(['cfg-a', 'x', 'y', 'cfg-b', 'z'])
+        self.assertEqual(res, [R_SUCCESS, R_PASS, R_PASS])
+        self.assertEqual(ran, ['cfg-a', 'x'])
+
+        # the resubmitted remainder
+        res, ran = batch(['cfg-b', 'z'])
+        self.assertEqual(res, [R_SUCCESS, R_PASS])
+
+    def test_error(self):
+        for error in [R_ERROR_COMMIT, R_ERROR_DAEMON]:
+            res, ran = batch(['cfg-a', 'cfg-b', 'cfg-c'], {'cfg-b': error})
+            self.assertEqual(res, [R_SUCCESS, error])
+            self.assertEqual(ran, ['cfg-a', 'cfg-b'])
+
+    def test_parallel(self):
+        groups = []
+        def run_parallel(nodes):
+            groups.append(nodes)
+            return [R_SUCCESS] * len(nodes)
+        res, ran = batch(['cfg-a', 'cfg-p1', 'cfg-p2', 'cfg-b'],
+                         is_parallel=lambda node: node.startswith('cfg-p'),
+                         run_parallel=run_parallel)
+        self.assertEqual(res, [R_SUCCESS] * 4)
+        self.assertEqual(groups, [['cfg-p1', 'cfg-p2']])
+        self.assertEqual(ran, ['cfg-a', 'cfg-b'])
+
+        # stop after a group with an unsuccessful script
+        res, ran = batch(['cfg-p1', 'cfg-p2', 'cfg-b'],
+                         is_parallel=lambda node: node.startswith('cfg-p'),
+                         run_parallel=lambda nodes: [R_ERROR_COMMIT])
+        self.assertEqual(res, [R_ERROR_COMMIT])
+        self.assertEqual(ran, [])
+
+class TestConfigdSchedule(TestCase):
+    def run_schedule(self, nodes, depends=(), conflicts=(), prepare_results=None,
+                     apply_results=None):
+        """
+        nodes are names, depends and conflicts pairs of indexes (i, j), j < i
+        """
+        events = []
+        lock = threading.Lock()
+        applying = threading.get_ident()
+
+        def prepare(node):
+            with lock:
+                events.append(('prepare', node))
+            return (prepare_results or {}).get(node, R_SUCCESS), f'{node}-config'
+
+        def apply(node, data):
+            # apply always runs in the scheduling thread
+            self.assertEqual(threading.get_ident(), applying)
+            self.assertEqual(data, f'{node}-config')
+            with lock:
+                events.append(('apply', node))
+            return (apply_results or {}).get(node, R_SUCCESS)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = schedule(nodes, lambda i, j: (i, j) in depends,
+                               lambda i, j: (i, j) in conflicts,
+                               executor, prepare, apply)
+        return results, events
+
+    def test_order(self):
+        results, events = self.run_schedule(['a', 'b', 'c'])
+        self.assertEqual(results, [R_SUCCESS] * 3)
+        applied = [node for (phase, node) in events if phase == 'apply']
+        self.assertEqual(applied, ['a', 'b', 'c'])
+
+    def test_dependency(self):
+        # c depends on a, b conflicts with a: both are only prepared once
+        # a has been applied
+        results, events = self.run_schedule(['a', 'b', 'c'], depends={(2, 0)},
+                                            conflicts={(1, 0)})
+        self.assertEqual(results, [R_SUCCESS] * 3)
+        applied_a = events.index(('apply', 'a'))
+        self.assertGreater(events.index(('prepare', 'b')), applied_a)
+        self.assertGreater(events.index(('prepare', 'c')), applied_a)
+
+    def test_prepare_failure(self):
+        # scripts before the failure are applied, none after it
+        results, events = self.run_schedule(['a', 'b', 'c'],
+                                            prepare_results={'b': R_ERROR_COMMIT})
+        self.assertEqual(results, [R_SUCCESS, R_ERROR_COMMIT])
+        applied = [node for (phase, node) in events if phase == 'apply']
+        self.assertEqual(applied, ['a'])
+
+    def test_first_failure(self):
+        # the earliest failure wins even if a later script fails first
+        results, events = self.run_schedule(['a', 'b', 'c'],
+                                            prepare_results={'b': R_ERROR_DAEMON,
+                                                             'c': R_ERROR_COMMIT})
+        self.assertEqual(results, [R_SUCCESS, R_ERROR_DAEMON])
+
+    def test_apply_failure(self):
+        results, events = self.run_schedule(['a', 'b', 'c'],
+                                            apply_results={'a': R_ERROR_COMMIT})
+        self.assertEqual(results, [R_ERROR_COMMIT])
+        applied = [node for (phase, node) in events if phase == 'apply']
+        self.assertEqual(applied, ['a'])
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+from vyos.configdiff import _changed_paths
+from vyos.configdiff import _key_sets_from_dicts
+
+effective = {
+    'interfaces': {'ethernet': {'eth0': {'address': ['192.0.2.1/24']},
+                                'eth1': {'description': 'uplink'}}},
+    'system': {'host-name': 'vyos'},
+}
+
+session = {
+    'interfaces': {'ethernet': {'eth0': {'address': ['192.0.2.1/24', '2001:db8::1/64']},
+                                'eth2': {'mtu': '9000'}}},
+    'system': {'host-name': 'vyos'},
+}
+
+class TestConfigDiff(TestCase):
+    def setUp(self):
+        self.changed = set()
+        _changed_paths(session, effective, (), self.changed)
+
+    def test_changed_leaf(self):
+        self.assertIn(('interfaces', 'ethernet', 'eth0', 'address'), self.changed)
+        self.assertIn(('interfaces', 'ethernet'), self.changed)
+        self.assertIn((), self.changed)
+
+    def test_added_and_deleted_subtrees(self):
+        self.assertIn(('interfaces', 'ethernet', 'eth1', 'description'), self.changed)
+        self.assertIn(('interfaces', 'ethernet', 'eth2', 'mtu'), self.changed)
+
+    def test_unchanged(self):
+        self.assertNotIn(('system',), self.changed)
+        self.assertNotIn(('system', 'host-name'), self.changed)
+
+    def test_key_sets(self):
+        ret = _key_sets_from_dicts(session['interfaces']['ethernet'],
+                                   effective['interfaces']['ethernet'])
+        self.assertEqual(ret['merge'], ['eth0', 'eth2'])
+        self.assertEqual(ret['add'], ['eth2'])
+        self.assertEqual(ret['delete'], ['eth1'])
+        self.assertEqual(ret['stable'], ['eth0'])
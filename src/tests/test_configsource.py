@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+from unittest.mock import patch
+
+import vyos.configsource
+from vyos.configsource import ConfigTreeCache
+from vyos.configsource import ConfigSourceString
+from vyos.configsource import ConfigSourceSession
+from vyos.configsource import LazyConfigTree
+from vyos.configtree import ConfigTreeError
+from vyos.configsource import VyOSError
+
+class TestConfigTreeCache(TestCase):
+    def setUp(self):
+        with open('tests/data/config.valid', 'r') as f:
+            self.config_string = f.read()
+        self.cache = ConfigTreeCache(maxsize=2)
+
+    def test_reuse_tree(self):
+        tree = self.cache.get_tree(self.config_string)
+        self.assertIs(self.cache.get_tree(self.config_string), tree)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_reuse_dict(self):
+        d = self.cache.get_dict(self.config_string)
+        self.assertIn('top-level-leaf-node', d)
+        self.assertIs(self.cache.get_dict(self.config_string), d)
+
+    def test_empty(self):
+        self.assertIsNone(self.cache.get_tree(''))
+        self.assertEqual(self.cache.get_dict(''), {})
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+    def test_eviction(self):
+        first = self.cache.get_tree(self.config_string)
+        self.cache.get_tree(self.config_string + '\ntop-level-valueless-node-2')
+        self.cache.get_tree(self.config_string + '\ntop-level-valueless-node-3')
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertIsNot(self.cache.get_tree(self.config_string), first)
+
+    def test_config_source(self):
+        source = ConfigSourceString(running_config_text=self.config_string,
+                                    session_config_text=self.config_string,
+                                    cache=self.cache)
+        running, session = source.get_configtree_tuple()
+        self.assertIs(running, session)
+        self.assertIs(source.get_root_dict(effective=True),
+                      source.get_root_dict(effective=False))
+
+class TestConfigSourceSession(TestCase):
+    def setUp(self):
+        self.commands = []
+        def run(source, cmd):
+            self.commands.append(cmd[1:])
+            if cmd[1] == 'inSession':
+                return ''
+            raise VyOSError()
+
+        vyos.configsource._session_query_cache.clear()
+        patches = [patch.object(ConfigSourceSession, '_run', run),
+                   patch('vyos.configsource.boot_configuration_complete',
+                         return_value=False)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.env = {'VYATTA_CHANGES_ONLY_DIR': '/tmp/changes_only_1'}
+
+    def test_query_cache(self):
+        ConfigSourceSession(session_env=self.env)
+        ConfigSourceSession(session_env=self.env)
+        self.assertEqual(self.commands, [['inSession']])
+
+    def test_query_cache_env(self):
+        ConfigSourceSession(session_env=self.env)
+        # a different session environment must not reuse the answer
+        env = {'VYATTA_CHANGES_ONLY_DIR': '/tmp/changes_only_2'}
+        ConfigSourceSession(session_env=env)
+        self.assertEqual(self.commands, [['inSession'], ['inSession']])
+
+    def test_schema_query(self):
+        source = ConfigSourceSession(session_env=self.env)
+        self.commands.clear()
+        self.assertTrue(source.is_tag('interfaces ethernet'))
+        self.assertFalse(source.is_tag('interfaces'))
+        self.assertTrue(source.is_multi('interfaces ethernet eth0 address'))
+        self.assertFalse(source.is_multi('interfaces ethernet eth0 mtu'))
+        self.assertTrue(source.is_leaf('interfaces ethernet eth0 mtu'))
+        self.assertFalse(source.is_leaf('interfaces ethernet'))
+        source.set_level(['interfaces', 'ethernet'])
+        self.assertTrue(source.is_leaf('eth0 mtu'))
+        # all answered from the interface definitions
+        self.assertEqual(self.commands, [])
+
+    def test_schema_query_fallback(self):
+        source = ConfigSourceSession(session_env=self.env)
+        self.commands.clear()
+        # tag node values and unknown paths are left to cli-shell-api
+        self.assertFalse(source.is_tag('interfaces ethernet eth0'))
+        self.assertFalse(source.is_leaf('no-such-node'))
+        self.assertEqual(self.commands, [['isTag', 'interfaces', 'ethernet', 'eth0'],
+                                         ['isLeaf', 'no-such-node']])
+
+class TestLazyConfigTree(TestCase):
+    def setUp(self):
+        with open('tests/data/config.valid', 'r') as f:
+            self.config_string = f.read()
+        self.loaded = []
+
+    def loader(self, texts):
+        # texts: config text by path, as printed by showConfig
+        def load(path):
+            self.loaded.append(path)
+            return texts.get(tuple(path), '')
+        return load
+
+    def test_empty(self):
+        tree = LazyConfigTree(self.loader({}), lambda: [])
+        self.assertFalse(tree)
+        self.assertFalse(tree.exists(['interfaces']))
+        self.assertEqual(tree.get_dict(), {})
+        self.assertEqual(self.loaded, [['interfaces'], []])
+        with self.assertRaises(ConfigTreeError):
+            tree.to_string()
+        with self.assertRaises(AttributeError):
+            tree.no_such_method()
+        self.assertFalse(LazyConfigTree(self.loader({})))
+
+    def test_scoped(self):
+        subtree = 'normal-node-child {\n    valueless-node\n}\n'
+        tree = LazyConfigTree(self.loader({(): self.config_string,
+                                           ('normal-node',): subtree}),
+                              lambda: ['normal-node'])
+        self.assertTrue(tree.exists(['normal-node', 'normal-node-child', 'valueless-node']))
+        self.assertIn('normal-node', tree.get_dict(['normal-node']))
+        self.assertTrue(tree)
+        # only the top level node subtree is loaded
+        self.assertEqual(self.loaded, [['normal-node']])
+        self.assertTrue(tree.exists(['top-level-leaf-node']))
+        self.assertEqual(self.loaded, [['normal-node'], []])
+
+    def test_effective(self):
+        running_text = 'normal-node-child {\n    valueless-node\n}\n'
+        working_text = running_text + 'session-only-node\n'
+        def run(source, cmd):
+            if cmd[1] in ('inSession', 'listNodes', 'listActiveNodes'):
+                return "'normal-node'"
+            if cmd[5:] != ['normal-node']:
+                return ''
+            return running_text if '--show-active-only' in cmd else working_text
+
+        vyos.configsource._session_query_cache.clear()
+        with patch.object(ConfigSourceSession, '_run', run), \
+             patch('vyos.configsource.boot_configuration_complete',
+                   return_value=True):
+            source = ConfigSourceSession()
+            running, session = source.get_configtree_tuple()
+            self.assertIsNot(running, session)
+            self.assertTrue(running)
+            path = ['normal-node', 'session-only-node']
+            self.assertFalse(running.exists(path))
+            self.assertTrue(session.exists(path))
+            self.assertNotIn('session-only-node',
+                             source.get_root_dict(effective=True, path=path)['normal-node'])
+            self.assertIn('session-only-node',
+                          source.get_root_dict(path=path)['normal-node'])
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+from vyos.conntrack import FlowAggregator
+from vyos.conntrack import filter_flows
+from vyos.conntrack import parse_flows
+
+def flow(src, proto, sport):
+    return ('<flow><meta direction="original">'
+            f'<layer3 protonum="2" protoname="ipv4"><src>{src}</src><dst>198.51.100.1</dst></layer3>'
+            f'<layer4 protonum="6" protoname="{proto}"><sport>{sport}</sport><dport>80</dport></layer4>'
+            '<counters><packets>3</packets><bytes>180</bytes></counters></meta>'
+            '<meta direction="reply">'
+            '<layer3 protonum="2" protoname="ipv4"><src>198.51.100.1</src><dst>203.0.113.1</dst></layer3>'
+            f'<layer4 protonum="6" protoname="{proto}"><sport>80</sport><dport>1024</dport></layer4></meta>'
+            '<meta direction="independent"><state>ESTABLISHED</state><timeout>120</timeout>'
+            '<use>1</use><assured/></meta></flow>\n')
+
+xml = ('<?xml version="1.0" encoding="utf-8"?>\n<conntrack>\n' +
+       flow('192.0.2.1', 'tcp', 40000) + flow('192.0.2.2', 'udp', 40001) +
+       '</conntrack>\ntrailing data')
+
+class TestConntrack(TestCase):
+    def test_parse_flows(self):
+        # feed the XML in small chunks to cover elements split across reads
+        chunks = (xml[i:i + 7] for i in range(0, len(xml), 7))
+        flows = list(parse_flows(chunks))
+        self.assertEqual(len(flows), 2)
+        self.assertEqual(flows[0]['original'],
+                         {'src': '192.0.2.1', 'dst': '198.51.100.1', 'proto': 'tcp',
+                          'sport': '40000', 'dport': '80', 'packets': '3', 'bytes': '180'})
+        self.assertEqual(flows[0]['reply']['dst'], '203.0.113.1')
+        self.assertEqual(flows[1]['independent'],
+                         {'state': 'ESTABLISHED', 'timeout': '120', 'use': '1', 'assured': ''})
+
+    def test_filter_flows(self):
+        flows = list(parse_flows([xml]))
+        self.assertEqual(len(list(filter_flows(flows, proto='udp'))), 1)
+        self.assertEqual(len(list(filter_flows(flows, src='192.0.2.1'))), 1)
+        self.assertEqual(len(list(filter_flows(flows, dst='198.51.100.2'))), 0)
+        self.assertEqual(len(list(filter_flows(flows))), 2)
+
+    def test_aggregator(self):
+        aggregator = FlowAggregator(nat='source', port_block=512, rule=lambda address: '10')
+        aggregator.update(parse_flows([xml]))
+        summary = aggregator.to_dict(count=1)
+        self.assertEqual(summary['flows'], 2)
+        self.assertEqual(summary['protocol']['distinct'], 2)
+        self.assertEqual(summary['source']['distinct'], 2)
+        self.assertEqual(len(summary['source']['top']), 1)
+        self.assertEqual(summary['translation']['top'], [{'key': '203.0.113.1', 'flows': 2}])
+        self.assertEqual(summary['port_block']['top'], [{'key': '203.0.113.1:1024-1535', 'flows': 2}])
+        self.assertEqual(summary['rule']['top'], [{'key': '10', 'flows': 2}])
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import tempfile
+
+from unittest import TestCase
+from vyos.ifconfig.history import CounterHistory
+from vyos.ifconfig.history import counter_delta
+
+def stats(rx_bytes, tx_bytes=0):
+    return {'rx_bytes': rx_bytes, 'tx_bytes': tx_bytes}
+
+class TestCounterHistory(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = CounterHistory.directory
+        CounterHistory.directory = self.tmp.name
+
+    def tearDown(self):
+        CounterHistory.directory = self.directory
+        self.tmp.cleanup()
+
+    def test_counter_delta(self):
+        self.assertEqual(counter_delta(10, 15), 5)
+        # 32 bit wrap
+        self.assertEqual(counter_delta(2**32 - 5, 10, bits=32), 15)
+        # 64 bit counter reset
+        self.assertEqual(counter_delta(2**40, 10), 10)
+        # reset at small values is not taken for a wrap
+        self.assertEqual(counter_delta(1000, 10), 10)
+        self.assertEqual(counter_delta(2**32 - 5, 10), 10)
+
+    def test_ring_buffer(self):
+        with CounterHistory('eth0', slots=4, create=True) as history:
+            for second in range(6):
+                history.append(float(second), stats(second * 100, second * 10))
+
+        # readers see the samples written by the collector
+        with CounterHistory('eth0') as history:
+            samples = history.samples()
+            self.assertEqual([_[0] for _ in samples], [2.0, 3.0, 4.0, 5.0])
+            self.assertEqual(samples[-1][1]['rx_bytes'], 500)
+            self.assertEqual(history.current()['rx_bytes'], 100.0)
+            self.assertEqual(len(history.rates(window=1)), 1)
+
+            summary = history.summary()
+            self.assertEqual(summary['tx_bytes'], {'min': 10.0, 'avg': 10.0, 'max': 10.0})
+
+        self.assertEqual(CounterHistory.histories(), ['eth0'])
+
+    def test_resize(self):
+        with CounterHistory('eth1', slots=4, create=True) as history:
+            history.append(1.0, stats(1))
+        with CounterHistory('eth1', slots=8, create=True) as history:
+            self.assertEqual(history.slots, 8)
+            self.assertEqual(history.samples(), [])
+        self.assertRaises(FileNotFoundError, CounterHistory, 'eth2')
+
+    def test_sequence(self):
+        with CounterHistory('eth3', slots=4, create=True) as writer, \
+                CounterHistory('eth3') as reader:
+            for second in range(4):
+                writer.append(float(second), stats(second * 100))
+
+            # a sample written while reading: the read is retried
+            read = reader._read
+            def concurrent(*args):
+                samples = read(*args)
+                if writer.samples()[-1][0] < 4.0:
+                    writer.append(4.0, stats(400))
+                return samples
+            reader._read = concurrent
+            self.assertEqual([_[0] for _ in reader.samples()], [1.0, 2.0, 3.0, 4.0])
+
+            # the collector never completes its write
+            reader.retries = 3
+            header = list(CounterHistory._header.unpack_from(writer._mmap, 0))
+            header[-1] += 1
+            CounterHistory._header.pack_into(writer._mmap, 0, *header)
+            self.assertRaises(ValueError, reader.samples)
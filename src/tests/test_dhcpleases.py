@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+
+from unittest import TestCase
+from vyos.dhcpleases import LeaseIndex
+
+header = '''# The format of this file is documented in the dhcpd.leases(5) manual page.
+# This lease file was written by isc-dhcp-4.4.1
+
+# authoring-byte-order entry is generated, DO NOT DELETE
+authoring-byte-order little-endian;
+
+server-duid "\\000\\001\\000\\001";
+
+'''
+
+def lease(ip, start, state, pool='LAN', mac='00:50:56:00:00:01'):
+    return f'''lease {ip} {{
+  starts 4 2022/01/13 10:00:{start:02};
+  ends 4 2022/01/13 11:00:00;
+  cltt 4 2022/01/13 10:00:{start:02};
+  binding state {state};
+  next binding state free;
+  rewind binding state free;
+  hardware ethernet {mac};
+  set shared-networkname = "{pool}";
+  client-hostname "host-{ip}";
+}}
+'''
+
+class TestLeaseIndex(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.lease_file = os.path.join(self.tmp.name, 'dhcpd.leases')
+        self.index_file = os.path.join(self.tmp.name, 'index')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, data, mode='a'):
+        with open(self.lease_file, mode) as f:
+            f.write(data)
+
+    def index(self):
+        index = LeaseIndex(self.lease_file, self.index_file).update()
+        index.save()
+        return index
+
+    def test_incremental(self):
+        self.write(header + lease('192.0.2.10', 1, 'active') +
+                   lease('192.0.2.11', 2, 'active', pool='DMZ'), 'w')
+        index = self.index()
+        self.assertEqual(index.pool_stats(), {'LAN': {'active': 1}, 'DMZ': {'active': 1}})
+
+        # a newer declaration for the same address replaces the old one,
+        # a declaration still being written is left for the next update
+        partial = lease('192.0.2.12', 4, 'active')
+        self.write(lease('192.0.2.10', 3, 'free') + partial[:40])
+        index = self.index()
+        self.assertEqual(index.pool_stats(), {'LAN': {'free': 1}, 'DMZ': {'active': 1}})
+        self.assertNotIn('192.0.2.12', index.leases)
+
+        self.write(partial[40:])
+        index = self.index()
+        leases = {_['ip']: _ for _ in index.get(state=['active'])}
+        self.assertEqual(sorted(leases), ['192.0.2.11', '192.0.2.12'])
+        self.assertEqual(leases['192.0.2.12']['hostname'], 'host-192.0.2.12')
+        self.assertEqual(leases['192.0.2.12']['hardware_address'], '00:50:56:00:00:01')
+        self.assertEqual(leases['192.0.2.12']['cltt'], '4 2022/01/13 10:00:04')
+        self.assertEqual([_['ip'] for _ in index.get(pool='DMZ')], ['192.0.2.11'])
+
+    def test_rewritten(self):
+        self.write(header + lease('192.0.2.10', 1, 'active') +
+                   lease('192.0.2.11', 2, 'active'), 'w')
+        self.index()
+
+        # dhcpd writes a new compacted file and renames it into place
+        new = self.lease_file + '.new'
+        with open(new, 'w') as f:
+            f.write(header + lease('192.0.2.11', 2, 'active'))
+        os.rename(new, self.lease_file)
+
+        index = self.index()
+        self.assertEqual(list(index.leases), ['192.0.2.11'])
+        self.assertEqual(index.pool_stats(), {'LAN': {'active': 1}})
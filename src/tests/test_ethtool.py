@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+from vyos import ethtool
+
+class TestEthtool(TestCase):
+    def test_features(self):
+        features = ethtool.get_features('lo')
+        # legacy names are made of the kernel features
+        self.assertEqual(features['generic-receive-offload'], features['rx-gro'])
+        self.assertEqual(features['large-receive-offload'], features['rx-lro'])
+        # the loopback interface can not change scatter-gather
+        self.assertTrue(features['tx-scatter-gather']['fixed'])
+
+    def test_loopback(self):
+        lo = ethtool.Ethtool('lo')
+        self.assertFalse(lo.check_flow_control())
+        self.assertFalse(lo.check_speed_duplex('1000', 'full'))
+        self.assertEqual(lo.get_ring_buffer_max('rx'), None)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+from unittest import TestCase
+from vyos.firewall import nft_conditions
+
+# "nft -j list chain ip filter NAME_WAN_IN" of rules generated by parse_rule()
+ruleset = json.loads('''
+{"nftables": [
+ {"metainfo": {"version": "1.0.2", "release_name": "Lester Gooch", "json_schema_version": 1}},
+ {"chain": {"family": "ip", "table": "filter", "name": "NAME_WAN_IN", "handle": 10}},
+ {"rule": {"family": "ip", "table": "filter", "chain": "NAME_WAN_IN", "handle": 11, "comment": "WAN_IN-10",
+   "expr": [{"match": {"op": "in", "left": {"ct": {"key": "state"}}, "right": ["established", "related"]}},
+            {"counter": {"packets": 12, "bytes": 1008}}, {"return": null}]}},
+ {"rule": {"family": "ip", "table": "filter", "chain": "NAME_WAN_IN", "handle": 12, "comment": "WAN_IN-20",
+   "expr": [{"match": {"op": "==", "left": {"meta": {"key": "l4proto"}}, "right": "tcp"}},
+            {"match": {"op": "==", "left": {"payload": {"protocol": "tcp", "field": "dport"}}, "right": 22}},
+            {"limit": {"rate": 10, "burst": 20, "per": "minute"}},
+            {"counter": {"packets": 0, "bytes": 0}}, {"drop": null}]}},
+ {"rule": {"family": "ip", "table": "filter", "chain": "NAME_WAN_IN", "handle": 13, "comment": "WAN_IN-30",
+   "expr": [{"match": {"op": "!=", "left": {"payload": {"protocol": "ip", "field": "saddr"}},
+                       "right": {"prefix": {"addr": "192.0.2.0", "len": 24}}}},
+            {"match": {"op": "==", "left": {"&": [{"payload": {"protocol": "tcp", "field": "flags"}},
+                                                  {"|": ["syn", "ack"]}]}, "right": "syn"}},
+            {"match": {"op": "==", "left": {"meta": {"key": "mark"}}, "right": 1048561}},
+            {"counter": {"packets": 3, "bytes": 180}}, {"reject": null}]}},
+ {"rule": {"family": "ip", "table": "filter", "chain": "NAME_WAN_IN", "handle": 14, "comment": "WAN_IN-40",
+   "expr": [{"match": {"op": "==", "left": {"meta": {"key": "iifname"}}, "right": "eth0"}},
+            {"match": {"op": "==", "left": {"payload": {"protocol": "tcp", "field": "dport"}},
+                       "right": {"set": [80, 443, {"range": [8000, 8080]}]}}},
+            {"limit": {"rate": 5, "burst": 5, "per": "second"}},
+            {"log": null}, {"counter": {"packets": 1, "bytes": 60}},
+            {"mangle": {"key": {"meta": {"key": "mark"}}, "value": 2147483391}},
+            {"return": null}]}},
+ {"rule": {"family": "ip", "table": "filter", "chain": "NAME_WAN_IN", "handle": 15, "comment": "WAN_IN-50",
+   "expr": [{"limit": {"rate": 1, "rate_unit": "mbytes", "per": "second", "inv": true}},
+            {"mangle": {"key": {"tcp option": {"name": "maxseg", "field": "size"}}, "value": 1400}},
+            {"counter": {"packets": 0, "bytes": 0}}, {"jump": {"target": "VYOS_POST_FW"}}]}},
+ {"rule": {"family": "ip", "table": "filter", "chain": "NAME_WAN_IN", "handle": 16, "comment": "WAN_IN default-action drop",
+   "expr": [{"counter": {"packets": 7, "bytes": 420}}, {"drop": null}]}},
+ {"rule": {"family": "ip", "table": "filter", "chain": "NAME_WAN_IN", "handle": 17, "comment": "WAN_IN-60",
+   "expr": [{"match": {"op": "==", "left": {"meta": {"key": "l4proto"}}, "right": "udp"}},
+            {"log": {"prefix": "[WAN_IN-60-D]", "level": "warn"}},
+            {"counter": {"packets": 0, "bytes": 0}}, {"drop": null}]}}
+]}
+''')
+
+class TestNftConditions(TestCase):
+    def setUp(self):
+        self.rules = {entry['rule']['comment']: entry['rule']['expr']
+                      for entry in ruleset['nftables'] if 'rule' in entry}
+
+    def assertConditions(self, comment, text):
+        self.assertEqual(nft_conditions(self.rules[comment]), text)
+
+    def test_match(self):
+        self.assertConditions('WAN_IN-10', 'ct state { established, related }')
+        self.assertConditions('WAN_IN-30', 'ip saddr != 192.0.2.0/24 '
+                                           'tcp flags & (syn | ack) == syn meta mark 0x000ffff1')
+
+    def test_limit(self):
+        # "nft list" wording, including the per <unit>
+        self.assertConditions('WAN_IN-20', 'meta l4proto tcp tcp dport 22 '
+                                           'limit rate 10/minute burst 20 packets')
+        self.assertConditions('WAN_IN-50', 'limit rate over 1 mbytes/second '
+                                           'tcp option maxseg size set 1400 jump VYOS_POST_FW')
+
+    def test_statements(self):
+        # default burst of 5 packets is omitted, as by nft
+        self.assertConditions('WAN_IN-40', 'iifname "eth0" tcp dport { 80, 443, 8000-8080 } '
+                                           'limit rate 5/second log meta mark set 0x7ffffeff')
+        self.assertConditions('WAN_IN default-action drop', '')
+
+    def test_log(self):
+        # log statements are shown with their prefix, as by nft
+        self.assertConditions('WAN_IN-60', 'meta l4proto udp '
+                                           'log prefix "[WAN_IN-60-D]" level warn')
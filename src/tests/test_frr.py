@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import socket
+import tempfile
+import threading
+
+from unittest import TestCase
+from unittest.mock import patch
+
+import vyos.frr
+from vyos.frr import FRRConfig
+from vyos.frr import default_add_before
+from vyos.frr import delta_commands
+from vyos.frr import _literal_prefixes
+
+config = [
+    'frr version 8.1',
+    'hostname vyos',
+    '!',
+    'vrf red',
+    ' ip protocol bgp route-map FOO',
+    'exit-vrf',
+    '!',
+    'router bgp 65000',
+    ' neighbor 192.0.2.1 remote-as 65001',
+    'exit',
+    '!',
+    'router bgp 65000 vrf red',
+    ' neighbor 192.0.2.2 remote-as 65002',
+    'exit',
+    '!',
+    'ip prefix-list PL seq 5 permit any',
+    'ip prefix-list PL seq 10 deny any',
+    'route-map RM permit 10',
+    ' set metric 10',
+    'exit',
+    '!',
+    'line vty',
+    '!',
+    'end',
+]
+
+class TestFRRConfig(TestCase):
+    def test_literal_prefixes(self):
+        self.assertEqual(_literal_prefixes(r'^router bgp \d+'), ['router bgp '])
+        self.assertEqual(_literal_prefixes(default_add_before),
+                         ['ip prefix-list ', 'route-map ', 'line vty', 'end'])
+        self.assertEqual(_literal_prefixes(r'^bfd?'), ['bf'])
+        self.assertIsNone(_literal_prefixes(r'(\s+)?ip protocol bgp route-map .*'))
+        self.assertIsNone(_literal_prefixes(r'.*'))
+
+    def test_modify_section(self):
+        frr_cfg = FRRConfig(config)
+        self.assertEqual(frr_cfg.modify_section(r'^router bgp \d+', stop_pattern='^exit',
+                                                remove_stop_mark=True), 1)
+        self.assertNotIn('router bgp 65000', frr_cfg.config)
+        self.assertIn('router bgp 65000 vrf red', frr_cfg.config)
+
+        self.assertEqual(frr_cfg.modify_section(r'^ip prefix-list .*'), 2)
+        self.assertNotIn('ip prefix-list PL seq 10 deny any', frr_cfg.config)
+
+        # pattern matching indented lines
+        self.assertEqual(frr_cfg.modify_section(r'(\s+)?ip protocol bgp route-map [-a-zA-Z0-9.]+',
+                                                stop_pattern=r'(\s|!)'), 1)
+        self.assertNotIn(' ip protocol bgp route-map FOO', frr_cfg.config)
+
+    def test_add_before(self):
+        frr_cfg = FRRConfig(config)
+        frr_cfg.modify_section(r'^route-map .*', stop_pattern='^exit', remove_stop_mark=True)
+        self.assertTrue(frr_cfg.add_before(default_add_before, 'router ospf\n network 10.0.0.0/8 area 0\nexit'))
+        lines = frr_cfg.config
+        self.assertEqual(lines.index('router ospf') + 3, lines.index('ip prefix-list PL seq 5 permit any'))
+        self.assertFalse(frr_cfg.add_before(r'^router isis', 'foo'))
+
+    def test_delta_commands(self):
+        original = '\n'.join(config)
+        frr_cfg = FRRConfig(config)
+        frr_cfg.modify_section(r'^router bgp \d+', stop_pattern='^exit', remove_stop_mark=True)
+        frr_cfg.add_before(default_add_before, 'router bgp 65000\n neighbor 192.0.2.1 remote-as 65003\n'
+                                               ' neighbor 192.0.2.5 remote-as 65005\nexit')
+        frr_cfg.modify_section(r'^ip prefix-list .*')
+        self.assertEqual(delta_commands(original, str(frr_cfg)), [
+            'no ip prefix-list PL seq 10 deny any',
+            'no ip prefix-list PL seq 5 permit any',
+            'end', 'configure terminal',
+            'router bgp 65000',
+            'neighbor 192.0.2.1 remote-as 65003',
+            'neighbor 192.0.2.5 remote-as 65005'])
+        self.assertEqual(delta_commands(original, original), [])
+
+    def test_delta_commands_replaced(self):
+        original = '\n'.join([
+            'router bgp 65000',
+            ' neighbor 192.0.2.1 remote-as 65001',
+            ' address-family ipv4 unicast',
+            '  network 10.0.0.0/8',
+            '  network 10.1.0.0/16',
+            '  redistribute connected',
+            ' exit-address-family',
+            'exit',
+            '!',
+            'route-map RM permit 10',
+            ' set metric 10',
+            'exit'])
+        new = original.replace('remote-as 65001', 'remote-as 65002') \
+                      .replace('network 10.0.0.0/8', 'network 10.2.0.0/16') \
+                      .replace('redistribute connected', 'redistribute static') \
+                      .replace('set metric 10', 'set metric 20')
+        commands = delta_commands(original, new)
+        # lines which are not the value of a single value option are removed
+        self.assertIn('no network 10.0.0.0/8', commands)
+        self.assertIn('no redistribute connected', commands)
+        self.assertLess(commands.index('no network 10.0.0.0/8'), commands.index('network 10.2.0.0/16'))
+        self.assertLess(commands.index('no redistribute connected'), commands.index('redistribute static'))
+        # single value options are replaced, "no neighbor <peer> remote-as"
+        # would delete the neighbor
+        self.assertIn('neighbor 192.0.2.1 remote-as 65002', commands)
+        self.assertNotIn('no neighbor 192.0.2.1 remote-as 65001', commands)
+        self.assertIn('set metric 20', commands)
+        self.assertNotIn('no set metric 10', commands)
+
+class TestFRRTransaction(TestCase):
+    def setUp(self):
+        self.running = {'zebra': 'ip route 192.0.2.0/24 blackhole\n',
+                        'bgpd': 'router bgp 65000\nexit\n'}
+        self.reloaded = []
+        self.saved = 0
+
+        def get_configuration(daemon=None, marked=False):
+            return self.running[daemon]
+        def commit_configuration(config, daemon, original=None):
+            self.reloaded.append(daemon)
+        def save_configuration():
+            self.saved += 1
+
+        for name, func in (('get_configuration', get_configuration),
+                           ('_commit_configuration', commit_configuration),
+                           ('save_configuration', save_configuration)):
+            p = patch.object(vyos.frr, name, side_effect=func)
+            self.addCleanup(p.stop)
+            setattr(self, name, p.start())
+        self.addCleanup(vyos.frr.abort_transaction)
+
+    def modify(self, daemon, line):
+        frr_cfg = FRRConfig()
+        frr_cfg.load_configuration(daemon)
+        frr_cfg.config = frr_cfg.config + [line]
+        frr_cfg.commit_configuration(daemon)
+
+    def test_staged(self):
+        vyos.frr.begin_transaction(owner='protocols_bgp')
+        self.modify('bgpd', 'router bgp 65000 vrf red')
+        self.modify('zebra', 'ip route 198.51.100.0/24 blackhole')
+        vyos.frr.begin_transaction(owner='protocols_static')
+        self.modify('zebra', 'ip route 203.0.113.0/24 blackhole')
+        # a later script reads the configuration staged by an earlier one
+        frr_cfg = FRRConfig()
+        frr_cfg.load_configuration('zebra')
+        self.assertIn('ip route 198.51.100.0/24 blackhole', frr_cfg.config)
+        self.assertIn('ip route 203.0.113.0/24 blackhole', frr_cfg.config)
+        self.assertEqual(self.reloaded, [])
+        self.assertEqual(vyos.frr.current_transaction().owners,
+                         ['protocols_bgp', 'protocols_static'])
+
+        transaction = vyos.frr.commit_transaction()
+        self.assertFalse(vyos.frr.transaction_active())
+        # running configurations read once, one reload per daemon in
+        # daemon order, one save
+        self.assertEqual(self.get_configuration.call_count, 2)
+        self.assertEqual(self.reloaded, ['zebra', 'bgpd'])
+        self.assertEqual(self.saved, 1)
+        self.assertEqual(transaction.commits, {'bgpd': 1, 'zebra': 2})
+        self.assertIn('total', transaction.timing)
+
+    def test_unchanged(self):
+        vyos.frr.begin_transaction()
+        frr_cfg = FRRConfig()
+        frr_cfg.load_configuration('zebra')
+        frr_cfg.commit_configuration('zebra')
+        vyos.frr.commit_transaction()
+        self.assertEqual(self.reloaded, [])
+        self.assertEqual(self.saved, 0)
+
+    def test_abort(self):
+        vyos.frr.begin_transaction()
+        self.modify('bgpd', 'router bgp 65000 vrf red')
+        vyos.frr.abort_transaction()
+        self.assertIsNone(vyos.frr.commit_transaction())
+        self.assertEqual(self.reloaded, [])
+
+    def test_no_transaction(self):
+        self.modify('zebra', 'ip route 198.51.100.0/24 blackhole')
+        self.assertEqual(self.reloaded, ['zebra'])
+        self.assertEqual(self.saved, 1)
+
+    def test_unsupported_daemon(self):
+        transaction = vyos.frr.begin_transaction()
+        with self.assertRaises(ValueError):
+            transaction.stage('nosuchd', '')
+
+class FakeVTY:
+    """ VTY socket of an FRR daemon: replies to every command with its
+    output, three NUL bytes and the status from <replies> """
+    def __init__(self, path, replies):
+        self.replies = replies
+        self.commands = []
+        self.connections = []
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen()
+        threading.Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.connections.append(conn)
+            threading.Thread(target=self.serve, args=(conn,), daemon=True).start()
+
+    def serve(self, conn):
+        data = b''
+        while True:
+            try:
+                chunk = conn.recv(4096)
+            except OSError:
+                return
+            if not chunk:
+                return
+            data += chunk
+            while b'\0' in data:
+                command, data = data.split(b'\0', 1)
+                command = command.decode()
+                self.commands.append(command)
+                status, output = self.replies.get(command, (0, ''))
+                conn.sendall(output.encode() + b'\0\0\0' + bytes([status]))
+
+    def drop(self):
+        """ close all connections, as a restarting daemon does """
+        for conn in self.connections:
+            conn.shutdown(socket.SHUT_RDWR)
+            conn.close()
+        self.connections = []
+
+    def close(self):
+        self.drop()
+        self.server.close()
+
+class TestVTY(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        p = patch.object(vyos.frr, 'path_vty', tmp.name)
+        p.start()
+        self.addCleanup(p.stop)
+        self.vty = FakeVTY(os.path.join(tmp.name, 'bgpd.vty'), {
+            'show version': (0, 'FRRouting 8.1\r\n'),
+            'bad command': (2, '% Unknown command: bad command\r\n'),
+        })
+        self.addCleanup(self.vty.close)
+        vyos.frr.enable_vty_pool()
+        self.addCleanup(vyos.frr.disable_vty_pool)
+        p = patch.object(vyos.frr.util, 'popen', return_value=('vtysh output\n', 0))
+        self.popen = p.start()
+        self.addCleanup(p.stop)
+
+    def test_command(self):
+        self.assertEqual(vyos.frr.execute('show version', daemon='bgpd'), 'FRRouting 8.1\n')
+        self.assertEqual(vyos.frr.execute('show version', daemon='bgpd'), 'FRRouting 8.1\n')
+        # one connection, switched to enable mode once
+        self.assertEqual(self.vty.commands, ['enable', 'show version', 'show version'])
+        self.popen.assert_not_called()
+
+    def test_error_reply(self):
+        with self.assertRaises(OSError):
+            vyos.frr.execute('bad command', daemon='bgpd')
+        with self.assertRaises(vyos.frr.ConfigurationNotValid):
+            vyos.frr.configure(['router bgp 65000', 'bad command', 'neighbor 192.0.2.1 remote-as 65001'],
+                               daemon='bgpd')
+        # configuration stops at the failing command and returns to enable mode
+        self.assertEqual(self.vty.commands[-4:], ['configure terminal', 'router bgp 65000',
+                                                  'bad command', 'end'])
+        self.popen.assert_not_called()
+
+    def test_reconnect(self):
+        vyos.frr.execute('show version', daemon='bgpd')
+        self.vty.drop()
+        self.assertEqual(vyos.frr.execute('show version', daemon='bgpd'), 'FRRouting 8.1\n')
+        self.assertEqual(self.vty.commands, ['enable', 'show version', 'enable', 'show version'])
+        self.popen.assert_not_called()
+
+    def test_fallback(self):
+        # no socket for the daemon
+        self.assertEqual(vyos.frr.execute('show version', daemon='zebra'), 'vtysh output\n')
+        self.assertIn('-d zebra', self.popen.call_args[0][0])
+        # the pool is not used without a daemon
+        self.assertEqual(vyos.frr.execute('show version'), 'vtysh output\n')
+        self.assertEqual(self.vty.commands, [])
+
+    def test_pool_disabled(self):
+        vyos.frr.disable_vty_pool()
+        self.assertEqual(vyos.frr.execute('show version', daemon='bgpd'), 'vtysh output\n')
+        self.assertEqual(self.vty.commands, [])
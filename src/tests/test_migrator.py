@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+import vyos.defaults
+import vyos.migrator
+from vyos.migrator import Migrator
+from vyos.migrator import MigratorError
+from vyos.migrator import load_migration_script
+
+class FakeConfigTree:
+    """ ConfigTree stand-in holding a list of lines """
+    parsed = 0
+    written = 0
+
+    def __init__(self, config_string):
+        FakeConfigTree.parsed += 1
+        self.lines = config_string.split()
+
+    def append(self, line):
+        self.lines.append(line)
+
+    def to_string(self):
+        FakeConfigTree.written += 1
+        return ' '.join(self.lines)
+
+class TestMigrator(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def script(self, name, source):
+        filename = os.path.join(self.directory.name, name)
+        with open(filename, 'w') as f:
+            f.write(source)
+        return filename
+
+    def in_process(self, name, line):
+        return self.script(name, 'def migrate(config):\n'
+                                 f'    config.append("{line}")\n')
+
+    def process(self, name, line):
+        script = self.script(name, f'#!{sys.executable}\n'
+                                   'import sys\n'
+                                   'with open(sys.argv[1]) as f:\n'
+                                   '    config = f.read()\n'
+                                   'with open(sys.argv[1], "w") as f:\n'
+                                   f'    f.write(config + " {line}")\n')
+        os.chmod(script, 0o755)
+        return script
+
+    def migrator(self):
+        config_file = os.path.join(self.directory.name, 'config.boot')
+        with open(config_file, 'w') as f:
+            f.write('start')
+        FakeConfigTree.parsed = 0
+        FakeConfigTree.written = 0
+        p = patch.object(vyos.migrator, 'ConfigTree', FakeConfigTree)
+        p.start()
+        self.addCleanup(p.stop)
+        return Migrator(config_file), config_file
+
+    def test_in_process(self):
+        script = self.script('0-to-1', 'def migrate(config):\n'
+                                       '    config.append(1)\n'
+                                       'if __name__ == "__main__":\n'
+                                       '    raise SystemExit(1)\n')
+        config = []
+        load_migration_script(script).migrate(config)
+        self.assertEqual(config, [1])
+
+    def test_process(self):
+        # scripts without migrate() are never imported, they run on import
+        script = self.script('1-to-2', 'raise SystemExit(1)\n'
+                                       'def migrate_neighbor(config):\n'
+                                       '    pass\n')
+        self.assertIsNone(load_migration_script(script))
+
+    def test_mixed_chain(self):
+        migrator, config_file = self.migrator()
+        migrator.run_migration_script(self.in_process('0-to-1', 'a'))
+        self.assertEqual(FakeConfigTree.written, 0)
+        # the in-process changes are saved before a script run as a process
+        migrator.run_migration_script(self.process('1-to-2', 'b'))
+        self.assertEqual(FakeConfigTree.written, 1)
+        migrator.run_migration_script(self.in_process('2-to-3', 'c'))
+        migrator.run_migration_script(self.in_process('3-to-4', 'd'))
+        migrator.save_config()
+        # parsed again after the process, written once at the end
+        self.assertEqual(FakeConfigTree.parsed, 2)
+        self.assertEqual(FakeConfigTree.written, 2)
+        with open(config_file) as f:
+            self.assertEqual(f.read(), 'start a b c d')
+
+    def test_abort(self):
+        migrator, config_file = self.migrator()
+        script = self.script('0-to-1', 'def migrate(config):\n'
+                                       '    raise SystemExit(1)\n')
+        with self.assertRaises(MigratorError):
+            migrator.run_migration_script(script)
+
+        script = self.script('1-to-2', 'def migrate(config):\n'
+                                       '    raise ValueError("bad node")\n')
+        with self.assertRaises(MigratorError):
+            migrator.run_migration_script(script)
+
+    def test_abort_chain(self):
+        migrator, config_file = self.migrator()
+        os.mkdir(os.path.join(self.directory.name, 'test'))
+        self.in_process('test/0-to-1', 'a')
+        self.script('test/1-to-2', 'def migrate(config):\n'
+                                   '    raise SystemExit(1)\n')
+        self.in_process('test/2-to-3', 'c')
+        with patch.dict(vyos.defaults.directories, {'migrate': self.directory.name,
+                                                   'config': self.directory.name}):
+            with self.assertRaises(SystemExit):
+                migrator.run_migration_scripts({'test': 0}, {'test': 3})
+        # the migration stops at the failing script, the config file is
+        # left untouched
+        self.assertEqual(FakeConfigTree.written, 0)
+        with open(config_file) as f:
+            self.assertEqual(f.read(), 'start')
+
+    def test_success_exit(self):
+        migrator, config_file = self.migrator()
+        script = self.script('0-to-1', 'def migrate(config):\n'
+                                       '    config.append("a")\n'
+                                       '    raise SystemExit(0)\n')
+        migrator.run_migration_script(script)
+        migrator.save_config()
+        with open(config_file) as f:
+            self.assertEqual(f.read(), 'start a')
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+from vyos.ifconfig import netlink
+
+class TestNetlink(TestCase):
+    def test_link(self):
+        body = netlink._ifinfo(flags=netlink.IFF_UP)
+        body += netlink._attribute(netlink.IFLA_IFNAME, b'eth0.10\0')
+        body += netlink._attribute(netlink.IFLA_MTU, netlink._u32.pack(1500))
+        body += netlink._attribute(netlink.IFLA_ADDRESS, bytes.fromhex('0050560000ab'))
+        body += netlink._attribute(netlink.IFLA_OPERSTATE, bytes([6]))
+        body += netlink._attribute(netlink.IFLA_IFALIAS, b'uplink')
+
+        link = netlink._link(body)
+        self.assertEqual(link['ifname'], 'eth0.10')
+        self.assertEqual(link['admin_state'], 'up')
+        self.assertEqual(link['oper_state'], 'UP')
+        self.assertEqual(link['mtu'], 1500)
+        self.assertEqual(link['mac'], '00:50:56:00:00:ab')
+        self.assertEqual(link['alias'], 'uplink')
+        self.assertEqual(link['master'], None)
+
+    def test_loopback(self):
+        link = netlink.get_link('lo', cached=False)
+        self.assertEqual(link['ifname'], 'lo')
+        self.assertEqual(link['ifindex'], 1)
+
+    def test_volatile(self):
+        link = netlink.get_link('lo', cached=False)
+        # a stale state is not served from the cache
+        netlink._links['lo'] = {**link, 'admin_state': 'down'}
+        self.assertEqual(netlink.get_link('lo')['admin_state'], 'down')
+        self.assertEqual(netlink.get_link('lo', cached=False)['admin_state'], link['admin_state'])
+        self.assertIn('admin_state', netlink.volatile)
+        self.assertIn('oper_state', netlink.volatile)
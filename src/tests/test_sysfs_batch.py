@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2022 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+
+from unittest import TestCase
+from vyos.ifconfig.control import SysfsBatch
+from vyos.util import read_file
+from vyos.util import write_file
+
+class TestSysfsBatch(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.files = [os.path.join(self.directory.name, f'{i}') for i in range(3)]
+        for filename in self.files:
+            write_file(filename, '0')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_flush(self):
+        batch = SysfsBatch()
+        batch.write(self.files[0], 1)
+        batch.write(self.files[1], 0)
+        batch.write(self.files[2], 5)
+        batch.write(self.files[2], 0)
+        # queued values are visible before being applied
+        self.assertEqual(batch.read(self.files[0]), '1')
+        self.assertEqual(read_file(self.files[0]), '0')
+
+        counters = batch.flush()
+        self.assertEqual(counters, {'read': 3, 'applied': 1, 'skipped': 2})
+        self.assertEqual([read_file(f) for f in self.files], ['1', '0', '0'])
+
+        # the applied value is known, no further read
+        batch.write(self.files[0], 1)
+        self.assertEqual(batch.flush()['read'], 3)
@@ -23,3 +23,10 @@ class TestVyOSUtil(TestCase):
         expected_data = {"foo_bar": {"baz_quux": None}}
         new_data = mangle_dict_keys(data, '-', '_')
         self.assertEqual(new_data, expected_data)
+
+    def test_copy_config_dict(self):
+        data = {"foo": {"bar": ["baz"], "quux": "value"}}
+        new_data = copy_config_dict(data)
+        self.assertEqual(new_data, data)
+        new_data["foo"]["bar"].append("other")
+        self.assertEqual(data["foo"]["bar"], ["baz"])
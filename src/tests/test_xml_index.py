@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+#
+# Copyright (C) 2018 VyOS maintainers and contributors
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 2 or later as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest import TestCase
+
+from vyos import xml
+from vyos.xml import kw
+
+class TestXMLIndex(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.xml = xml.load_configuration()
+
+    def config_path(self, spath):
+        """ configuration path of a schema path, with a value for each tagNode """
+        lpath = []
+        for i, word in enumerate(spath):
+            lpath.append(word)
+            tree = self.xml._tree(list(spath[:i + 1]), with_tag=False)
+            if i < len(spath) - 1 and tree[kw.node] == kw.tagNode:
+                lpath.append('value')
+        return lpath
+
+    def assertMatchesTree(self, lpath, with_tag=True):
+        tree = self.xml._tree(lpath, with_tag)
+        node = tree.get(kw.node) if tree is not None else None
+        msg = f'{lpath} with_tag={with_tag}'
+        if node is None:
+            self.assertIsNone(self.xml.is_tag(lpath, with_tag), msg)
+            self.assertFalse(self.xml.exists(lpath, with_tag), msg)
+            return
+        self.assertTrue(self.xml.exists(lpath, with_tag), msg)
+        self.assertEqual(self.xml.is_tag(lpath, with_tag), node == kw.tagNode, msg)
+        self.assertEqual(self.xml.is_leaf(lpath, with_tag), node == kw.leafNode, msg)
+        self.assertEqual(self.xml.is_multi(lpath, with_tag), tree.get(kw.multi) is True, msg)
+
+    def test_node_types(self):
+        self.assertTrue(self.xml.is_tag(['interfaces', 'ethernet']))
+        self.assertTrue(self.xml.is_multi(['interfaces', 'ethernet', 'eth0', 'address']))
+        self.assertTrue(self.xml.is_leaf(['interfaces', 'ethernet', 'eth0', 'mtu']))
+        self.assertFalse(self.xml.is_leaf(['interfaces', 'ethernet', 'eth0']))
+        self.assertTrue(self.xml.is_tag_value(['interfaces', 'ethernet', 'eth0']))
+        self.assertIsNone(self.xml.is_tag(['interfaces', 'no-such-node']))
+
+    def test_index_matches_tree(self):
+        spaths = [spath for spath in self.xml._index() if spath]
+        self.assertTrue(spaths)
+        for spath in spaths:
+            self.assertMatchesTree(list(spath), with_tag=False)
+            self.assertMatchesTree(self.config_path(spath))
+            # tagNode values
+            if self.xml.is_tag(list(spath), with_tag=False):
+                self.assertMatchesTree(self.config_path(spath) + ['value'])
+
+    def test_missing_paths(self):
+        for lpath in (['no-such-node'], ['interfaces', 'ethernet', 'eth0', 'no-such-node'],
+                      ['system', 'host-name', 'vyos', 'no-such-node']):
+            self.assertMatchesTree(lpath)